@@ -16,7 +16,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / "sdk" / "python"))
 
 from ziwei_taibai.adapters.cli_base import CLIAdapterBase
 from ziwei_taibai.adapters.base import Task, TaskResult, HealthStatus, AdapterConfig
-from ziwei_taibai.agent import Agent
+from ziwei_taibai.async_agent import AsyncAgent
+from ziwei_taibai.audit import AuditPipeline
+from ziwei_taibai.heartbeat import HeartbeatResult
+from ziwei_taibai.spool import AuditSpool
 
 
 class ClaudeCodeCLIAdapter(CLIAdapterBase):
@@ -34,11 +37,40 @@ class ClaudeCodeCLIAdapter(CLIAdapterBase):
 
         super().__init__(config, cli_path, cli_args)
 
-        # Initialize Taibai SDK
-        self.sdk = Agent(
+        # Initialize Taibai SDK (async: discovery, heartbeats and audit reports
+        # must not block the event loop)
+        self.sdk = AsyncAgent(
             owner=config.owner_id,
             tianshu_api_base=config.tianshu_api_base,
             diting_audit_url=config.diting_audit_url,
+            audit=self._create_audit(),
+        )
+
+    def _create_audit(self) -> Optional[AuditPipeline]:
+        """Create the audit pipeline (None without a Diting URL)
+
+        Audit reports are queued and sent to Diting in batches by a background
+        flusher, so task latency does not include audit round-trips.
+        With AUDIT_SPOOL_DIR set, events are written to a local spool first and
+        replayed to Diting from a checkpoint, so a Diting outage loses nothing.
+        """
+        if not self.config.diting_audit_url:
+            return None
+        spool = None
+        spool_dir = self.config.get("AUDIT_SPOOL_DIR")
+        if spool_dir:
+            max_bytes = int(self.config.get("AUDIT_SPOOL_MAX_BYTES", 512 * 1024 * 1024))
+            spool = AuditSpool(
+                spool_dir,
+                segment_bytes=min(8 * 1024 * 1024, max_bytes // 2),
+                max_bytes=max_bytes,
+            )
+        return AuditPipeline(
+            self.config.diting_audit_url,
+            maxsize=int(self.config.get("AUDIT_QUEUE_SIZE", 10000)),
+            batch_size=int(self.config.get("AUDIT_BATCH_SIZE", 100)),
+            flush_interval=float(self.config.get("AUDIT_FLUSH_INTERVAL", 0.5)),
+            spool=spool,
         )
 
     async def initialize(self) -> bool:
@@ -46,23 +78,28 @@ class ClaudeCodeCLIAdapter(CLIAdapterBase):
         Initialize adapter:
         1. Discover Tianshu
         2. Register agent
-        3. Start heartbeat loop
+        3. Start heartbeats
         """
         try:
+            # shutdown() closes the audit pipeline; recreate it when restarted
+            if self.sdk.audit is not None and self.sdk.audit.closed:
+                self.sdk.audit = self._create_audit()
+
             # Discover Tianshu
-            discovery = self.sdk.discover()
+            discovery = await self.sdk.discover()
             print(f"[ClaudeCodeCLI] Discovered Tianshu: {discovery}")
 
             # Register agent
-            result = self.sdk.register(agent_display_id="claude-code-cli")
+            result = await self.sdk.register(agent_display_id="claude-code-cli")
             print(f"[ClaudeCodeCLI] Registered: {result}")
 
             if not result.get("ok"):
                 print(f"[ClaudeCodeCLI] Registration failed: {result}")
                 return False
 
-            # Start heartbeat loop
-            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            # Heartbeats go through the process-wide aggregator: all adapters
+            # talking to the same Tianshu share one batched request per interval
+            self.sdk.start_heartbeat(self.config.heartbeat_interval, callback=self._on_heartbeat)
 
             self._initialized = True
             return True
@@ -71,17 +108,12 @@ class ClaudeCodeCLIAdapter(CLIAdapterBase):
             print(f"[ClaudeCodeCLI] Initialization failed: {e}")
             return False
 
-    async def _heartbeat_loop(self) -> None:
-        """Send periodic heartbeats to Tianshu"""
-        while True:
-            try:
-                await asyncio.sleep(self.config.heartbeat_interval)
-                result = self.sdk.heartbeat()
-                print(f"[ClaudeCodeCLI] Heartbeat: {result}")
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                print(f"[ClaudeCodeCLI] Heartbeat failed: {e}")
+    def _on_heartbeat(self, result: HeartbeatResult) -> None:
+        """Heartbeat result for this adapter from the aggregator"""
+        if result.ok:
+            print(f"[ClaudeCodeCLI] Heartbeat: {result.data}")
+        else:
+            print(f"[ClaudeCodeCLI] Heartbeat failed: {result.error}")
 
     async def execute_task(self, task: Task) -> TaskResult:
         """
@@ -210,11 +242,16 @@ class ClaudeCodeCLIAdapter(CLIAdapterBase):
     async def report_action(self, action_type: str, detail: dict) -> None:
         """Report action to Diting for audit"""
         try:
-            result = self.sdk.trace(action_type, **detail)
+            result = await self.sdk.trace(action_type, **detail)
             print(f"[ClaudeCodeCLI] Reported action {action_type}: {result}")
         except Exception as e:
             print(f"[ClaudeCodeCLI] Failed to report action: {e}")
 
+    async def shutdown(self) -> None:
+        """Stop heartbeats and the CLI process, flush queued audit events and release SDK connections"""
+        await super().shutdown()
+        await self.sdk.close()
+
 
 # Register adapter
 from ziwei_taibai.adapters.registry import AdapterRegistry
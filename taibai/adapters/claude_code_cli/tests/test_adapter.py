@@ -73,8 +73,8 @@ async def test_parse_output(adapter):
 
 
 @pytest.mark.asyncio
-@patch('ziwei_taibai.agent.Agent.discover')
-@patch('ziwei_taibai.agent.Agent.register')
+@patch('ziwei_taibai.async_agent.AsyncAgent.discover', new_callable=AsyncMock)
+@patch('ziwei_taibai.async_agent.AsyncAgent.register', new_callable=AsyncMock)
 async def test_initialization(mock_register, mock_discover, adapter):
     """Test adapter initialization"""
     mock_discover.return_value = {"ok": True}
@@ -84,8 +84,10 @@ async def test_initialization(mock_register, mock_discover, adapter):
 
     assert success
     assert adapter.is_initialized
-    mock_discover.assert_called_once()
-    mock_register.assert_called_once()
+    mock_discover.assert_awaited_once()
+    mock_register.assert_awaited_once()
+
+    await adapter.shutdown()
 
 
 @pytest.mark.asyncio
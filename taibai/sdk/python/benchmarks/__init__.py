@@ -0,0 +1 @@
+# 太白 SDK 性能基准（独立脚本，不随包发布）
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""JSON 编解码器微基准
+
+比较当前环境中可用的编解码器（json / orjson / msgspec）在典型 Matrix 事件上的
+编码与解码耗时。
+
+用法：
+    python -m benchmarks.bench_codec [--number 2000] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+_sdk_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _sdk_path not in sys.path:
+    sys.path.insert(0, _sdk_path)
+
+from ziwei_taibai.codec import available_codecs, get_codec
+from benchmarks.payloads import SAMPLES
+
+
+def run(number: int):
+    results = []
+    for sample_name, payload in SAMPLES.items():
+        raw = json.dumps(payload).encode()
+        for codec_name in available_codecs():
+            codec = get_codec(codec_name)
+            encode = min(timeit.repeat(lambda: codec.dumps(payload), number=number, repeat=3))
+            decode = min(timeit.repeat(lambda: codec.loads(raw), number=number, repeat=3))
+            results.append({
+                "sample": sample_name,
+                "bytes": len(raw),
+                "codec": codec_name,
+                "encode_us": encode / number * 1e6,
+                "decode_us": decode / number * 1e6,
+            })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="每轮迭代次数")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args.number)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'sample':<16}{'bytes':>8}  {'codec':<8}{'encode(us)':>12}{'decode(us)':>12}")
+    for r in results:
+        print(f"{r['sample']:<16}{r['bytes']:>8}  {r['codec']:<8}{r['encode_us']:>12.2f}{r['decode_us']:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""Agent 集群模拟器（注册、心跳与审计容量）
+
+在一个进程（或 ``--shards`` 个子进程）中运行大量虚拟 Agent，对天枢 / 谛听替身服务器
+（benchmarks.platform_server，子进程启动）施加负载，用于估算一套部署能承载的 Agent 数：
+
+- 每个虚拟 Agent 是由 AdapterManager 管理的 SimulatedAdapter（基于 AsyncAgent），
+  启动时发现天枢并注册，之后经心跳聚合器（``--heartbeat individual`` 时各自循环）上报心跳；
+- 任务按总速率随机分派给运行中的 Agent，每个任务上报开始、``--traces-per-task`` 次工具调用与完成；
+- 流转：按 ``--churn`` 速率停止随机 Agent，并以新身份重新注册；
+- 审计事件默认经进程内共享的 AuditPipeline 批量上报（``--audit direct`` 时逐条同步上报）。
+
+统计：注册 / 心跳 / 审计 / 任务吞吐，discover / register / heartbeat / trace / task / shutdown
+延迟 p50 / p99 / p999，审计送达与丢失，客户端 CPU（负载阶段每 Agent 每秒 CPU 毫秒）
+与单 Agent 内存（启动前后的 RSS 与 Python 堆增量 / N）。
+
+用法：
+    python -m benchmarks.bench_fleet [--agents 1000] [--shards 1] [--duration 30]
+        [--heartbeat-interval 5] [--heartbeat aggregated|individual] [--task-rate 50]
+        [--traces-per-task 3] [--churn 1] [--audit pipeline|direct] [--latency 0] [--no-batch]
+        [--output results.json] [--compare baseline.json --tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+_sdk_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _sdk_path not in sys.path:
+    sys.path.insert(0, _sdk_path)
+
+import aiohttp
+
+from ziwei_taibai.adapters.base import AdapterConfig, Task, TaskResult
+from ziwei_taibai.adapters.sdk_base import SDKAdapterBase
+from ziwei_taibai.async_agent import AsyncAgent
+from ziwei_taibai.audit import AuditPipeline
+from ziwei_taibai.discovery import DiscoveryCache, configure_discovery_cache
+from ziwei_taibai.heartbeat import HeartbeatAggregator, HeartbeatResult
+from ziwei_taibai.manager import AdapterManager
+from ziwei_taibai.metrics import Histogram
+from ziwei_taibai.protocol import ACTION_API_CALL
+from benchmarks.bench_ws import _rss_bytes, compare
+
+OPERATIONS = ("discover", "register", "heartbeat", "trace", "task", "shutdown")
+
+
+def _cpu_seconds() -> float:
+    """当前进程已用 CPU 时间（用户态 + 内核态）"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _start_server(latency: float, batch: bool) -> Tuple[subprocess.Popen, int, int]:
+    """在子进程中启动替身服务器，避免其开销计入客户端 CPU 与内存"""
+    command = [sys.executable, "-m", "benchmarks.platform_server", "--latency", str(latency)]
+    if not batch:
+        command.append("--no-batch")
+    proc = subprocess.Popen(command, cwd=_sdk_path, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("PORTS "):
+        proc.kill()
+        raise RuntimeError(f"stand-in server failed to start: {line!r}")
+    _, tianshu_port, diting_port = line.split()
+    return proc, int(tianshu_port), int(diting_port)
+
+
+class FleetStats:
+    """一个分片内的统计：按操作的延迟直方图与事件计数"""
+
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = {op: Histogram() for op in OPERATIONS}
+        self.counts: Counter = Counter()
+
+    def on_heartbeat(self, result: HeartbeatResult):
+        self.counts["heartbeats" if result.ok else "heartbeat_failures"] += 1
+        self.latency["heartbeat"].record(result.latency)
+
+
+class SimulatedAdapter(SDKAdapterBase):
+    """虚拟 Agent：发现、注册、心跳，执行任务时上报审计事件（任务本身只是等待）"""
+
+    def __init__(
+        self,
+        config: AdapterConfig,
+        stats: FleetStats,
+        aggregator: Optional[HeartbeatAggregator] = None,
+        audit: Optional[AuditPipeline] = None
+    ):
+        super().__init__(config)
+        self.stats = stats
+        self.aggregator = aggregator
+        self.audit = audit
+        self.sdk = AsyncAgent(
+            owner=config.owner_id,
+            tianshu_api_base=config.tianshu_api_base,
+            diting_audit_url=config.diting_audit_url,
+            audit=audit,
+            close_audit=False,   # 共享的审计流水线由模拟器在结束时关闭
+        )
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def initialize(self) -> bool:
+        latency = self.stats.latency
+        try:
+            started = time.perf_counter()
+            await self.sdk.discover(refresh=self.config.get("REDISCOVER", False))
+            latency["discover"].record(time.perf_counter() - started)
+            started = time.perf_counter()
+            result = await self.sdk.register(agent_display_id=self.config.owner_id)
+            latency["register"].record(time.perf_counter() - started)
+        except Exception:
+            self.stats.counts["register_failures"] += 1
+            return False
+        if not result.get("ok"):
+            self.stats.counts["register_failures"] += 1
+            return False
+        self.stats.counts["registrations"] += 1
+
+        if self.aggregator is not None:
+            self.sdk.start_heartbeat(
+                self.config.heartbeat_interval,
+                callback=self.stats.on_heartbeat,
+                aggregator=self.aggregator
+            )
+        else:
+            self._heartbeat_task = asyncio.ensure_future(self._heartbeat_loop())
+        self._initialized = True
+        return True
+
+    async def _heartbeat_loop(self):
+        """各自上报心跳（对照组）：起点随机错开"""
+        interval = self.config.heartbeat_interval
+        await asyncio.sleep(random.uniform(0, interval))
+        while True:
+            started = time.perf_counter()
+            try:
+                await self.sdk.heartbeat()
+                self.stats.counts["heartbeats"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats.counts["heartbeat_failures"] += 1
+            self.stats.latency["heartbeat"].record(time.perf_counter() - started)
+            await asyncio.sleep(interval)
+
+    async def execute_task(self, task: Task) -> TaskResult:
+        started = time.perf_counter()
+        steps = task.metadata.get("steps", 0)
+        pause = task.metadata.get("work", 0.0) / (steps + 1)
+        await self.report_action("task_start", {"task_id": task.id})
+        for step in range(steps):
+            await asyncio.sleep(pause)
+            await self.report_action(ACTION_API_CALL, {"task_id": task.id, "step": step})
+        await asyncio.sleep(pause)
+        await self.report_action("task_complete", {"task_id": task.id, "status": "success"})
+        self.stats.latency["task"].record(time.perf_counter() - started)
+        return TaskResult(task_id=task.id, status="success")
+
+    async def report_action(self, action_type: str, detail: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            await self.sdk.trace(action_type, **detail)
+            self.stats.counts["traces"] += 1
+        except Exception:
+            self.stats.counts["trace_failures"] += 1
+        self.stats.latency["trace"].record(time.perf_counter() - started)
+
+    async def shutdown(self) -> None:
+        started = time.perf_counter()
+        self._initialized = False
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        await self.sdk.close()
+        self.stats.latency["shutdown"].record(time.perf_counter() - started)
+
+
+class Fleet:
+    """一个分片内的虚拟 Agent 集合"""
+
+    def __init__(self, args: argparse.Namespace, tianshu: str, diting: str):
+        self.args = args
+        self.tianshu = tianshu
+        self.diting_audit_url = f"{diting}/api/audit"
+        self.stats = FleetStats()
+        self.managers: List[AdapterManager] = []
+        self.audit = AuditPipeline(
+            self.diting_audit_url,
+            maxsize=args.audit_queue_size,
+            batch_size=args.audit_batch_size
+        ) if args.audit == "pipeline" else None
+        self.aggregator = HeartbeatAggregator(
+            tianshu,
+            interval=args.heartbeat_interval
+        ) if args.heartbeat == "aggregated" else None
+        self._serial = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _config(self) -> AdapterConfig:
+        return AdapterConfig(
+            adapter_type="simulated",
+            owner_id=f"sim-{self.args.shard}-{next(self._serial)}@bench",
+            tianshu_api_base=self.tianshu,
+            diting_audit_url=self.diting_audit_url,
+            heartbeat_interval=self.args.heartbeat_interval,
+            extra={"REDISCOVER": self.args.rediscover},
+        )
+
+    async def spawn(self) -> bool:
+        """启动一个虚拟 Agent（失败时只计数）"""
+        adapter = SimulatedAdapter(self._config(), self.stats, self.aggregator, self.audit)
+        manager = AdapterManager(adapter, auto_restart=False)
+        try:
+            await manager.start()
+        except RuntimeError:
+            return False
+        self.managers.append(manager)
+        return True
+
+    async def ramp_up(self, count: int, concurrency: int):
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def spawn():
+            async with semaphore:
+                await self.spawn()
+
+        await asyncio.gather(*(spawn() for _ in range(count)))
+
+    async def run_tasks(self, rate: float, duration: float):
+        """按泊松到达将任务分派给随机的运行中 Agent"""
+        if rate <= 0:
+            return
+        deadline = time.perf_counter() + duration
+        next_at = time.perf_counter()
+        serial = itertools.count()
+        while True:
+            next_at += random.expovariate(rate)
+            if next_at >= deadline:
+                return
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not self.managers:
+                continue
+            adapter = random.choice(self.managers).adapter
+            if not adapter.is_initialized:
+                continue
+            task = Task(
+                id=f"task-{self.args.shard}-{next(serial)}",
+                description="simulated task",
+                owner_id=adapter.config.owner_id,
+                metadata={
+                    "steps": self.args.traces_per_task,
+                    "work": random.expovariate(1.0 / self.args.task_time) if self.args.task_time > 0 else 0.0,
+                },
+            )
+            running = asyncio.ensure_future(adapter.execute_task(task))
+            self._tasks.add(running)
+            running.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            self.stats.counts["task_failures"] += 1
+        else:
+            self.stats.counts["tasks"] += 1
+
+    async def churn(self, rate: float, duration: float):
+        """按泊松到达停止随机 Agent，再以新身份注册一个"""
+        if rate <= 0:
+            return
+        deadline = time.perf_counter() + duration
+        while True:
+            delay = random.expovariate(rate)
+            if time.perf_counter() + delay >= deadline:
+                return
+            await asyncio.sleep(delay)
+            if not self.managers:
+                continue
+            manager = self.managers.pop(random.randrange(len(self.managers)))
+            await manager.stop()
+            await self.spawn()
+            self.stats.counts["restarts"] += 1
+
+    async def finish_tasks(self, timeout: float):
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    async def stop_all(self, concurrency: int):
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def stop(manager: AdapterManager):
+            async with semaphore:
+                await manager.stop()
+
+        managers, self.managers = self.managers, []
+        await asyncio.gather(*(stop(manager) for manager in managers))
+
+
+async def run_shard(args: argparse.Namespace, tianshu: str, diting: str) -> Dict[str, Any]:
+    """运行一个分片（当前进程内的全部虚拟 Agent），返回可跨进程合并的原始结果"""
+    # 只使用内存缓存：不读写用户的磁盘发现缓存
+    configure_discovery_cache(DiscoveryCache(persist=False))
+    fleet = Fleet(args, tianshu, diting)
+
+    # 启动阶段：注册速率与单 Agent 内存
+    if args.tracemalloc:
+        tracemalloc.start()
+    heap_before = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+    rss_before = _rss_bytes()
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    await fleet.ramp_up(args.agents, args.ramp_concurrency)
+    ramp_seconds = time.perf_counter() - started
+    ramp_cpu = _cpu_seconds() - cpu_before
+    agents = len(fleet.managers)
+    rss_per_agent = (_rss_bytes() - rss_before) / agents if agents else 0.0
+    heap_per_agent = None
+    if args.tracemalloc:
+        heap_per_agent = (tracemalloc.get_traced_memory()[0] - heap_before) / agents if agents else 0.0
+        tracemalloc.stop()
+
+    # 负载阶段：心跳、任务与流转
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    await asyncio.gather(
+        fleet.run_tasks(args.task_rate, args.duration),
+        fleet.churn(args.churn, args.duration),
+        asyncio.sleep(args.duration)
+    )
+    load_seconds = time.perf_counter() - started
+    load_cpu = _cpu_seconds() - cpu_before
+
+    # 收尾：等待进行中的任务，停止全部 Agent，发送剩余审计事件
+    started = time.perf_counter()
+    await fleet.finish_tasks(args.drain_timeout)
+    await fleet.stop_all(args.ramp_concurrency)
+    if fleet.aggregator is not None:
+        await fleet.aggregator.close()
+    if fleet.audit is not None:
+        await fleet.audit.close(timeout=args.drain_timeout)
+    drain_seconds = time.perf_counter() - started
+
+    audit = None
+    if fleet.audit is not None:
+        audit_stats = fleet.audit.stats()
+        audit = {
+            "delivered": audit_stats.delivered,
+            "failed": audit_stats.failed,
+            "dropped": audit_stats.dropped,
+            "requests": audit_stats.requests,
+        }
+    return {
+        "agents": agents,
+        "ramp_seconds": ramp_seconds,
+        "ramp_cpu": ramp_cpu,
+        "load_seconds": load_seconds,
+        "load_cpu": load_cpu,
+        "drain_seconds": drain_seconds,
+        "rss_bytes_per_agent": rss_per_agent,
+        "heap_bytes_per_agent": heap_per_agent,
+        "counts": dict(fleet.stats.counts),
+        "audit": audit,
+        "histograms": {op: h.to_dict() for op, h in fleet.stats.latency.items()},
+    }
+
+
+def _shard_command(args: argparse.Namespace, shard: int, agents: int, share: float,
+                   tianshu: str, diting: str) -> List[str]:
+    """子进程分片的命令行（负载按 Agent 数比例分配）"""
+    command = [
+        sys.executable, "-m", "benchmarks.bench_fleet", "--shard-worker",
+        "--shard", str(shard),
+        "--agents", str(agents),
+        "--task-rate", str(args.task_rate * share),
+        "--churn", str(args.churn * share),
+        "--tianshu-url", tianshu,
+        "--diting-url", diting,
+        "--duration", str(args.duration),
+        "--heartbeat-interval", str(args.heartbeat_interval),
+        "--heartbeat", args.heartbeat,
+        "--traces-per-task", str(args.traces_per_task),
+        "--task-time", str(args.task_time),
+        "--audit", args.audit,
+        "--audit-batch-size", str(args.audit_batch_size),
+        "--audit-queue-size", str(args.audit_queue_size),
+        "--ramp-concurrency", str(args.ramp_concurrency),
+        "--drain-timeout", str(args.drain_timeout),
+    ]
+    if args.rediscover:
+        command.append("--rediscover")
+    if not args.tracemalloc:
+        command.append("--no-tracemalloc")
+    return command
+
+
+async def _run_shards(args: argparse.Namespace, tianshu: str, diting: str) -> List[Dict[str, Any]]:
+    """在子进程中并行运行各分片，收集其 JSON 输出"""
+    base, extra = divmod(args.agents, args.shards)
+    counts = [base + (1 if shard < extra else 0) for shard in range(args.shards)]
+    procs = [
+        await asyncio.create_subprocess_exec(
+            *_shard_command(args, shard, count, count / args.agents, tianshu, diting),
+            cwd=_sdk_path,
+            stdout=asyncio.subprocess.PIPE
+        )
+        for shard, count in enumerate(counts) if count
+    ]
+    outputs = await asyncio.gather(*(proc.communicate() for proc in procs))
+    results = []
+    for proc, (stdout, _) in zip(procs, outputs):
+        if proc.returncode != 0:
+            raise RuntimeError(f"shard exited with {proc.returncode}")
+        results.append(json.loads(stdout))
+    return results
+
+
+async def _server_stats(session: aiohttp.ClientSession, base: str) -> Dict[str, Any]:
+    async with session.get(f"{base}/stats") as resp:
+        resp.raise_for_status()
+        return await resp.json()
+
+
+def _delta(after: Dict[str, int], before: Dict[str, int], *keys: str) -> int:
+    return sum(after.get(key, 0) - before.get(key, 0) for key in keys)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    server = None
+    if args.tianshu_url and args.diting_url:
+        tianshu, diting = args.tianshu_url.rstrip("/"), args.diting_url.rstrip("/")
+    else:
+        server, tianshu_port, diting_port = _start_server(args.latency, not args.no_batch)
+        tianshu, diting = f"http://127.0.0.1:{tianshu_port}", f"http://127.0.0.1:{diting_port}"
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            tianshu_before = await _server_stats(session, tianshu)
+            diting_before = await _server_stats(session, diting)
+            if args.shards > 1:
+                shards = await _run_shards(args, tianshu, diting)
+            else:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    shards = [await run_shard(args, tianshu, diting)]
+            tianshu_after = await _server_stats(session, tianshu)
+            diting_after = await _server_stats(session, diting)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=5)
+
+    latency = {op: Histogram() for op in OPERATIONS}
+    counts: Counter = Counter()
+    for shard in shards:
+        counts.update(shard["counts"])
+        for op, data in shard["histograms"].items():
+            latency[op].merge(Histogram.from_dict(data))
+    agents = sum(shard["agents"] for shard in shards)
+    ramp_seconds = max(shard["ramp_seconds"] for shard in shards)
+    load_seconds = max(shard["load_seconds"] for shard in shards)
+    load_cpu = sum(shard["load_cpu"] for shard in shards)
+    heap = [shard["heap_bytes_per_agent"] for shard in shards if shard["heap_bytes_per_agent"] is not None]
+    audit_received = _delta(diting_after["items"], diting_before["items"], "audit")
+
+    def ms(snapshot: Dict[str, float]) -> Dict[str, float]:
+        return {k: (v if k == "count" else round(v * 1000, 3)) for k, v in snapshot.items()}
+
+    def rate(count: float) -> float:
+        return round(count / load_seconds, 1) if load_seconds else 0.0
+
+    return {
+        "benchmark": "fleet",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "config": {
+            "agents": args.agents,
+            "shards": args.shards,
+            "duration": args.duration,
+            "heartbeat": args.heartbeat,
+            "heartbeat_interval": args.heartbeat_interval,
+            "task_rate": args.task_rate,
+            "traces_per_task": args.traces_per_task,
+            "task_time": args.task_time,
+            "churn": args.churn,
+            "audit": args.audit,
+            "latency": args.latency,
+            "batch": not args.no_batch,
+        },
+        "results": {
+            "agents": agents,
+            "ramp_seconds": round(ramp_seconds, 3),
+            "registrations_per_sec": round(agents / ramp_seconds, 1) if ramp_seconds else 0.0,
+            "register_failures": counts["register_failures"],
+            "heartbeats": counts["heartbeats"],
+            "heartbeat_failures": counts["heartbeat_failures"],
+            "heartbeats_per_sec": rate(counts["heartbeats"]),
+            "heartbeat_requests": _delta(
+                tianshu_after["requests"], tianshu_before["requests"], "heartbeat", "heartbeat_batch"
+            ),
+            "traces": counts["traces"],
+            "trace_failures": counts["trace_failures"],
+            "traces_per_sec": rate(counts["traces"]),
+            "audit_received": audit_received,
+            "audit_lost": max(0, counts["traces"] - audit_received),
+            "audit_dropped": sum(shard["audit"]["dropped"] for shard in shards if shard["audit"]),
+            "audit_requests": _delta(diting_after["requests"], diting_before["requests"], "audit", "audit_batch"),
+            "tasks": counts["tasks"],
+            "task_failures": counts["task_failures"],
+            "tasks_per_sec": rate(counts["tasks"]),
+            "restarts": counts["restarts"],
+            "latency_ms": {op: ms(h.snapshot()) for op, h in latency.items()},
+            "cpu_percent": round(load_cpu / load_seconds * 100, 1) if load_seconds else 0.0,
+            "cpu_ms_per_agent_sec": round(load_cpu * 1000 / load_seconds / agents, 4) if load_seconds and agents else 0.0,
+            "rss_bytes_per_agent": int(sum(s["rss_bytes_per_agent"] * s["agents"] for s in shards) / agents) if agents else 0,
+            "heap_bytes_per_agent": int(sum(heap) / len(heap)) if heap else None,
+            "drain_seconds": round(max(shard["drain_seconds"] for shard in shards), 3),
+        },
+    }
+
+
+# 回归比较：(指标路径, 越大越好)
+_COMPARED = [
+    (("registrations_per_sec",), True),
+    (("latency_ms", "register", "p99"), False),
+    (("latency_ms", "heartbeat", "p99"), False),
+    (("latency_ms", "trace", "p99"), False),
+    (("cpu_ms_per_agent_sec",), False),
+    (("heap_bytes_per_agent",), False),
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=1000, help="虚拟 Agent 数量")
+    parser.add_argument("--shards", type=int, default=1, help="分片进程数（1 = 在当前进程运行）")
+    parser.add_argument("--duration", type=float, default=30.0, help="负载持续时间（秒）")
+    parser.add_argument("--heartbeat-interval", type=float, default=5.0, help="心跳周期（秒）")
+    parser.add_argument("--heartbeat", choices=("aggregated", "individual"), default="aggregated",
+                        help="心跳方式：进程级聚合（默认）或每个 Agent 各自上报")
+    parser.add_argument("--task-rate", type=float, default=50.0, help="全部 Agent 每秒开始的任务数")
+    parser.add_argument("--traces-per-task", type=int, default=3, help="每个任务中工具调用的审计事件数")
+    parser.add_argument("--task-time", type=float, default=1.0, help="任务平均耗时（秒，指数分布）")
+    parser.add_argument("--churn", type=float, default=1.0, help="每秒停止并重新注册的 Agent 数")
+    parser.add_argument("--audit", choices=("pipeline", "direct"), default="pipeline",
+                        help="审计上报方式：共享批量流水线（默认）或逐条同步上报")
+    parser.add_argument("--audit-batch-size", type=int, default=100, help="审计批量大小")
+    parser.add_argument("--audit-queue-size", type=int, default=100000, help="审计队列容量")
+    parser.add_argument("--rediscover", action="store_true", help="每个 Agent 启动时强制重新发现（不用缓存）")
+    parser.add_argument("--ramp-concurrency", type=int, default=200, help="启动 / 停止阶段的并发数")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="不测量 Python 堆（tracemalloc 会拖慢启动阶段）")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务器每个请求的附加延迟（毫秒）")
+    parser.add_argument("--no-batch", action="store_true", help="替身服务器不提供批量接口")
+    parser.add_argument("--tianshu-url", help="使用已运行的天枢（需实现 /stats），不启动替身")
+    parser.add_argument("--diting-url", help="使用已运行的谛听（需实现 /stats），不启动替身")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="结束时等待任务与审计发送完成的时间")
+    parser.add_argument("--output", help="将 JSON 结果写入文件")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    parser.add_argument("--compare", help="与基线 JSON 结果比较，回归时返回非零")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="回归判定容差（相对变化）")
+    # 分片子进程使用
+    parser.add_argument("--shard-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--shard", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.shard_worker:
+        # stdout 只输出分片结果（AdapterManager 的进度信息丢弃）
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            shard = asyncio.run(run_shard(args, args.tianshu_url, args.diting_url))
+        print(json.dumps(shard))
+        return 0
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        r = result["results"]
+        lat = r["latency_ms"]
+        print(f"agents={r['agents']} shards={args.shards} duration={args.duration}s "
+              f"heartbeat={args.heartbeat}/{args.heartbeat_interval}s audit={args.audit}")
+        print(f"register: {r['registrations_per_sec']}/s ramp={r['ramp_seconds']}s failures={r['register_failures']}")
+        print(f"heartbeat: {r['heartbeats_per_sec']}/s requests={r['heartbeat_requests']} "
+              f"failures={r['heartbeat_failures']}")
+        print(f"audit: {r['traces_per_sec']}/s received={r['audit_received']} lost={r['audit_lost']} "
+              f"dropped={r['audit_dropped']} "
+              f"requests={r['audit_requests']}")
+        print(f"tasks: {r['tasks_per_sec']}/s restarts={r['restarts']} drain={r['drain_seconds']}s")
+        for op in OPERATIONS:
+            print(f"latency {op}(ms) p50={lat[op]['p50']} p99={lat[op]['p99']} "
+                  f"p999={lat[op]['p999']} max={lat[op]['max']} n={lat[op]['count']}")
+        print(f"cpu={r['cpu_percent']}% per-agent={r['cpu_ms_per_agent_sec']}ms/s "
+              f"memory/agent rss={r['rss_bytes_per_agent']}B heap={r['heap_bytes_per_agent']}B")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print("WARNING baseline was recorded with a different config", file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance, _COMPARED)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Room / Message 模型内存基准
+
+从 JSON 列表响应解码 N 个对象并保留，比较三种实现的每对象常驻内存与解码耗时：
+
+- dataclass：原先带 ``__dict__`` 的 dataclass（不驻留字符串）；
+- slots：``ziwei_taibai.models`` 中的 slotted 模型（驻留 ID 字符串）；
+- slots+lazy：同上，metadata 以 JSON bytes 保存、访问时解码。
+
+用法：
+    python -m benchmarks.bench_models [--count 100000] [--json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+_sdk_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _sdk_path not in sys.path:
+    sys.path.insert(0, _sdk_path)
+
+from ziwei_taibai.codec import default_codec
+from ziwei_taibai.models import decode_messages, decode_rooms
+
+
+@dataclass
+class LegacyRoom:
+    id: str
+    name: str
+    owner: str
+    members: List[str]
+    created_at: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class LegacyMessage:
+    id: str
+    sender: str
+    recipient: str
+    content: Any
+    type: str = "text"
+    timestamp: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def _legacy_rooms(data: Dict[str, Any]) -> List[LegacyRoom]:
+    return [
+        LegacyRoom(
+            id=r.get("id", ""),
+            name=r.get("name", ""),
+            owner=r.get("owner", ""),
+            members=r.get("members", []),
+            created_at=r.get("created_at"),
+            metadata=r.get("metadata")
+        )
+        for r in data.get("rooms", [])
+    ]
+
+
+def _legacy_messages(data: Dict[str, Any]) -> List[LegacyMessage]:
+    return [
+        LegacyMessage(
+            id=m.get("id", ""),
+            sender=m.get("sender", ""),
+            recipient=m.get("recipient", ""),
+            content=m.get("content", ""),
+            type=m.get("type", "text"),
+            timestamp=m.get("timestamp"),
+            metadata=m.get("metadata")
+        )
+        for m in data.get("messages", [])
+    ]
+
+
+def room_payload(count: int) -> bytes:
+    """房间列表响应：成员与所有者来自 500 个智能体"""
+    return json.dumps({"rooms": [
+        {
+            "id": f"!room{i % 2000:05d}:tianshu.example.com",
+            "name": f"任务房间 {i}",
+            "owner": f"@agent-{i % 500:04d}:tianshu.example.com",
+            "members": [f"@agent-{(i + k) % 500:04d}:tianshu.example.com" for k in range(4)],
+            "created_at": 1700000000.0 + i,
+            "metadata": {"topic": "governance", "labels": ["audit", "ops"], "priority": i % 5},
+        }
+        for i in range(count)
+    ]}).encode()
+
+
+def message_payload(count: int) -> bytes:
+    """消息列表响应：发送者与接收者来自 500 个智能体"""
+    return json.dumps({"messages": [
+        {
+            "id": f"$evt{i:08d}:tianshu.example.com",
+            "sender": f"@agent-{i % 500:04d}:tianshu.example.com",
+            "recipient": f"@agent-{(i * 7) % 500:04d}:tianshu.example.com",
+            "content": "任务执行完成",
+            "type": "text",
+            "timestamp": 1700000000.0 + i,
+            "metadata": {"trace_id": f"{i:032x}", "attempt": 1},
+        }
+        for i in range(count)
+    ]}).encode()
+
+
+def measure(payload: bytes, decode: Callable[[Dict[str, Any]], List[Any]]) -> Dict[str, float]:
+    """解码并保留对象，返回每对象常驻字节数与解码耗时（解析后的中间字典已释放）"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    objects = decode(default_codec.loads(payload))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    count = len(objects)
+    del objects
+    return {"bytes_per_object": retained / count, "decode_us": elapsed / count * 1e6}
+
+
+def run(count: int) -> List[Dict[str, Any]]:
+    cases = [
+        ("room", room_payload(count), {
+            "dataclass": _legacy_rooms,
+            "slots": decode_rooms,
+            "slots+lazy": lambda data: decode_rooms(data, lazy_metadata=True),
+        }),
+        ("message", message_payload(count), {
+            "dataclass": _legacy_messages,
+            "slots": decode_messages,
+            "slots+lazy": lambda data: decode_messages(data, lazy_metadata=True),
+        }),
+    ]
+    results = []
+    for model, payload, variants in cases:
+        baseline = None
+        for variant, decode in variants.items():
+            result = measure(payload, decode)
+            if baseline is None:
+                baseline = result["bytes_per_object"]
+            results.append({
+                "model": model,
+                "variant": variant,
+                "count": count,
+                **result,
+                "saved_pct": (1 - result["bytes_per_object"] / baseline) * 100,
+            })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000, help="对象数")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    args = parser.parse_args()
+
+    results = run(args.count)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'model':<10}{'variant':<12}{'bytes/obj':>12}{'saved':>9}{'decode(us)':>12}")
+    for r in results:
+        print(f"{r['model']:<10}{r['variant']:<12}{r['bytes_per_object']:>12.0f}"
+              f"{r['saved_pct']:>8.1f}%{r['decode_us']:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
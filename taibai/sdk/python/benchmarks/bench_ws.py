@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""WebSocket 吞吐与延迟基准
+
+在子进程中启动天枢替身服务器（benchmarks.server），建立 N 个 WSClient，
+每个客户端通过 SubscriptionManager 订阅基准事件，并按给定速率与大小发送消息，
+统计：
+
+- 吞吐：每秒投递到订阅回调的消息数；
+- 投递延迟：发送时间戳到订阅回调执行的 p50 / p99 / p999；
+- 重连耗时：服务器关闭全部连接后，所有客户端恢复连接的耗时；
+- 单连接内存：建立连接前后的 RSS 与 Python 堆（tracemalloc）增量 / N。
+
+用法：
+    python -m benchmarks.bench_ws [--clients 50] [--rate 100] [--size 256] [--duration 10]
+        [--fanout] [--output results.json] [--compare baseline.json --tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+_sdk_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _sdk_path not in sys.path:
+    sys.path.insert(0, _sdk_path)
+
+import aiohttp
+
+from ziwei_taibai.message import SubscriptionManager
+from ziwei_taibai.metrics import Histogram
+from ziwei_taibai.ws_client import WSClient, set_reconnect_rate_limit
+
+EVENT_TYPE = "bench.msg"
+
+
+def _rss_bytes() -> int:
+    """当前进程 RSS（Linux 读取 /proc，其他平台退化为峰值 RSS）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _start_server() -> Tuple[subprocess.Popen, int]:
+    """在子进程中启动替身服务器，避免其开销计入客户端内存与 CPU"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.server", "--port", "0"],
+        cwd=_sdk_path,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    line = proc.stdout.readline()
+    if not line.startswith("PORT "):
+        proc.kill()
+        raise RuntimeError(f"stand-in server failed to start: {line!r}")
+    return proc, int(line.split()[1])
+
+
+class BenchClient:
+    """一个基准客户端：WSClient + SubscriptionManager"""
+
+    def __init__(self, url: str, latency: Histogram, compress: bool, coalesce: bool):
+        self.ws = WSClient(
+            url,
+            heartbeat_interval=5.0,
+            reconnect_delay=0.05,
+            max_reconnect_delay=1.0,
+            compress=compress,
+            coalesce_frames=coalesce
+        )
+        self.subscriptions = SubscriptionManager(self.ws)
+        self.ws.on_message(self.subscriptions.handle_message)
+        self.latency = latency
+        self.received = 0
+
+    def on_event(self, data: Dict[str, Any]):
+        self.received += 1
+        self.latency.record(time.perf_counter() - data["ts"])
+
+    async def start(self):
+        await self.ws.connect()
+        if not self.ws.is_connected:
+            raise ConnectionError(f"failed to connect to {self.ws.url}")
+        await self.subscriptions.subscribe(EVENT_TYPE, self.on_event)
+        # 重连后恢复服务端订阅
+        self.ws.on_connect(lambda: asyncio.ensure_future(self.subscriptions.resubscribe()))
+
+    async def produce(self, rate: float, duration: float, padding: str, fanout: bool) -> int:
+        """按固定速率发送，返回发送条数"""
+        interval = 1.0 / rate
+        deadline = time.perf_counter() + duration
+        next_at = time.perf_counter()
+        sent = 0
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return sent
+            if next_at > now:
+                await asyncio.sleep(next_at - now)
+            message = {"type": EVENT_TYPE, "ts": time.perf_counter(), "pad": padding}
+            if fanout:
+                message["fanout"] = True
+            await self.ws.send(message)
+            await self.ws.drain()
+            sent += 1
+            next_at += interval
+
+
+async def _wait_until(predicate, timeout: float, step: float = 0.01) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(step)
+    return predicate()
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    server = None
+    if args.url:
+        url = args.url
+    else:
+        server, port = _start_server()
+        url = f"ws://127.0.0.1:{port}/ws"
+    http_base = url.replace("ws://", "http://", 1).rsplit("/", 1)[0]
+    if args.reconnect_rate:
+        set_reconnect_rate_limit(args.reconnect_rate, max(1, int(args.reconnect_rate)))
+
+    latency = Histogram()
+    padding = "x" * max(0, args.size - 64)
+    clients: List[BenchClient] = []
+    try:
+        # 建连与单连接内存
+        tracemalloc.start()
+        rss_before = _rss_bytes()
+        heap_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        for _ in range(args.clients):
+            client = BenchClient(url, latency, args.compress, args.coalesce)
+            await client.start()
+            clients.append(client)
+        connect_seconds = time.perf_counter() - started
+        heap_per_conn = (tracemalloc.get_traced_memory()[0] - heap_before) / args.clients
+        rss_per_conn = (_rss_bytes() - rss_before) / args.clients
+        tracemalloc.stop()
+
+        # 负载阶段
+        started = time.perf_counter()
+        sent = sum(await asyncio.gather(*(
+            c.produce(args.rate, args.duration, padding, args.fanout) for c in clients
+        )))
+        expected = sent * (args.clients if args.fanout else 1)
+        await _wait_until(lambda: sum(c.received for c in clients) >= expected, args.drain_timeout)
+        elapsed = time.perf_counter() - started
+        received = sum(c.received for c in clients)
+
+        # 重连阶段
+        reconnect_seconds: Optional[float] = None
+        before = [c.ws.reconnect_stats().successes for c in clients]
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{http_base}/drop") as resp:
+                resp.raise_for_status()
+        started = time.perf_counter()
+        if await _wait_until(
+            lambda: all(c.ws.reconnect_stats().successes > b and c.ws.is_connected
+                        for c, b in zip(clients, before)),
+            args.reconnect_timeout
+        ):
+            reconnect_seconds = time.perf_counter() - started
+
+        rtts = sorted(c.ws.latency_stats()["rtt"]["p50"] for c in clients)
+        rtt_p99 = max(c.ws.latency_stats()["rtt"]["p99"] for c in clients)
+    finally:
+        await asyncio.gather(*(c.ws.close() for c in clients), return_exceptions=True)
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=5)
+
+    def ms(snapshot: Dict[str, float]) -> Dict[str, float]:
+        return {k: (v if k == "count" else round(v * 1000, 3)) for k, v in snapshot.items()}
+
+    return {
+        "benchmark": "ws",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "config": {
+            "clients": args.clients,
+            "rate": args.rate,
+            "size": args.size,
+            "duration": args.duration,
+            "fanout": args.fanout,
+            "compress": args.compress,
+            "coalesce": args.coalesce,
+        },
+        "results": {
+            "sent": sent,
+            "received": received,
+            "lost": max(0, expected - received),
+            "msgs_per_sec": round(received / elapsed, 1) if elapsed else 0.0,
+            "latency_ms": ms(latency.snapshot()),
+            "rtt_ms": {"p50": round(rtts[len(rtts) // 2] * 1000, 3), "p99": round(rtt_p99 * 1000, 3)},
+            "connect_seconds": round(connect_seconds, 3),
+            "reconnect_seconds": round(reconnect_seconds, 3) if reconnect_seconds is not None else None,
+            "rss_bytes_per_conn": int(rss_per_conn),
+            "heap_bytes_per_conn": int(heap_per_conn),
+        },
+    }
+
+
+# 回归比较：(指标路径, 越大越好)
+_COMPARED = [
+    (("msgs_per_sec",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p99"), False),
+    (("reconnect_seconds",), False),
+    (("heap_bytes_per_conn",), False),
+]
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    metrics: Optional[List[Tuple[Tuple[str, ...], bool]]] = None
+) -> List[str]:
+    """与基线结果比较，返回超出容差的回归项（metrics 默认为 WebSocket 基准的指标）"""
+    regressions = []
+    for path, higher_is_better in metrics or _COMPARED:
+        now, base = current["results"], baseline["results"]
+        for key in path:
+            now, base = now.get(key) if now else None, base.get(key) if base else None
+        if not now or not base:
+            continue
+        change = (now - base) / base
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{'.'.join(path)}: {base} -> {now} ({change:+.1%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50, help="客户端数量")
+    parser.add_argument("--rate", type=float, default=100.0, help="每个客户端每秒发送条数")
+    parser.add_argument("--size", type=int, default=256, help="单条消息近似字节数")
+    parser.add_argument("--duration", type=float, default=10.0, help="负载持续时间（秒）")
+    parser.add_argument("--fanout", action="store_true", help="服务器广播给所有订阅者（默认回送发送方）")
+    parser.add_argument("--compress", action="store_true", help="启用 permessage-deflate")
+    parser.add_argument("--coalesce", action="store_true", help="启用小消息合并 batch 帧")
+    parser.add_argument("--url", help="使用已运行的服务器（需实现 /drop 控制接口），不启动替身")
+    parser.add_argument("--reconnect-rate", type=float, default=0.0,
+                        help="进程级重连限速（次/秒，0 = 使用默认值）")
+    parser.add_argument("--drain-timeout", type=float, default=5.0, help="负载结束后等待投递完成的时间")
+    parser.add_argument("--reconnect-timeout", type=float, default=30.0, help="重连阶段超时")
+    parser.add_argument("--output", help="将 JSON 结果写入文件")
+    parser.add_argument("--json", action="store_true", help="输出 JSON 结果")
+    parser.add_argument("--compare", help="与基线 JSON 结果比较，回归时返回非零")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="回归判定容差（相对变化）")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        r = result["results"]
+        lat = r["latency_ms"]
+        print(f"clients={args.clients} rate={args.rate}/s size={args.size}B "
+              f"duration={args.duration}s fanout={args.fanout}")
+        print(f"sent={r['sent']} received={r['received']} lost={r['lost']} "
+              f"throughput={r['msgs_per_sec']} msg/s")
+        print(f"latency(ms) p50={lat['p50']} p99={lat['p99']} p999={lat['p999']} max={lat['max']}")
+        print(f"connect={r['connect_seconds']}s reconnect={r['reconnect_seconds']}s")
+        print(f"memory/conn rss={r['rss_bytes_per_conn']}B heap={r['heap_bytes_per_conn']}B")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print("WARNING baseline was recorded with a different config", file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""基准测试用的 Matrix 事件载荷"""
+
+import time
+from typing import Any, Dict, List
+
+
+def room_message(i: int) -> Dict[str, Any]:
+    """m.room.message 事件"""
+    return {
+        "type": "m.room.message",
+        "event_id": f"$evt{i:08d}:tianshu.example.com",
+        "room_id": "!governance:tianshu.example.com",
+        "sender": f"@agent-{i % 500:04d}:tianshu.example.com",
+        "origin_server_ts": int(time.time() * 1000) + i,
+        "content": {
+            "msgtype": "m.text",
+            "body": "任务执行完成：已写入 /data/report.md（共 128 行）",
+            "format": "org.matrix.custom.html",
+            "formatted_body": "<p>任务执行完成：已写入 <code>/data/report.md</code></p>",
+        },
+        "unsigned": {"age": 1234, "transaction_id": f"txn-{i}"},
+    }
+
+
+def agent_action(i: int) -> Dict[str, Any]:
+    """m.agent.action 事件（太白扩展）"""
+    return {
+        "type": "m.agent.action",
+        "event_id": f"$act{i:08d}:tianshu.example.com",
+        "room_id": "!audit:tianshu.example.com",
+        "sender": f"@agent-{i % 500:04d}:tianshu.example.com",
+        "origin_server_ts": int(time.time() * 1000) + i,
+        "content": {
+            "agent_id": f"agent-{i % 500:04d}",
+            "action_type": "file_write",
+            "detail": {"path": f"/workspace/src/module_{i}.py", "bytes": 4096 + i, "sha256": "ab" * 32},
+            "signature": "ed25519:" + "x" * 86,
+        },
+    }
+
+
+def room_state(members: int = 200) -> Dict[str, Any]:
+    """较大的房间状态快照（含成员列表）"""
+    return {
+        "room_id": "!governance:tianshu.example.com",
+        "state": [
+            {
+                "type": "m.room.member",
+                "state_key": f"@agent-{j:04d}:tianshu.example.com",
+                "sender": "@owner:tianshu.example.com",
+                "content": {"membership": "join", "displayname": f"Agent {j}", "avatar_url": None},
+                "origin_server_ts": 1700000000000 + j,
+            }
+            for j in range(members)
+        ],
+    }
+
+
+def sync_batch(n: int = 50) -> Dict[str, Any]:
+    """/sync 风格的批量事件"""
+    events: List[Dict[str, Any]] = []
+    for i in range(n):
+        events.append(room_message(i) if i % 2 else agent_action(i))
+    return {"next_batch": "s72595_4483_1934", "rooms": {"join": {"!governance:tianshu.example.com": {"timeline": {"events": events}}}}}
+
+
+SAMPLES = {
+    "room_message": room_message(1),
+    "agent_action": agent_action(1),
+    "room_state_200": room_state(200),
+    "sync_batch_50": sync_batch(50),
+}
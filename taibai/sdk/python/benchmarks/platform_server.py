@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""天枢 / 谛听 HTTP 替身服务器（基准测试用）
+
+实现 AsyncAgent / HeartbeatAggregator / AuditPipeline 用到的最小 HTTP 接口，天枢与谛听各监听一个端口：
+
+天枢：
+- ``GET /.well-known/tianshu-matrix``、``GET /api/v1/discovery``：发现；
+- ``POST /api/v1/agents/register``：分配 ``agent_id``；
+- ``POST /api/v1/agents/heartbeat``、``POST /api/v1/agents/heartbeat/batch``：心跳（单条 / 批量）。
+
+谛听：
+- ``POST /api/audit``、``POST /api/audit/batch``：审计事件（单条 / 批量）。
+
+``--latency`` 为每个请求增加固定处理延迟，``--no-batch`` 让批量接口返回 404（测量逐个上报的回退路径）。
+``rejected`` 中的 agent_id 的心跳返回 404（批量接口中为单项错误），用于测试逐项失败。
+两个服务的 ``GET /stats`` 返回按路由的请求数与条目数。
+
+用法：
+    python -m benchmarks.platform_server [--host 127.0.0.1] [--tianshu-port 0] [--diting-port 0]
+        [--latency 0] [--no-batch]
+启动后向 stdout 输出一行 ``PORTS <tianshu_port> <diting_port>``。
+"""
+
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Set
+
+from aiohttp import web
+
+
+class StandInPlatform:
+    """天枢 + 谛听替身：单进程两个 aiohttp 应用"""
+
+    def __init__(self, latency: float = 0.0, batch: bool = True):
+        self.latency = latency
+        self.batch = batch
+        self.requests: Counter = Counter()
+        self.items: Counter = Counter()
+        self.agents: Set[str] = set()        # 发送过心跳的 agent_id
+        self.rejected: Set[str] = set()      # 心跳被拒绝（未知 Agent）的 agent_id
+        self.started = time.time()
+        self._ids = itertools.count(1)
+        self._runners: List[web.AppRunner] = []
+
+        self.tianshu = web.Application()
+        self.tianshu.router.add_get("/.well-known/tianshu-matrix", self.handle_discovery)
+        self.tianshu.router.add_get("/api/v1/discovery", self.handle_discovery)
+        self.tianshu.router.add_post("/api/v1/agents/register", self.handle_register)
+        self.tianshu.router.add_post("/api/v1/agents/heartbeat", self.handle_heartbeat)
+        self.tianshu.router.add_post("/api/v1/agents/heartbeat/batch", self.handle_heartbeat_batch)
+        self.tianshu.router.add_get("/stats", self.handle_stats)
+
+        self.diting = web.Application()
+        self.diting.router.add_post("/api/audit", self.handle_audit)
+        self.diting.router.add_post("/api/audit/batch", self.handle_audit_batch)
+        self.diting.router.add_get("/stats", self.handle_stats)
+
+    async def start(self, host: str = "127.0.0.1", tianshu_port: int = 0, diting_port: int = 0) -> List[int]:
+        """启动两个服务，返回实际监听端口 [天枢, 谛听]"""
+        ports = []
+        for app, port in ((self.tianshu, tianshu_port), (self.diting, diting_port)):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, host, port, backlog=4096).start()
+            self._runners.append(runner)
+            ports.append(runner.addresses[0][1])
+        return ports
+
+    async def stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+    async def _enter(self, route: str):
+        self.requests[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def handle_discovery(self, request: web.Request) -> web.Response:
+        await self._enter("discovery")
+        return web.json_response({
+            "ok": True,
+            "api_base": f"http://{request.host}",
+            "ws_url": f"ws://{request.host}/ws",
+        })
+
+    async def handle_register(self, request: web.Request) -> web.Response:
+        await self._enter("register")
+        body = await request.json()
+        agent_id = f"sim-{next(self._ids)}"
+        self.items["register"] += 1
+        return web.json_response({"ok": True, "agent_id": agent_id, "owner_id": body.get("owner_id")})
+
+    async def handle_heartbeat(self, request: web.Request) -> web.Response:
+        await self._enter("heartbeat")
+        body = await request.json()
+        self.items["heartbeat"] += 1
+        if body.get("agent_id") in self.rejected:
+            return web.json_response({"ok": False, "error": "unknown agent"}, status=404)
+        self.agents.add(body.get("agent_id"))
+        return web.json_response({"ok": True})
+
+    async def handle_heartbeat_batch(self, request: web.Request) -> web.Response:
+        if not self.batch:
+            raise web.HTTPNotFound()
+        await self._enter("heartbeat_batch")
+        heartbeats = (await request.json()).get("heartbeats", [])
+        self.items["heartbeat"] += len(heartbeats)
+        results = []
+        for heartbeat in heartbeats:
+            if heartbeat.get("agent_id") in self.rejected:
+                results.append({"status": 404, "error": "unknown agent"})
+            else:
+                self.agents.add(heartbeat.get("agent_id"))
+                results.append({"status": 200, "data": {"ok": True}})
+        return web.json_response({"results": results})
+
+    async def handle_audit(self, request: web.Request) -> web.Response:
+        await self._enter("audit")
+        await request.read()
+        self.items["audit"] += 1
+        return web.json_response({"ok": True})
+
+    async def handle_audit_batch(self, request: web.Request) -> web.Response:
+        if not self.batch:
+            raise web.HTTPNotFound()
+        await self._enter("audit_batch")
+        events = (await request.json()).get("events", [])
+        self.items["audit"] += len(events)
+        return web.json_response({"results": [{"status": 200, "data": {"ok": True}} for _ in events]})
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime": round(time.time() - self.started, 3),
+            "requests": dict(self.requests),
+            "items": dict(self.items),
+            "heartbeat_agents": len(self.agents),
+        }
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.snapshot())
+
+
+async def _serve(args: argparse.Namespace):
+    platform = StandInPlatform(latency=args.latency / 1000.0, batch=not args.no_batch)
+    tianshu_port, diting_port = await platform.start(args.host, args.tianshu_port, args.diting_port)
+    print(f"PORTS {tianshu_port} {diting_port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await platform.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--tianshu-port", type=int, default=0, help="天枢监听端口（0 = 随机）")
+    parser.add_argument("--diting-port", type=int, default=0, help="谛听监听端口（0 = 随机）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的附加处理延迟（毫秒）")
+    parser.add_argument("--no-batch", action="store_true", help="批量接口返回 404")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
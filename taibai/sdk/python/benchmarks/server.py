@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""天枢 WebSocket 替身服务器（基准测试用）
+
+实现 WSClient / SubscriptionManager 用到的最小协议：
+- subscribe / unsubscribe（``event_type`` 或 ``event_types``），按 TopicTrie 模式路由；
+- heartbeat → ``{"type":"heartbeat_ack","id":...}``；
+- batch 帧拆包后逐条处理；
+- 其他事件：带 ``"fanout": true`` 时广播给所有订阅了该类型的连接，否则回送给发送方（原文转发，不重新编码）。
+
+``sessions=True`` 时实现可恢复会话（见 ``ziwei_taibai/session.py``）：首帧不是 resume 时下发
+``session``；下行事件带 ``seq`` 并保留到客户端 ack；上行消息按 ``seq`` 去重，每 ``ack_every`` 条回 ack；
+resume 未知会话时回 ``resume_failed`` 并开始新会话。
+
+控制接口：
+- ``POST /drop``：关闭全部连接（模拟天枢重启，用于测量重连耗时）；
+- ``GET /stats``：连接数与收发计数。
+
+用法：
+    python -m benchmarks.server [--host 127.0.0.1] [--port 0] [--sessions]
+启动后向 stdout 输出一行 ``PORT <port>``。
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from aiohttp import WSCloseCode, WSMsgType, web
+
+_sdk_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _sdk_path not in sys.path:
+    sys.path.insert(0, _sdk_path)
+
+from ziwei_taibai.topic import TopicTrie
+
+
+class _Session:
+    """替身服务器一侧的会话状态"""
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.ws: Optional[web.WebSocketResponse] = None
+        self.next_seq = 1
+        self.unacked: "OrderedDict[int, str]" = OrderedDict()  # 已下发未确认的事件
+        self.last_client_seq = 0
+        self.client_messages: List[Dict[str, Any]] = []        # 按 seq 去重后的上行消息
+        self.duplicates = 0
+
+    def ack(self, seq: int):
+        while self.unacked and next(iter(self.unacked)) <= seq:
+            self.unacked.popitem(last=False)
+
+
+class StandInServer:
+    """天枢替身：单进程 aiohttp WebSocket 服务"""
+
+    def __init__(self, sessions: bool = False, ack_every: int = 1):
+        """
+        Args:
+            sessions: 是否实现可恢复会话
+            ack_every: 会话模式下每收到多少条上行消息回一次 ack（0 = 不回）
+        """
+        self.connections: Set[web.WebSocketResponse] = set()
+        self.routes = TopicTrie()
+        self.received = 0
+        self.sent = 0
+        self.sessions_enabled = sessions
+        self.ack_every = ack_every
+        self.sessions: Dict[str, _Session] = {}
+        self._session_of: Dict[web.WebSocketResponse, _Session] = {}
+        self._session_ids = itertools.count(1)
+        self.app = web.Application()
+        self.app.router.add_get("/ws", self.handle_ws)
+        self.app.router.add_post("/drop", self.handle_drop)
+        self.app.router.add_get("/stats", self.handle_stats)
+        self._runner: Any = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """启动服务，返回实际监听端口"""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(compress=False)
+        await ws.prepare(request)
+        self.connections.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    data = json.loads(msg.data)
+                except ValueError:
+                    continue
+                if self.sessions_enabled and ws not in self._session_of:
+                    if await self._attach_session(ws, data):
+                        continue
+                if data.get("type") == "batch":
+                    for item in data.get("messages", []):
+                        await self._handle(ws, item, json.dumps(item))
+                else:
+                    await self._handle(ws, data, msg.data)
+        finally:
+            self.connections.discard(ws)
+            session = self._session_of.pop(ws, None)
+            if session is not None and session.ws is ws:
+                session.ws = None
+            for pattern in self.routes.patterns():
+                self.routes.remove(pattern, ws)
+        return ws
+
+    async def _handle(self, ws: web.WebSocketResponse, data: Dict[str, Any], raw: str):
+        self.received += 1
+        frame_type = data.get("type")
+        session = self._session_of.get(ws)
+        if session is not None:
+            if frame_type == "ack" or (frame_type == "heartbeat" and "ack" in data):
+                session.ack(int(data.get("ack", 0)))
+                if frame_type == "ack":
+                    return
+            seq = data.get("seq")
+            if isinstance(seq, int):
+                if seq <= session.last_client_seq:
+                    session.duplicates += 1
+                    return
+                session.last_client_seq = seq
+                session.client_messages.append(data)
+                if self.ack_every and len(session.client_messages) % self.ack_every == 0:
+                    await self._send(ws, json.dumps({"type": "ack", "ack": seq}))
+        if frame_type in ("subscribe", "unsubscribe"):
+            patterns = data.get("event_types") or [data.get("event_type")]
+            for pattern in patterns:
+                if frame_type == "subscribe":
+                    self.routes.add(pattern, ws)
+                else:
+                    self.routes.remove(pattern, ws)
+            return
+        if frame_type == "heartbeat":
+            await self._send(ws, json.dumps({"type": "heartbeat_ack", "id": data.get("id")}))
+            return
+        if data.get("fanout"):
+            for target in self.routes.match(frame_type or ""):
+                await self._deliver(target, data, raw)
+        else:
+            await self._deliver(ws, data, raw)
+
+    async def _attach_session(self, ws: web.WebSocketResponse, data: Dict[str, Any]) -> bool:
+        """为连接绑定会话：resume 帧恢复已有会话并补发未确认事件；返回该帧是否已处理"""
+        if data.get("type") == "resume":
+            session = self.sessions.get(data.get("session_id"))
+            if session is not None:
+                self._bind(ws, session)
+                session.ack(int(data.get("last_seq", 0)))
+                for raw in list(session.unacked.values()):
+                    await self._send(ws, raw)
+                return True
+            session = self._new_session(ws)
+            await self._send(ws, json.dumps({"type": "resume_failed", "session_id": session.id}))
+            return True
+        session = self._new_session(ws)
+        await self._send(ws, json.dumps({"type": "session", "session_id": session.id}))
+        return False
+
+    def _new_session(self, ws: web.WebSocketResponse) -> _Session:
+        session = _Session(f"session-{next(self._session_ids)}")
+        self.sessions[session.id] = session
+        self._bind(ws, session)
+        return session
+
+    def _bind(self, ws: web.WebSocketResponse, session: _Session):
+        if session.ws is not None:
+            self._session_of.pop(session.ws, None)
+        session.ws = ws
+        self._session_of[ws] = session
+
+    async def _deliver(self, ws: web.WebSocketResponse, data: Dict[str, Any], raw: str):
+        session = self._session_of.get(ws)
+        if session is None:
+            await self._send(ws, raw)
+        else:
+            await self.publish(session.id, data)
+
+    async def publish(self, session_id: str, event: Dict[str, Any]):
+        """会话模式：向会话下发事件（断开期间只保留，恢复后补发）"""
+        session = self.sessions[session_id]
+        raw = json.dumps({**event, "seq": session.next_seq})
+        session.unacked[session.next_seq] = raw
+        session.next_seq += 1
+        if session.ws is not None:
+            await self._send(session.ws, raw)
+
+    async def drop(self, forget: bool = False) -> int:
+        """关闭全部连接；forget=True 时同时丢弃会话（之后的 resume 将被拒绝）"""
+        connections = list(self.connections)
+        await asyncio.gather(
+            *(ws.close(code=WSCloseCode.SERVICE_RESTART) for ws in connections),
+            return_exceptions=True
+        )
+        if forget:
+            self.sessions.clear()
+            self._session_of.clear()
+        return len(connections)
+
+    async def _send(self, ws: web.WebSocketResponse, raw: str):
+        if ws.closed:
+            return
+        try:
+            await ws.send_str(raw)
+            self.sent += 1
+        except ConnectionError:
+            pass
+
+    async def handle_drop(self, request: web.Request) -> web.Response:
+        dropped = await self.drop(forget=request.query.get("forget") == "1")
+        return web.json_response({"dropped": dropped})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "connections": len(self.connections),
+            "received": self.received,
+            "sent": self.sent,
+        })
+
+
+async def _serve(host: str, port: int, sessions: bool = False):
+    server = StandInServer(sessions=sessions)
+    port = await server.start(host, port)
+    print(f"PORT {port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="监听端口（0 = 随机）")
+    parser.add_argument("--sessions", action="store_true", help="实现可恢复会话")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.sessions))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
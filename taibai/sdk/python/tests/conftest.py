@@ -0,0 +1,102 @@
+"""
+Shared fixtures for Taibai SDK tests
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest_asyncio
+from aiohttp import web
+
+# Add SDK to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.server import StandInServer  # noqa: E402
+from ziwei_taibai.http_client import HTTPClient  # noqa: E402
+from ziwei_taibai.pool import ConnectionPool  # noqa: E402
+from ziwei_taibai.ws_client import ReconnectRateLimiter, WSClient  # noqa: E402
+
+
+async def wait_until(predicate, timeout: float = 1.0, interval: float = 0.01) -> bool:
+    """Poll ``predicate`` until it is true or ``timeout`` elapses"""
+    for _ in range(max(1, int(timeout / interval))):
+        if predicate():
+            return True
+        await asyncio.sleep(interval)
+    return predicate()
+
+
+@pytest_asyncio.fixture
+async def serve():
+    """Start aiohttp applications on random local ports: ``base_url = await serve(app)``"""
+    runners = []
+
+    async def start(app: web.Application) -> str:
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        runners.append(runner)
+        return f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+    yield start
+    for runner in reversed(runners):
+        await runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def pool():
+    """A private connection pool, closed after the test"""
+    pool = ConnectionPool()
+    yield pool
+    await pool.close()
+
+
+@pytest_asyncio.fixture
+async def make_client(pool):
+    """Build HTTPClients on the test pool: ``client = make_client(base_url, **kwargs)``"""
+    clients = []
+
+    def make(base_url: str, **kwargs) -> HTTPClient:
+        client = HTTPClient(base_url, pool=pool, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+@pytest_asyncio.fixture
+async def ws_server():
+    """Start stand-in Tianshu WebSocket servers: ``server, url = await ws_server(sessions=True)``"""
+    servers = []
+
+    async def start(**kwargs):
+        server = StandInServer(**kwargs)
+        port = await server.start()
+        servers.append(server)
+        return server, f"ws://127.0.0.1:{port}/ws"
+
+    yield start
+    for server in servers:
+        await server.stop()
+
+
+@pytest_asyncio.fixture
+async def make_ws_client(pool):
+    """Build WSClients that reconnect quickly and are closed after the test"""
+    clients = []
+
+    def make(url: str, **kwargs) -> WSClient:
+        kwargs.setdefault("reconnect_delay", 0.01)
+        kwargs.setdefault("max_reconnect_delay", 0.05)
+        kwargs.setdefault("ping_interval", 0)
+        kwargs.setdefault("reconnect_limiter", ReconnectRateLimiter(rate=1000, burst=1000))
+        client = WSClient(url, pool=pool, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
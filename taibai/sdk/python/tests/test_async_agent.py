@@ -0,0 +1,46 @@
+"""
+Tests for AsyncAgent heartbeat registration and audit pipeline ownership
+"""
+
+import pytest
+
+from ziwei_taibai.async_agent import AsyncAgent
+from ziwei_taibai.audit import AuditPipeline
+from ziwei_taibai.heartbeat import HeartbeatAggregator
+from ziwei_taibai.pool import ConnectionPool
+
+BASE = "http://127.0.0.1:9"
+
+
+@pytest.mark.asyncio
+async def test_switching_aggregator_unregisters_from_previous():
+    pool = ConnectionPool()
+    first = HeartbeatAggregator(BASE, interval=3600, jitter=0.5, pool=pool)
+    second = HeartbeatAggregator(BASE, interval=3600, jitter=0.5, pool=pool)
+    agent = AsyncAgent("owner", tianshu_api_base=BASE, agent_id="agent-1", pool=pool)
+
+    agent.start_heartbeat(aggregator=first)
+    assert len(first) == 1 and first.running
+    agent.start_heartbeat(aggregator=second)
+    assert len(second) == 1
+
+    await agent.close()
+    assert len(first) == 0 and not first.running
+    assert len(second) == 0 and not second.running
+    assert not agent._unregistering
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_audit_pipeline_is_left_open(pool):
+    audit = AuditPipeline(f"{BASE}/api/audit", pool=pool)
+    shared = [AsyncAgent("owner", diting_audit_url=f"{BASE}/api/audit", pool=pool, audit=audit, close_audit=False)
+              for _ in range(2)]
+
+    await shared[0].close()
+    assert not audit.closed
+    assert shared[1].audit is audit
+
+    owner = AsyncAgent("owner", diting_audit_url=f"{BASE}/api/audit", pool=pool, audit=audit)
+    await owner.close()
+    assert audit.closed
@@ -0,0 +1,188 @@
+"""
+Tests for AuditPipeline in memory-queue mode
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from conftest import wait_until
+from ziwei_taibai.audit import AuditPipeline
+from ziwei_taibai.dispatch import OverflowPolicy
+
+
+@pytest_asyncio.fixture
+async def diting(serve):
+    """Stand-in Diting audit endpoint; requests wait on ``gate`` when it is set"""
+    state = {"batch": True, "status": 200, "gate": None, "batches": [], "singles": []}
+
+    async def wait_gate():
+        if state["gate"] is not None:
+            await state["gate"].wait()
+
+    async def batch(request):
+        if not state["batch"]:
+            raise web.HTTPNotFound()
+        events = (await request.json())["events"]
+        await wait_gate()
+        state["batches"].append([event["n"] for event in events])
+        return web.json_response({"results": [{"status": 200, "data": {"ok": True}} for _ in events]})
+
+    async def single(request):
+        event = await request.json()
+        await wait_gate()
+        state["singles"].append(event["n"])
+        return web.json_response({"ok": state["status"] == 200}, status=state["status"])
+
+    app = web.Application()
+    app.router.add_post("/audit/batch", batch)
+    app.router.add_post("/audit", single)
+    base_url = await serve(app)
+    yield f"{base_url}/audit", state
+    if state["gate"] is not None:
+        state["gate"].set()
+
+
+@pytest_asyncio.fixture
+async def make_pipeline(pool):
+    pipelines = []
+
+    def make(url, **kwargs):
+        kwargs.setdefault("flush_interval", 10.0)
+        pipeline = AuditPipeline(url, pool=pool, **kwargs)
+        pipelines.append(pipeline)
+        return pipeline
+
+    yield make
+    for pipeline in pipelines:
+        await pipeline.close(timeout=1)
+
+
+def _delivered(state):
+    return [n for batch in state["batches"] for n in batch] + state["singles"]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting(diting, make_pipeline):
+    url, state = diting
+    pipeline = make_pipeline(url, batch_size=5)
+    for n in range(5):
+        await pipeline.put({"n": n})
+    assert await wait_until(lambda: pipeline.stats().delivered == 5)
+    assert state["batches"] == [[0, 1, 2, 3, 4]]
+
+    # 不足一批的事件等待 flush_interval
+    for n in range(5, 8):
+        await pipeline.put({"n": n})
+    await asyncio.sleep(0.05)
+    assert pipeline.stats().delivered == 5
+    assert pipeline.stats().queue_depth == 3
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_sent_after_flush_interval(diting, make_pipeline):
+    url, state = diting
+    pipeline = make_pipeline(url, batch_size=100, flush_interval=0.05)
+    await pipeline.put({"n": 0})
+    await pipeline.put({"n": 1})
+    assert pipeline.stats().delivered == 0
+
+    assert await wait_until(lambda: pipeline.stats().delivered == 2)
+    assert state["batches"] == [[0, 1]]
+    assert pipeline.stats().queue_delay["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_on_overflow(diting, make_pipeline):
+    url, state = diting
+    pipeline = make_pipeline(url, maxsize=3)
+    for n in range(5):
+        pipeline.put_nowait({"n": n})
+
+    await pipeline.flush()
+    stats = pipeline.stats()
+    assert (stats.submitted, stats.dropped, stats.delivered) == (5, 2, 3)
+    assert _delivered(state) == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_space(diting, make_pipeline):
+    url, state = diting
+    pipeline = make_pipeline(url, maxsize=3, overflow=OverflowPolicy.BLOCK, flush_interval=0.05)
+    for n in range(3):
+        pipeline.put_nowait({"n": n})
+    with pytest.raises(asyncio.QueueFull):
+        pipeline.put_nowait({"n": 3})
+
+    putting = asyncio.ensure_future(pipeline.put({"n": 3}))
+    await asyncio.sleep(0.01)
+    assert not putting.done()
+
+    # flusher 取走事件后放行
+    await asyncio.wait_for(putting, 1)
+    await pipeline.flush()
+    assert sorted(_delivered(state)) == [0, 1, 2, 3]
+    assert pipeline.stats().dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_single_reports(diting, make_pipeline):
+    url, state = diting
+    state["batch"] = False
+    pipeline = make_pipeline(url)
+    for n in range(3):
+        await pipeline.put({"n": n})
+    await pipeline.flush()
+
+    assert sorted(state["singles"]) == [0, 1, 2]
+    stats = pipeline.stats()
+    assert stats.batched_flushes == 0
+    assert stats.requests == 1 + 3
+
+    # 不支持批量接口的结果被记住
+    await pipeline.put({"n": 3})
+    await pipeline.flush()
+    assert pipeline.stats().requests == 1 + 3 + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_reports_go_to_on_failure(diting, make_pipeline):
+    url, state = diting
+    state["batch"] = False
+    state["status"] = 400
+    failures = []
+    pipeline = make_pipeline(url, on_failure=lambda events, error: failures.append((events, error.status)))
+    await pipeline.put({"n": 0})
+    await pipeline.flush()
+
+    assert failures == [([{"n": 0}], 400)]
+    assert pipeline.stats().failed == 1
+
+
+@pytest.mark.asyncio
+async def test_close_drains_queue(diting, make_pipeline):
+    url, state = diting
+    pipeline = make_pipeline(url)
+    for n in range(5):
+        await pipeline.put({"n": n})
+    await pipeline.close()
+
+    assert state["batches"] == [[0, 1, 2, 3, 4]]
+    assert pipeline.closed
+    assert not pipeline.running
+    with pytest.raises(RuntimeError):
+        pipeline.put_nowait({"n": 5})
+
+
+@pytest.mark.asyncio
+async def test_close_gives_up_after_timeout(diting, make_pipeline):
+    url, state = diting
+    state["gate"] = asyncio.Event()
+    pipeline = make_pipeline(url)
+    await pipeline.put({"n": 0})
+
+    await asyncio.wait_for(pipeline.close(timeout=0.05), 1)
+    assert pipeline.closed
+    assert pipeline.stats().delivered == 0
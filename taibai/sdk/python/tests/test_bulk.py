@@ -0,0 +1,153 @@
+"""
+Tests for run_bulk batching, probing, fallback and per-item errors
+"""
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from ziwei_taibai.bulk import BulkItemError, run_bulk
+
+
+@pytest_asyncio.fixture
+async def bulk_server(serve, make_client):
+    """Server for POST /items/batch and POST /items; ``batch`` selects the batch endpoint's behaviour"""
+    state = {"batch": "ok", "batch_calls": [], "single_calls": []}
+
+    async def batch(request):
+        items = (await request.json())["items"]
+        state["batch_calls"].append(items)
+        mode = state["batch"]
+        if mode == "missing":
+            raise web.HTTPNotFound()
+        if mode == "json404":
+            return web.json_response({"error": "room not found"}, status=404)
+        if isinstance(mode, int):
+            return web.Response(status=mode, text="unsupported")
+        results = []
+        for item in items:
+            if item.get("fail"):
+                results.append({"status": 409, "error": "conflict"})
+            else:
+                results.append({"status": 200, "data": {"id": item["n"]}})
+        return web.json_response({"results": results})
+
+    async def single(request):
+        item = await request.json()
+        state["single_calls"].append(item)
+        return web.json_response({"id": item["n"]})
+
+    app = web.Application()
+    app.router.add_post("/items/batch", batch)
+    app.router.add_post("/items", single)
+    yield make_client(await serve(app)), state
+
+
+async def _run(http, items, **kwargs):
+    async def single(item):
+        response = await http.post("/items", data=item)
+        return response.data["id"]
+
+    kwargs.setdefault("parse", lambda data: data["id"])
+    return await run_bulk(http, items, single, "create item", batch_path="/items/batch", **kwargs)
+
+
+def _items(count):
+    return [{"n": n} for n in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_batch_success_in_chunks(bulk_server):
+    http, state = bulk_server
+    result = await _run(http, _items(250), batch_size=100)
+
+    assert result.batched
+    assert result.requests == 3
+    assert result.values == list(range(250))
+    assert sorted(len(chunk) for chunk in state["batch_calls"]) == [50, 100, 100]
+    assert state["single_calls"] == []
+
+
+@pytest.mark.asyncio
+async def test_first_chunk_probes_before_the_rest(bulk_server):
+    http, state = bulk_server
+    state["batch"] = 405
+    result = await _run(http, _items(250), batch_size=100)
+
+    # 只探测了第一块，之后全部逐个请求
+    assert len(state["batch_calls"]) == 1
+    assert not result.batched
+    assert result.requests == 1 + 250
+    assert result.values == list(range(250))
+
+    # 不支持的结果被记住，不再探测
+    result = await _run(http, _items(3))
+    assert len(state["batch_calls"]) == 1
+    assert result.requests == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["missing", 405, 501])
+async def test_falls_back_to_single_requests(bulk_server, mode):
+    http, state = bulk_server
+    state["batch"] = mode
+    result = await _run(http, _items(5))
+
+    assert not result.batched
+    assert result.ok
+    assert result.values == list(range(5))
+    assert len(state["single_calls"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_json_404_is_an_item_error_not_unsupported(bulk_server):
+    http, state = bulk_server
+    state["batch"] = "json404"
+    result = await _run(http, _items(2))
+
+    assert state["single_calls"] == []
+    assert [entry.error.status for entry in result.errors] == [404, 404]
+    assert result.errors[0].error.error == {"error": "room not found"}
+
+    # 资源不存在不等于接口不存在：之后仍走批量接口
+    state["batch"] = "ok"
+    result = await _run(http, _items(2))
+    assert result.batched
+    assert len(state["batch_calls"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_per_item_errors_are_mapped(bulk_server):
+    http, state = bulk_server
+    items = [{"n": 0}, {"n": 1, "fail": True}, {"n": 2}, {"n": 3}]
+
+    def parse(data):
+        if data["id"] == 3:
+            raise ValueError("bad item")
+        return data["id"]
+
+    result = await _run(http, items, parse=parse)
+
+    assert result.batched
+    assert [entry.index for entry in result.errors] == [1, 3]
+    error = result.errors[0].error
+    assert isinstance(error, BulkItemError)
+    assert (error.status, error.error) == (409, "conflict")
+    assert isinstance(result.errors[1].error, ValueError)
+    assert result.values == [0, 2]
+    with pytest.raises(BulkItemError):
+        result.raise_for_errors()
+
+
+@pytest.mark.asyncio
+async def test_missing_results_are_errors(serve, make_client):
+    async def batch(request):
+        return web.json_response({"results": [{"status": 200, "data": {"id": 0}}]})
+
+    app = web.Application()
+    app.router.add_post("/items/batch", batch)
+    http = make_client(await serve(app))
+    result = await _run(http, _items(2))
+
+    assert result.values == [0]
+    assert "missing result" in str(result.errors[0].error)
@@ -0,0 +1,119 @@
+"""
+Tests for CachedRoomAPI invalidation and stale-serve
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from conftest import wait_until
+from ziwei_taibai.cache import CachedRoomAPI, TTLCache
+
+
+@pytest_asyncio.fixture
+async def room_server(serve, make_client):
+    """Server for GET /api/rooms/{id} and /api/rooms; responses wait on ``gate`` when it is set"""
+    state = {"version": 1, "calls": 0, "gate": None}
+
+    async def wait_gate():
+        state["calls"] += 1
+        if state["gate"] is not None:
+            await state["gate"].wait()
+
+    async def get_room(request):
+        version = state["version"]
+        await wait_gate()
+        return web.json_response({"id": request.match_info["id"], "name": f"v{version}"})
+
+    async def list_rooms(request):
+        version = state["version"]
+        await wait_gate()
+        return web.json_response({"rooms": [{"id": "r1", "name": f"v{version}"}]})
+
+    app = web.Application()
+    app.router.add_get("/api/rooms/{id}", get_room)
+    app.router.add_get("/api/rooms", list_rooms)
+    yield CachedRoomAPI(make_client(await serve(app)), ttl=60.0), state
+    if state["gate"] is not None:
+        state["gate"].set()
+
+
+@pytest.mark.asyncio
+async def test_fresh_hit_skips_request(room_server):
+    api, state = room_server
+    await api.get_room("r1")
+    await api.get_room("r1")
+    assert state["calls"] == 1
+    assert api.cache_stats().hits == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_get_is_not_overwritten(room_server):
+    api, state = room_server
+    state["gate"] = asyncio.Event()
+    pending = asyncio.ensure_future(api.get_room("r1"))
+    await wait_until(lambda: state["calls"] >= 1)
+
+    state["version"] = 2
+    api.invalidate_room("r1")
+    state["gate"].set()
+    assert (await pending).name == "v1"
+
+    # 失效前发出的请求的结果不应写回缓存
+    assert api.cache.get(("room", "r1")) is None
+    assert (await api.get_room("r1")).name == "v2"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_first_list_is_not_overwritten(room_server):
+    api, state = room_server
+    state["gate"] = asyncio.Event()
+    pending = asyncio.ensure_future(api.list_rooms())
+    await wait_until(lambda: state["calls"] >= 1)
+
+    state["version"] = 2
+    api.invalidate_room("r1")
+    state["gate"].set()
+    await pending
+
+    assert (await api.list_rooms())[0].name == "v2"
+
+
+@pytest.mark.asyncio
+async def test_clear_during_get_is_not_overwritten(room_server):
+    api, state = room_server
+    state["gate"] = asyncio.Event()
+    pending = asyncio.ensure_future(api.get_room("r1"))
+    await wait_until(lambda: state["calls"] >= 1)
+
+    api.invalidate_room()
+    state["gate"].set()
+    await pending
+    assert len(api.cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_serves_stale(room_server):
+    api, state = room_server
+    api.cache.ttl = 0.0
+    first = await api.get_room("r1")
+
+    state["gate"] = asyncio.Event()
+    api._http.timeout = aiohttp.ClientTimeout(total=0.05)
+    assert await api.get_room("r1") is first
+    assert api.cache_stats().stale_served == 1
+
+
+def test_loads_are_released():
+    cache = TTLCache()
+    token = cache.begin_load("k")
+    cache.invalidate("k")
+    assert not cache.complete_load("k", token, 1)
+    assert cache.loading_keys() == []
+
+    token = cache.begin_load("k")
+    assert cache.complete_load("k", token, 2)
+    assert cache.get("k").value == 2
@@ -0,0 +1,38 @@
+"""
+Tests for the pluggable codecs
+"""
+
+import json
+
+import pytest
+
+from ziwei_taibai.codec import DecodeError, available_codecs, get_codec
+
+EVENT = {
+    "type": "m.room.message",
+    "room_id": "!room:ziwei",
+    "content": {"body": "你好, world", "n": [1, 2.5, None, True]},
+}
+
+
+def test_json_codecs_exclude_binary():
+    assert "json" in available_codecs()
+    assert not any(get_codec(name).binary for name in available_codecs())
+    assert set(available_codecs()) <= set(available_codecs(binary=True))
+
+
+@pytest.mark.parametrize("name", available_codecs())
+def test_json_codec_round_trip(name):
+    codec = get_codec(name)
+    raw = json.dumps(EVENT).encode()
+    assert codec.loads(raw) == EVENT
+    assert codec.loads(codec.dumps(EVENT)) == EVENT
+    assert json.loads(codec.dumps_str(EVENT)) == EVENT
+    with pytest.raises(DecodeError):
+        codec.loads(b"{not json")
+
+
+@pytest.mark.parametrize("name", available_codecs(binary=True))
+def test_every_codec_round_trips(name):
+    codec = get_codec(name)
+    assert codec.loads(codec.dumps(EVENT)) == EVENT
@@ -0,0 +1,61 @@
+"""
+Tests for DiscoveryCache probing
+"""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from ziwei_taibai.discovery import DISCOVERY_PATHS, DiscoveryCache
+
+
+@pytest_asyncio.fixture
+async def discovery_server(serve, pool):
+    """Discovery endpoints answering with ``state["status"]``, optionally after ``state["delay"]``"""
+    state = {"calls": 0, "status": 200, "delay": 0.0}
+
+    async def handler(request):
+        state["calls"] += 1
+        await asyncio.sleep(state["delay"])
+        return web.json_response({"ok": True, "api_base": "http://tianshu"}, status=state["status"])
+
+    app = web.Application()
+    for path in DISCOVERY_PATHS:
+        app.router.add_get(path, handler)
+    yield await serve(app), pool, state
+
+
+@pytest.mark.asyncio
+async def test_probe_success_is_cached(discovery_server):
+    base, pool, state = discovery_server
+    cache = DiscoveryCache(persist=False, timeout=1.0)
+    assert (await cache.get(base, pool=pool))["api_base"] == "http://tianshu"
+    await cache.get(base, pool=pool)
+    assert cache.stats.refreshes == 1
+    assert cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_probe_failure_is_not_retried(discovery_server):
+    base, pool, state = discovery_server
+    state["status"] = 503
+    cache = DiscoveryCache(persist=False, timeout=1.0)
+    with pytest.raises(RuntimeError):
+        await cache.get(base, pool=pool)
+    assert state["calls"] == len(DISCOVERY_PATHS)
+    assert cache.stats.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_probe_is_bounded_by_timeout(discovery_server):
+    base, pool, state = discovery_server
+    state["delay"] = 1.0
+    cache = DiscoveryCache(persist=False, timeout=0.2)
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="发现天枢失败"):
+        await cache.get(base, pool=pool)
+    assert time.monotonic() - started < 1.0
+    assert cache.stats.failures == 1
@@ -0,0 +1,117 @@
+"""
+Tests for per-subscriber dispatch queues
+"""
+
+import asyncio
+
+import pytest
+
+from ziwei_taibai.dispatch import Dispatcher, OverflowPolicy, Subscriber
+
+
+@pytest.mark.asyncio
+async def test_failed_callback_not_counted_as_delivered():
+    """Callback errors count as errors only"""
+    def callback(item):
+        if item == "bad":
+            raise RuntimeError("boom")
+
+    subscriber = Subscriber(callback)
+    await subscriber.put("ok")
+    await subscriber.put("bad")
+    await subscriber.stop(drain=True)
+
+    assert subscriber.stats.delivered == 1
+    assert subscriber.stats.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_space():
+    """BLOCK applies backpressure instead of dropping"""
+    release = asyncio.Event()
+    seen = []
+
+    async def callback(item):
+        await release.wait()
+        seen.append(item)
+
+    subscriber = Subscriber(callback, maxsize=1, overflow=OverflowPolicy.BLOCK)
+    await subscriber.put(1)
+    await asyncio.sleep(0)          # worker takes item 1 and waits
+    await subscriber.put(2)         # fills the queue
+    blocked = asyncio.ensure_future(subscriber.put(3))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    assert await asyncio.wait_for(blocked, 1) is True
+    await subscriber.stop(drain=True)
+    assert seen == [1, 2, 3]
+    assert subscriber.stats.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest():
+    """DROP_OLDEST discards the oldest queued item"""
+    release = asyncio.Event()
+    seen = []
+
+    async def callback(item):
+        await release.wait()
+        seen.append(item)
+
+    subscriber = Subscriber(callback, maxsize=2, overflow=OverflowPolicy.DROP_OLDEST)
+    await subscriber.put(1)
+    await asyncio.sleep(0)          # worker holds item 1
+    for item in (2, 3, 4):
+        await subscriber.put(item)
+
+    release.set()
+    await subscriber.stop(drain=True)
+    assert seen == [1, 3, 4]
+    assert subscriber.stats.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_removes_subscriber():
+    """DISCONNECT drops the overflowing subscriber from the dispatcher"""
+    release = asyncio.Event()
+
+    async def slow(item):
+        await release.wait()
+
+    fast_seen = []
+    dispatcher = Dispatcher()
+    dispatcher.add(slow, maxsize=1, overflow=OverflowPolicy.DISCONNECT, name="slow")
+    dispatcher.add(fast_seen.append, name="fast")
+    dispatcher.start()
+
+    await dispatcher.dispatch(1)
+    await asyncio.sleep(0)
+    await dispatcher.dispatch(2)
+    await dispatcher.dispatch(3)    # slow subscriber overflows
+
+    names = [stats.name for stats in dispatcher.stats()]
+    assert names == ["fast"]
+    release.set()
+    await dispatcher.stop(drain=True)
+    assert fast_seen == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_stop_drain_processes_remaining():
+    """stop(drain=True) delivers everything already queued"""
+    seen = []
+
+    async def callback(item):
+        await asyncio.sleep(0.001)
+        seen.append(item)
+
+    subscriber = Subscriber(callback, maxsize=100)
+    for item in range(20):
+        await subscriber.put(item)
+    await subscriber.stop(drain=True)
+
+    assert seen == list(range(20))
+    assert subscriber.stats.delivered == 20
+    assert not subscriber.running
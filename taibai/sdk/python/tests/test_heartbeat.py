@@ -0,0 +1,130 @@
+"""
+Tests for HeartbeatAggregator against the stand-in Tianshu platform
+"""
+
+import pytest
+import pytest_asyncio
+
+from benchmarks.platform_server import StandInPlatform
+from conftest import wait_until
+from ziwei_taibai.bulk import BulkItemError
+from ziwei_taibai.heartbeat import HeartbeatAggregator
+
+
+@pytest_asyncio.fixture
+async def platform():
+    """Start stand-in platforms: ``platform, tianshu_url = await platform(batch=False)``"""
+    platforms = []
+
+    async def start(**kwargs):
+        server = StandInPlatform(**kwargs)
+        tianshu_port, _ = await server.start()
+        platforms.append(server)
+        return server, f"http://127.0.0.1:{tianshu_port}"
+
+    yield start
+    for server in platforms:
+        await server.stop()
+
+
+@pytest_asyncio.fixture
+async def make_aggregator(pool):
+    aggregators = []
+
+    def make(url, **kwargs):
+        kwargs.setdefault("jitter", 0.0)
+        aggregator = HeartbeatAggregator(url, pool=pool, **kwargs)
+        aggregators.append(aggregator)
+        return aggregator
+
+    yield make
+    for aggregator in aggregators:
+        await aggregator.close()
+
+
+class _PendingAgent:
+    """An agent that has not been registered with Tianshu yet"""
+    agent_id = None
+
+
+def _register(aggregator, agent_ids):
+    results = {agent_id: [] for agent_id in agent_ids}
+    for agent_id in agent_ids:
+        aggregator.register(agent_id, results[agent_id].append)
+    return results
+
+
+@pytest.mark.asyncio
+async def test_one_batched_post_per_interval(platform, make_aggregator):
+    server, url = await platform()
+    aggregator = make_aggregator(url, interval=0.1)
+    results = _register(aggregator, [f"agent-{n}" for n in range(20)])
+
+    assert await wait_until(lambda: aggregator.stats().rounds >= 2)
+    rounds = aggregator.stats().rounds
+    assert server.requests["heartbeat_batch"] == rounds
+    assert server.requests["heartbeat"] == 0
+    assert server.items["heartbeat"] == 20 * rounds
+    assert all(len(received) >= rounds and received[0].ok for received in results.values())
+    assert aggregator.stats().batched_rounds == rounds
+
+
+@pytest.mark.asyncio
+async def test_agents_over_batch_size_are_chunked(platform, make_aggregator):
+    server, url = await platform()
+    aggregator = make_aggregator(url, interval=0.2, batch_size=10)
+    results = _register(aggregator, [f"agent-{n}" for n in range(25)])
+
+    assert await wait_until(lambda: aggregator.stats().rounds >= 1)
+    assert server.requests["heartbeat_batch"] == 3
+    assert server.items["heartbeat"] == 25
+    assert all(received and received[0].ok for received in results.values())
+
+
+@pytest.mark.asyncio
+async def test_per_item_errors_reach_their_agents(platform, make_aggregator):
+    server, url = await platform()
+    server.rejected.add("agent-1")
+    aggregator = make_aggregator(url, interval=60.0)
+    results = _register(aggregator, ["agent-0", "agent-1", "agent-2"])
+    unregistered = []
+    aggregator.register(_PendingAgent(), unregistered.append)
+
+    assert await wait_until(lambda: aggregator.stats().rounds == 1)
+    assert server.requests["heartbeat_batch"] == 1
+    assert [results[a][0].ok for a in ("agent-0", "agent-1", "agent-2")] == [True, False, True]
+    error = results["agent-1"][0].error
+    assert isinstance(error, BulkItemError) and error.status == 404
+    assert not unregistered[0].ok and isinstance(unregistered[0].error, ValueError)
+    assert aggregator.stats().failures == 1
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_single_posts_on_404(platform, make_aggregator):
+    server, url = await platform(batch=False)
+    aggregator = make_aggregator(url, interval=60.0)
+    results = _register(aggregator, [f"agent-{n}" for n in range(5)])
+
+    assert await wait_until(lambda: aggregator.stats().rounds == 1)
+    assert server.requests["heartbeat"] == 5
+    assert all(received[0].ok for received in results.values())
+    assert aggregator.stats().requests == 1 + 5
+
+    # 不支持批量接口的结果被记住（beat() 立即发送一次，不影响周期调度）
+    await aggregator.beat()
+    assert server.requests["heartbeat"] == 10
+    assert aggregator.stats().requests == 1 + 5 + 5
+    assert aggregator.stats().batched_rounds == 0
+
+
+@pytest.mark.asyncio
+async def test_last_unregister_stops_aggregator(platform, make_aggregator):
+    _, url = await platform()
+    aggregator = make_aggregator(url, interval=60.0)
+    _register(aggregator, ["agent-0", "agent-1"])
+    assert aggregator.running
+
+    await aggregator.unregister("agent-0")
+    assert aggregator.running
+    await aggregator.unregister("agent-1")
+    assert not aggregator.running
@@ -0,0 +1,112 @@
+"""
+Tests for HTTPClient GET coalescing
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from conftest import wait_until
+from ziwei_taibai.http_client import HTTPClient
+
+
+@pytest_asyncio.fixture
+async def slow_server(serve, make_client):
+    """Server whose GET /api/slow takes until the test releases it"""
+    state = {"calls": 0, "release": asyncio.Event()}
+
+    async def handler(request):
+        state["calls"] += 1
+        await state["release"].wait()
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/api/slow", handler)
+    client = make_client(await serve(app), coalesce_gets=True)
+    yield client, state
+    state["release"].set()
+
+
+@pytest.mark.asyncio
+async def test_identical_gets_coalesce(slow_server):
+    client, state = slow_server
+    first = asyncio.ensure_future(client.get("/api/slow"))
+    second = asyncio.ensure_future(client.get("/api/slow"))
+    await wait_until(lambda: state["calls"] >= 1)
+    state["release"].set()
+
+    assert (await first) is (await second)
+    assert state["calls"] == 1
+    assert client.resilience_stats().coalesced == 1
+
+
+@pytest.mark.asyncio
+async def test_different_timeout_or_route_not_coalesced(slow_server):
+    client, state = slow_server
+    requests = [
+        asyncio.ensure_future(client.get("/api/slow", timeout=30)),
+        asyncio.ensure_future(client.get("/api/slow", timeout=5)),
+        asyncio.ensure_future(client.get("/api/slow", timeout=30, route="/api/{name}")),
+    ]
+    await wait_until(lambda: state["calls"] >= 3)
+    state["release"].set()
+    await asyncio.gather(*requests)
+
+    assert state["calls"] == 3
+    assert client.resilience_stats().coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_keeps_shared_request(slow_server):
+    client, state = slow_server
+    cancelled = asyncio.ensure_future(client.get("/api/slow"))
+    waiting = asyncio.ensure_future(client.get("/api/slow"))
+    await wait_until(lambda: state["calls"] >= 1)
+
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    state["release"].set()
+
+    response = await asyncio.wait_for(waiting, 2)
+    assert response.status == 200
+    assert state["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_all_waiters_cancels_shared_request(slow_server):
+    client, state = slow_server
+    first = asyncio.ensure_future(client.get("/api/slow"))
+    second = asyncio.ensure_future(client.get("/api/slow"))
+    await wait_until(lambda: state["calls"] >= 1)
+    shared = next(iter(client._inflight.values()))
+
+    first.cancel()
+    second.cancel()
+    await asyncio.gather(first, second, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert shared.cancelled()
+    assert not client._inflight
+
+
+@pytest.mark.asyncio
+async def test_coalescing_is_opt_in(slow_server):
+    client, state = slow_server
+    client.coalesce_gets = False
+    requests = [asyncio.ensure_future(client.get("/api/slow")) for _ in range(2)]
+    await wait_until(lambda: state["calls"] >= 2)
+    shared = asyncio.ensure_future(client.get("/api/slow", coalesce=True))
+    joined = asyncio.ensure_future(client.get("/api/slow", coalesce=True))
+    await wait_until(lambda: state["calls"] >= 3)
+    state["release"].set()
+    await asyncio.gather(*requests, shared, joined)
+
+    assert state["calls"] == 3
+    assert client.resilience_stats().coalesced == 1
+
+
+def test_default_client_does_not_coalesce():
+    assert not HTTPClient("http://localhost").coalesce_gets
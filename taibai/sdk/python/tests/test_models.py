@@ -0,0 +1,45 @@
+"""
+Tests for Room / Message models and decoders
+"""
+
+import dataclasses
+import pickle
+
+from ziwei_taibai.models import Message, Room, decode_message, decode_room, decode_rooms
+
+
+def test_null_list_fields_decode_as_empty():
+    assert decode_room({"id": "r1", "members": None}).members == []
+    assert decode_rooms({"rooms": None}) == []
+    assert decode_rooms({}) == []
+
+
+def test_models_are_dataclasses():
+    room = decode_room({"id": "r1", "name": "n", "owner": "o", "members": ["a"], "metadata": {"k": 1}})
+    assert dataclasses.is_dataclass(room)
+    assert [f.name for f in dataclasses.fields(Room)] == ["id", "name", "owner", "members", "created_at", "metadata"]
+    assert dataclasses.asdict(room) == room.to_dict() == {
+        "id": "r1", "name": "n", "owner": "o", "members": ["a"], "created_at": None, "metadata": {"k": 1},
+    }
+    renamed = dataclasses.replace(room, name="m")
+    assert renamed.name == "m" and renamed.members == ["a"]
+    assert renamed != room
+    assert not hasattr(room, "__dict__")
+
+
+def test_lazy_metadata_matches_eager():
+    data = {"id": "m1", "sender": "a", "recipient": "b", "content": "hi", "metadata": {"k": [1, 2]}}
+    lazy = decode_message(data, lazy_metadata=True)
+    assert type(lazy._metadata) is bytes
+    assert lazy == decode_message(data)
+    assert lazy.metadata == {"k": [1, 2]}
+    assert dataclasses.replace(lazy, content="x").metadata == {"k": [1, 2]}
+
+
+def test_defaults_repr_and_pickle():
+    message = Message("m1", "a", "b", "hi")
+    assert message.type == "text" and message.timestamp is None and message.metadata is None
+    assert repr(message) == (
+        "Message(id='m1', sender='a', recipient='b', content='hi', type='text', timestamp=None, metadata=None)"
+    )
+    assert pickle.loads(pickle.dumps(message)) == message
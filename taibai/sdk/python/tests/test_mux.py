@@ -0,0 +1,81 @@
+"""
+Tests for the WebSocket multiplexer
+"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from conftest import wait_until
+from ziwei_taibai.mux import Multiplexer, get_shared_multiplexer
+
+URL = "ws://127.0.0.1:9/ws"
+
+
+def test_shared_multiplexer_per_event_loop():
+    """Each event loop gets its own shared multiplexer"""
+    async def get():
+        first = get_shared_multiplexer(URL)
+        assert get_shared_multiplexer(URL) is first
+        return first
+
+    assert asyncio.run(get()) is not asyncio.run(get())
+
+
+def _pending_reopens():
+    return [
+        task for task in asyncio.all_tasks()
+        if not task.done() and task.get_coro().__qualname__.endswith("_reopen_channels")
+    ]
+
+
+async def _open_mux(make_ws_client, url):
+    mux = Multiplexer(make_ws_client(url))
+    await mux.connect()
+    opens = Counter()
+    events = []
+    for channel_id in ("agent-1", "agent-2"):
+        channel = await mux.open_channel(channel_id)
+        # 替身服务器回送 channel_open 帧，按通道计数
+        channel.on_message(
+            lambda msg: opens.update([msg.data["channel"]]) if msg.data.get("type") == "channel_open" else None
+        )
+    await mux.get_channel("agent-1").subscriptions.subscribe("room.*", events.append)
+    return mux, opens, events
+
+
+@pytest.mark.asyncio
+async def test_reconnect_reopens_channels_and_subscriptions(ws_server, make_ws_client):
+    server, url = await ws_server()
+    mux, opens, events = await _open_mux(make_ws_client, url)
+    sender = make_ws_client(url)
+    await sender.connect()
+    await sender.send({"type": "room.msg", "fanout": True, "channel": "agent-1", "n": 1})
+    assert await wait_until(lambda: len(events) == 1)
+    assert opens == {"agent-1": 1, "agent-2": 1}
+
+    await server.drop()
+    assert await wait_until(lambda: opens["agent-1"] == 2 and opens["agent-2"] == 2, timeout=2.0)
+
+    # 订阅在新连接上恢复
+    assert await wait_until(lambda: sender.is_connected)
+    await sender.send({"type": "room.msg", "fanout": True, "channel": "agent-1", "n": 2})
+    assert await wait_until(lambda: [e["n"] for e in events] == [1, 2])
+    assert mux.stats().routed >= 2
+
+    await mux.close()
+    assert _pending_reopens() == []
+    assert mux.channels == []
+
+
+@pytest.mark.asyncio
+async def test_close_during_reopen_leaves_no_pending_task(ws_server, make_ws_client):
+    server, url = await ws_server()
+    mux, _, _ = await _open_mux(make_ws_client, url)
+
+    await server.drop()
+    assert await wait_until(lambda: mux.ws.reconnect_stats().successes >= 2, timeout=2.0)
+    await mux.close()
+
+    assert _pending_reopens() == []
@@ -0,0 +1,203 @@
+"""
+Tests for OutboundQueue backpressure, batch coalescing and flush
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from conftest import wait_until
+from ziwei_taibai.outbound import OutboundQueue
+
+
+class _Sink:
+    """Records frames like a WebSocket; each write waits for a permit when ``permits`` is set"""
+
+    def __init__(self, permits=None):
+        self.frames = []
+        self.permits = asyncio.Semaphore(permits) if permits is not None else None
+        self.error = None
+
+    async def send_str(self, data):
+        await self._write(data)
+
+    async def send_bytes(self, data):
+        await self._write(data)
+
+    async def _write(self, frame):
+        if self.permits is not None:
+            await self.permits.acquire()
+        if self.error is not None:
+            raise self.error
+        self.frames.append(frame)
+
+    async def write(self, frame):
+        if isinstance(frame, bytes):
+            await self.send_bytes(frame)
+        else:
+            await self.send_str(frame)
+
+    def release(self, count):
+        for _ in range(count):
+            self.permits.release()
+
+
+def _msg(n):
+    return json.dumps({"n": n})
+
+
+async def _put_all(queue, items, **kwargs):
+    for item in items:
+        await queue.put(item, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_drain_blocks_between_high_and_low_water():
+    sink = _Sink(permits=0)
+    queue = OutboundQueue(sink.write, maxsize=10, high_water=8, low_water=2)
+    await _put_all(queue, [_msg(n) for n in range(8)], coalesce=False)
+    queue.start()
+
+    draining = asyncio.ensure_future(queue.drain())
+    await asyncio.sleep(0.02)
+    assert not draining.done()
+
+    # 深度回落到高水位以下但仍高于低水位：继续阻塞
+    sink.release(4)
+    assert await wait_until(lambda: queue.stats.queue_depth == 4)
+    await asyncio.sleep(0.02)
+    assert not draining.done()
+
+    sink.release(2)
+    await asyncio.wait_for(draining, 1)
+    assert queue.stats.max_queue_depth == 8
+
+    sink.release(2)
+    assert await queue.flush(timeout=1)
+    assert sink.frames == [_msg(n) for n in range(8)]
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_drain_returns_immediately_below_high_water():
+    queue = OutboundQueue(_Sink().write, maxsize=10, high_water=8, low_water=2)
+    await _put_all(queue, [_msg(n) for n in range(7)])
+    await asyncio.wait_for(queue.drain(), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_small_messages_coalesce_into_batch_frame():
+    sink = _Sink()
+    queue = OutboundQueue(sink.write, coalesce=True)
+    await _put_all(queue, [_msg(n) for n in range(3)])
+    queue.start()
+    assert await queue.flush(timeout=1)
+
+    assert len(sink.frames) == 1
+    assert json.loads(sink.frames[0]) == {"type": "batch", "messages": [{"n": n} for n in range(3)]}
+    stats = queue.stats
+    assert (stats.frames_sent, stats.messages_sent, stats.batches_sent) == (1, 3, 1)
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_respects_message_limit():
+    sink = _Sink()
+    queue = OutboundQueue(sink.write, coalesce=True, max_batch_messages=2)
+    await _put_all(queue, [_msg(n) for n in range(5)])
+    queue.start()
+    assert await queue.flush(timeout=1)
+
+    assert [len(json.loads(f).get("messages", [None])) for f in sink.frames] == [2, 2, 1]
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_item_that_does_not_fit_is_carried_to_next_frame():
+    sink = _Sink()
+    queue = OutboundQueue(sink.write, coalesce=True, max_batch_bytes=20, small_message_bytes=16)
+    big = json.dumps({"body": "x" * 32})
+    await _put_all(queue, [_msg(0), _msg(1), _msg(2), big, _msg(3)])
+    queue.start()
+    assert await queue.flush(timeout=1)
+
+    # {"n": 0} 为 8 字节：两条合并后放不下第三条；超过 small_message_bytes 的消息单独成帧
+    assert sink.frames == [
+        '{"type":"batch","messages":[' + _msg(0) + "," + _msg(1) + "]}",
+        _msg(2),
+        big,
+        _msg(3),
+    ]
+    assert queue._carry is None
+    assert queue.stats.messages_sent == 5
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_binary_and_non_coalescable_frames_are_sent_alone():
+    sink = _Sink()
+    queue = OutboundQueue(sink.write, coalesce=True)
+    await queue.put(_msg(0))
+    await queue.put(b"\x81\xa1n\x01", coalesce=False)
+    await queue.put(_msg(2))
+    await queue.put(_msg(3))
+    queue.start()
+    assert await queue.flush(timeout=1)
+
+    assert sink.frames[:2] == [_msg(0), b"\x81\xa1n\x01"]
+    assert json.loads(sink.frames[2]) == {"type": "batch", "messages": [{"n": 2}, {"n": 3}]}
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_write_error_fails_waiters():
+    sink = _Sink()
+    sink.error = ConnectionError("closed")
+    queue = OutboundQueue(sink.write)
+    queue.start()
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(queue.put(_msg(0), wait=True), 1)
+    assert queue.stats.errors == 1
+    assert queue.depth == 0
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_waits_for_writes_and_stop_cancels_the_rest():
+    sink = _Sink(permits=0)
+    ready = asyncio.Event()
+    queue = OutboundQueue(sink.write, ready=ready)
+    queue.start()
+    await _put_all(queue, [_msg(0), _msg(1)])
+    assert not await queue.flush(timeout=0.05)
+
+    ready.set()
+    sink.release(2)
+    assert await queue.flush(timeout=1)
+    assert sink.frames == [_msg(0), _msg(1)]
+
+    # 未写出的消息在 stop() 时取消，on_dequeued 仍会被调用
+    ready.clear()
+    dequeued = []
+    pending = asyncio.ensure_future(queue.put(_msg(2), wait=True, on_dequeued=lambda: dequeued.append(2)))
+    await asyncio.sleep(0.01)
+    await queue.stop()
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+    assert dequeued == [2]
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_queued_messages(ws_server, make_ws_client):
+    server, url = await ws_server()
+    client = make_ws_client(url, send_queue_size=5000)
+    await client.connect()
+
+    for n in range(2000):
+        await client.send({"type": "notice", "n": n, "body": "x" * 256})
+    await client.close()
+
+    assert client.send_stats().messages_sent == 2000
+    assert await wait_until(lambda: server.received == 2000)
@@ -0,0 +1,63 @@
+"""
+Tests for Paginator offset/cursor paging and malformed pages
+"""
+
+import pytest
+from aiohttp import web
+
+from ziwei_taibai.pagination import Paginator
+
+
+async def _paginator(serve, make_client, handler, **kwargs):
+    app = web.Application()
+    app.router.add_get("/rooms", handler)
+    http = make_client(await serve(app))
+    return Paginator(http, "/rooms", "rooms", lambda item: item["n"], **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_offset_pages_stop_at_total(serve, make_client):
+    requests = []
+
+    async def handler(request):
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        requests.append(offset)
+        rooms = [{"n": n} for n in range(offset, min(offset + limit, 7))]
+        return web.json_response({"rooms": rooms, "total": 7})
+
+    paginator = await _paginator(serve, make_client, handler, page_size=3)
+    assert await paginator.collect() == list(range(7))
+    assert sorted(requests) == [0, 3, 6]
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages(serve, make_client):
+    async def handler(request):
+        cursor = int(request.query.get("cursor", 0))
+        body = {"rooms": [{"n": cursor}, {"n": cursor + 1}]}
+        if cursor < 4:
+            body["next_cursor"] = str(cursor + 2)
+        return web.json_response(body)
+
+    paginator = await _paginator(serve, make_client, handler, page_size=2)
+    assert await paginator.collect() == list(range(6))
+    assert paginator.stats.cursor_mode
+
+
+@pytest.mark.asyncio
+async def test_null_items_are_an_empty_page(serve, make_client):
+    async def handler(request):
+        return web.json_response({"rooms": None, "total": 0})
+
+    paginator = await _paginator(serve, make_client, handler)
+    assert await paginator.collect() == []
+
+
+@pytest.mark.asyncio
+async def test_non_object_response_raises(serve, make_client):
+    async def handler(request):
+        return web.json_response([{"n": 0}])
+
+    paginator = await _paginator(serve, make_client, handler)
+    with pytest.raises(Exception, match="unexpected response"):
+        await paginator.collect()
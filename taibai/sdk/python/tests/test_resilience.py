@@ -0,0 +1,139 @@
+"""
+Tests for retry budget, hedging and circuit breaking
+"""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from ziwei_taibai.http_client import HTTPClient, HTTPResponse
+from ziwei_taibai.resilience import CircuitBreaker, CircuitState, ResiliencePolicy, RetryBudget
+
+
+@pytest_asyncio.fixture
+async def unavailable_server(serve):
+    """Server that answers every request with 503"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        return web.json_response({"error": "unavailable"}, status=503)
+
+    app = web.Application()
+    app.router.add_get("/api/flaky", handler)
+    yield await serve(app), calls
+
+
+def test_default_policy_is_disabled():
+    """HTTPClient does not retry, hedge or break unless opted in"""
+    policy = HTTPClient("http://localhost").resilience
+    assert policy.max_retries == 0
+    assert not policy.hedge
+    assert not policy.breaker
+
+
+def test_breaker_transitions():
+    """closed -> open -> half-open -> closed, and half-open failure reopens"""
+    changes = []
+    breaker = CircuitBreaker(
+        "/api/rooms/{id}",
+        failure_threshold=2,
+        reset_timeout=0.05,
+        on_state_change=[lambda route, old, new: changes.append((old, new))]
+    )
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after > 0
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow()          # single probe
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert changes == [
+        (CircuitState.CLOSED, CircuitState.OPEN),
+        (CircuitState.OPEN, CircuitState.HALF_OPEN),
+        (CircuitState.HALF_OPEN, CircuitState.OPEN),
+        (CircuitState.OPEN, CircuitState.HALF_OPEN),
+        (CircuitState.HALF_OPEN, CircuitState.CLOSED),
+    ]
+
+
+def test_retry_budget_denies_when_empty():
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_tokens=1.0)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_limits_retries(unavailable_server, make_client):
+    """Retries stop once the budget is exhausted"""
+    base, calls = unavailable_server
+    policy = ResiliencePolicy(
+        max_retries=5,
+        backoff=0.001,
+        budget_ratio=0.0,
+        budget_min_per_second=0.0,
+        budget_max_tokens=1.0,
+        hedge=False,
+        breaker=False
+    )
+    client = make_client(base, resilience=policy)
+    response = await client.get("/api/flaky")
+
+    assert response.status == 503
+    assert len(calls) == 2
+    stats = client.resilience_stats()
+    assert stats.retries == 1
+    assert stats.retries_denied == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_policy_sends_once(unavailable_server, make_client):
+    base, calls = unavailable_server
+    response = await make_client(base).get("/api/flaky")
+    assert response.status == 503
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_winner_cancels_loser():
+    """The hedged request wins and the slow primary is cancelled"""
+    policy = ResiliencePolicy(hedge=True, hedge_min_samples=0, hedge_min_delay=0.01)
+    client = HTTPClient("http://localhost", resilience=policy)
+    primary_cancelled = asyncio.Event()
+    attempts = []
+
+    async def send():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+        return HTTPResponse(200, {"attempt": len(attempts)}, {})
+
+    response = await client._hedged("/api/slow", send)
+
+    assert response.data == {"attempt": 2}
+    await asyncio.wait_for(primary_cancelled.wait(), 1)
+    stats = client.resilience_stats()
+    assert stats.hedges == 1
+    assert stats.hedge_wins == 1
@@ -0,0 +1,170 @@
+"""
+Tests for resumable sessions: ResumeState and WSClient against the stand-in Tianshu server
+"""
+
+import json
+
+import pytest
+
+from conftest import wait_until
+from ziwei_taibai.session import ResumeState
+
+
+def test_stamp_assigns_increasing_seq():
+    state = ResumeState()
+    assert [state.stamp({"n": n})["seq"] for n in range(3)] == [1, 2, 3]
+    assert state.stats.unacked == 3
+
+
+def test_ack_trims_replay_buffer():
+    state = ResumeState()
+    for n in range(5):
+        state.mark_dequeued(state.stamp({"n": n})["seq"])
+    state.ack(3)
+    assert state.stats.unacked == 2
+    assert [m["n"] for m in state.replay()] == [3, 4]
+
+    # 旧的 ack 不回退确认位置
+    state.ack(1)
+    assert state.last_acked_seq == 3
+
+
+def test_replay_only_includes_dequeued_messages():
+    state = ResumeState()
+    first = state.stamp({"n": 0})
+    state.stamp({"n": 1})   # 仍在出站队列中，重连后由队列写出
+    state.mark_dequeued(first["seq"])
+    assert state.replay() == [first]
+    assert state.stats.replayed == 1
+
+
+def test_replay_buffer_overflow_drops_oldest():
+    state = ResumeState(replay_buffer_size=2)
+    for n in range(3):
+        state.mark_dequeued(state.stamp({"n": n})["seq"])
+    assert state.stats.replay_dropped == 1
+    assert [m["n"] for m in state.replay()] == [1, 2]
+
+
+def test_observe_drops_duplicates():
+    state = ResumeState()
+    assert state.observe(1)
+    assert state.observe(2)
+    assert not state.observe(2)
+    assert not state.observe(1)
+    assert state.stats.duplicates_dropped == 2
+
+    state.reset("session-2")
+    assert state.observe(1)
+
+
+def _echoes(received):
+    return [m["n"] for m in received if m.get("type") == "echo"]
+
+
+async def _connect(make_ws_client, url, **kwargs):
+    client = make_ws_client(url, resumable=True, **kwargs)
+    received = []
+    client.on_message(lambda message: received.append(message.data))
+    await client.connect()
+    return client, received
+
+
+@pytest.mark.asyncio
+async def test_resume_after_drop_has_no_gaps_or_duplicates(ws_server, make_ws_client):
+    server, url = await ws_server(sessions=True, ack_every=0)
+    client, received = await _connect(make_ws_client, url)
+    for n in range(5):
+        await client.send({"type": "echo", "n": n})
+    assert await wait_until(lambda: len(received) == 5)
+    session = server.sessions[client._resume.session_id]
+
+    await server.drop()
+    assert await wait_until(lambda: not client.is_connected)
+    for n in range(5, 10):
+        await client.send({"type": "echo", "n": n})
+    await server.publish(session.id, {"type": "notice", "n": 100})
+
+    assert await wait_until(lambda: len(received) == 11, timeout=2.0)
+    assert _echoes(received) == list(range(10))
+    assert [m["n"] for m in received if m["type"] == "notice"] == [100]
+    seqs = [m["seq"] for m in received]
+    assert seqs == sorted(set(seqs))
+
+    # 未被确认的 0..4 在恢复后重放，服务端按 seq 去重
+    stats = client.session_stats()
+    assert stats.resumes == 1
+    assert stats.resume_failures == 0
+    assert stats.replayed == 5
+    assert session.duplicates == 5
+    assert [m["n"] for m in session.client_messages] == list(range(10))
+    assert client._resume.session_id == session.id
+
+
+@pytest.mark.asyncio
+async def test_acks_trim_both_buffers(ws_server, make_ws_client):
+    server, url = await ws_server(sessions=True, ack_every=1)
+    client, received = await _connect(make_ws_client, url, ack_every=2)
+    for n in range(10):
+        await client.send({"type": "echo", "n": n})
+    assert await wait_until(lambda: len(received) == 10)
+    session = server.sessions[client._resume.session_id]
+
+    # 服务端 ack 清空客户端重放缓冲区，客户端 ack 清空服务端未确认事件
+    assert await wait_until(lambda: client.session_stats().unacked == 0)
+    assert await wait_until(lambda: not session.unacked)
+
+    await server.drop()
+    assert await wait_until(lambda: not client.is_connected)
+    assert await wait_until(lambda: client.is_connected)
+    await client.send({"type": "echo", "n": 10})
+    assert await wait_until(lambda: len(received) == 11)
+    assert client.session_stats().replayed == 0
+    assert session.duplicates == 0
+
+
+@pytest.mark.asyncio
+async def test_duplicate_event_is_dropped(ws_server, make_ws_client):
+    server, url = await ws_server(sessions=True)
+    client, received = await _connect(make_ws_client, url)
+    await client.send({"type": "echo", "n": 0})
+    assert await wait_until(lambda: len(received) == 1)
+    session = server.sessions[client._resume.session_id]
+
+    await session.ws.send_str(json.dumps({"type": "notice", "n": 1, "seq": 1}))
+    await server.publish(session.id, {"type": "notice", "n": 2})
+
+    assert await wait_until(lambda: len(received) == 2)
+    assert [m["n"] for m in received] == [0, 2]
+    assert client.session_stats().duplicates_dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_resume_starts_fresh_session(ws_server, make_ws_client):
+    server, url = await ws_server(sessions=True)
+    client, received = await _connect(make_ws_client, url)
+    resyncs = []
+    client.on_resync(lambda: resyncs.append(client._resume.session_id))
+    for n in range(3):
+        await client.send({"type": "echo", "n": n})
+    assert await wait_until(lambda: len(received) == 3)
+    old_session_id = client._resume.session_id
+    assert old_session_id in server.sessions
+
+    await server.drop(forget=True)
+    assert await wait_until(lambda: bool(resyncs))
+    stats = client.session_stats()
+    assert stats.resumes == 1
+    assert stats.resume_failures == 1
+
+    new_session_id = client._resume.session_id
+    assert new_session_id != old_session_id
+    assert resyncs == [new_session_id]
+    session = server.sessions[new_session_id]
+
+    # 新会话的事件 seq 从 1 开始，不能被当作重复丢弃
+    await client.send({"type": "echo", "n": 99})
+    assert await wait_until(lambda: 99 in _echoes(received))
+    assert client.session_stats().duplicates_dropped == 0
+    assert received[-1]["seq"] == 1
+    assert [m["n"] for m in session.client_messages] == [99]
@@ -0,0 +1,185 @@
+"""
+Tests for AuditSpool recovery, compaction, overflow and SpoolReplayer
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from ziwei_taibai.dispatch import OverflowPolicy
+from ziwei_taibai.spool import AuditSpool, PartialReplayError, SpoolReplayer
+
+
+def _event(n):
+    return {"n": n, "tag": f"event-{n}"}
+
+
+def _segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+
+
+async def _append(spool, count, start=0):
+    for n in range(start, start + count):
+        await spool.append(_event(n))
+
+
+async def _read_all(spool):
+    events, position = await asyncio.wait_for(spool.read(1000), 1)
+    return events, position
+
+
+def test_max_bytes_must_fit_two_segments(tmp_path):
+    with pytest.raises(ValueError):
+        AuditSpool(str(tmp_path), segment_bytes=10000, max_bytes=100)
+
+
+@pytest.mark.asyncio
+async def test_torn_tail_truncated_on_reopen(tmp_path):
+    spool = AuditSpool(str(tmp_path), fsync_interval=0)
+    await _append(spool, 2)
+    await spool.close()
+
+    path = os.path.join(str(tmp_path), _segment_files(str(tmp_path))[-1])
+    size = os.path.getsize(path)
+    torn = b"\x20\x00\x00\x00\x00\x00\x00\x00{\"n\""   # 崩溃留下的半条记录
+    with open(path, "ab") as f:
+        f.write(torn)
+
+    spool = AuditSpool(str(tmp_path), fsync_interval=0)
+    spool.open()
+    assert os.path.getsize(path) == size
+    assert spool.stats().truncated_bytes == len(torn)
+    assert spool.stats().recovered == 2
+    events, _ = await _read_all(spool)
+    assert events == [_event(0), _event(1)]
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_crc_mismatch_record_is_skipped(tmp_path):
+    spool = AuditSpool(str(tmp_path), fsync_interval=0)
+    await _append(spool, 3)
+
+    path = os.path.join(str(tmp_path), _segment_files(str(tmp_path))[-1])
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "r+b") as f:
+        f.write(data.replace(b"event-1", b"event-7"))
+
+    events, position = await _read_all(spool)
+    assert events == [_event(0), _event(2)]
+    assert position.record == 3
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_resume_from_checkpoint_after_restart(tmp_path):
+    spool = AuditSpool(str(tmp_path), fsync_interval=0)
+    await _append(spool, 5)
+    events, position = await spool.read(2)
+    assert events == [_event(0), _event(1)]
+    await spool.commit(position)
+    await spool.close()
+
+    spool = AuditSpool(str(tmp_path), fsync_interval=0)
+    spool.open()
+    assert spool.stats().recovered == 3
+    events, _ = await _read_all(spool)
+    assert events == [_event(2), _event(3), _event(4)]
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_commit_compacts_delivered_segments(tmp_path):
+    spool = AuditSpool(str(tmp_path), segment_bytes=64, max_bytes=1 << 20, fsync_interval=0)
+    await _append(spool, 10)
+    assert len(_segment_files(str(tmp_path))) > 2
+
+    events, position = await _read_all(spool)
+    assert len(events) == 10
+    await spool.commit(position)
+
+    stats = spool.stats()
+    assert stats.pending == 0
+    assert stats.segments == 1
+    assert stats.disk_bytes == 0
+    assert stats.compacted_segments >= 3
+    assert len(_segment_files(str(tmp_path))) == 1
+
+    # 压缩后继续写入与读取
+    await _append(spool, 1, start=10)
+    events, _ = await _read_all(spool)
+    assert events == [_event(10)]
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_counts_dropped(tmp_path):
+    spool = AuditSpool(str(tmp_path), segment_bytes=100, max_bytes=200, fsync_interval=0)
+    await _append(spool, 30)
+
+    stats = spool.stats()
+    assert stats.dropped > 0
+    assert stats.disk_bytes <= 200
+    assert stats.appended - stats.dropped == stats.pending
+    events, _ = await _read_all(spool)
+    assert len(events) == stats.pending
+    assert events[-1] == _event(29)
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_block_does_not_deadlock_after_delivery(tmp_path):
+    spool = AuditSpool(
+        str(tmp_path), segment_bytes=100, max_bytes=200, overflow=OverflowPolicy.BLOCK, fsync_interval=0
+    )
+    for _ in range(3):
+        await asyncio.wait_for(_append(spool, 5), 1)
+        events, position = await _read_all(spool)
+        await spool.commit(position)
+        assert spool.pending == 0
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_commit(tmp_path):
+    spool = AuditSpool(
+        str(tmp_path), segment_bytes=100, max_bytes=200, overflow=OverflowPolicy.BLOCK, fsync_interval=0
+    )
+    appending = asyncio.ensure_future(_append(spool, 20))
+    await asyncio.sleep(0.05)
+    assert not appending.done()
+    assert spool.stats().dropped == 0
+
+    while not appending.done():
+        if spool.pending:
+            events, position = await _read_all(spool)
+            await spool.commit(position)
+        else:
+            await asyncio.sleep(0.01)
+    await appending
+    assert spool.stats().appended == 20
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_partial_replay_retries_only_pending(tmp_path):
+    spool = AuditSpool(str(tmp_path), fsync_interval=0)
+    await _append(spool, 4)
+    calls = []
+
+    async def send(events):
+        calls.append(list(events))
+        if len(calls) == 1:
+            raise PartialReplayError(events[2:], ConnectionError("diting unavailable"))
+
+    replayer = SpoolReplayer(spool, send, min_backoff=0.01, max_backoff=0.01)
+    replayer.start()
+    await asyncio.wait_for(spool.wait_drained(), 1)
+    await replayer.stop()
+
+    assert calls == [[_event(n) for n in range(4)], [_event(2), _event(3)]]
+    assert replayer.stats.retries == 1
+    assert spool.stats().committed == 4
+    await spool.close()
@@ -0,0 +1,82 @@
+"""
+Tests for JSONStreamDecoder
+"""
+
+import json
+
+import pytest
+
+from ziwei_taibai.codec import DecodeError
+from ziwei_taibai.streaming import JSONStreamDecoder
+
+
+def _feed_in_chunks(decoder, data, size):
+    items = []
+    for start in range(0, len(data), size):
+        items.extend(decoder.feed(data[start:start + size]))
+    items.extend(decoder.close())
+    return items
+
+
+ITEMS = [
+    {"id": 1, "body": "hello"},
+    {"id": 2, "body": "含有多字节字符的消息"},
+    12345,
+    "text, with ] and \" inside",
+    [1, [2, {"x": None}]],
+]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_top_level_array_split_across_chunks(size):
+    data = json.dumps(ITEMS, ensure_ascii=False).encode()
+    assert _feed_in_chunks(JSONStreamDecoder(), data, size) == ITEMS
+
+
+@pytest.mark.parametrize("size", [1, 5, 64])
+def test_keyed_array(size):
+    payload = {
+        "meta": {"messages": ["decoy"], "note": "\"messages\": [0]"},
+        "messages": ITEMS,
+        "total": 5,
+    }
+    data = json.dumps(payload, ensure_ascii=False).encode()
+    decoder = JSONStreamDecoder(key="messages")
+    assert _feed_in_chunks(decoder, data, size) == ITEMS
+    assert decoder.done
+
+
+def test_keyed_array_missing_key():
+    decoder = JSONStreamDecoder(key="messages")
+    assert _feed_in_chunks(decoder, b'{"rooms": [1, 2]}', 4) == []
+    assert decoder.done
+
+
+def test_scalar_is_not_emitted_until_delimited():
+    decoder = JSONStreamDecoder()
+    assert decoder.feed(b"[12") == []
+    assert decoder.feed(b"34, 5") == [1234]
+    assert decoder.feed(b"]") == [5]
+
+
+def test_ndjson_split_across_chunks():
+    data = b'{"a": 1}\n{"b": 2}\n{"c": 3}'
+    assert _feed_in_chunks(JSONStreamDecoder(ndjson=True), data, 3) == [{"a": 1}, {"b": 2}, {"c": 3}]
+
+
+def test_truncated_array_raises():
+    decoder = JSONStreamDecoder()
+    decoder.feed(b'[{"id": 1}, {"id"')
+    with pytest.raises(DecodeError):
+        decoder.close()
+
+
+def test_max_item_bytes_counts_bytes():
+    # 30 个三字节字符：90 字节、30 个字符
+    item = json.dumps("字" * 30, ensure_ascii=False).encode()
+    decoder = JSONStreamDecoder(max_item_bytes=60)
+    with pytest.raises(DecodeError):
+        decoder.feed(b"[" + item[:-1])
+
+    decoder = JSONStreamDecoder(max_item_bytes=100)
+    assert decoder.feed(b"[" + item + b"]") == ["字" * 30]
@@ -0,0 +1,91 @@
+"""
+Tests for topic routing and subscription management
+"""
+
+import pytest
+
+from ziwei_taibai.message import SubscriptionManager
+from ziwei_taibai.topic import TopicTrie
+
+
+def handler_a(data):
+    pass
+
+
+def handler_b(data):
+    pass
+
+
+def test_exact_match():
+    trie = TopicTrie()
+    trie.add("m.agent.action", handler_a)
+    assert trie.match("m.agent.action") == [handler_a]
+    assert trie.match("m.agent") == []
+    assert trie.match("m.agent.action.extra") == []
+
+
+def test_single_segment_wildcard():
+    trie = TopicTrie()
+    trie.add("m.agent.*", handler_a)
+    assert trie.match("m.agent.action") == [handler_a]
+    assert trie.match("m.agent") == []
+    assert trie.match("m.agent.action.extra") == []
+
+
+def test_multi_segment_wildcard():
+    trie = TopicTrie()
+    trie.add("m.#", handler_a)
+    assert trie.match("m") == [handler_a]
+    assert trie.match("m.agent") == [handler_a]
+    assert trie.match("m.agent.action.extra") == [handler_a]
+    assert trie.match("n.agent") == []
+
+
+def test_handler_matched_once():
+    trie = TopicTrie()
+    trie.add("m.#", handler_a)
+    trie.add("m.agent.*", handler_a)
+    trie.add("m.agent.action", handler_b)
+    assert sorted(trie.match("m.agent.action"), key=id) == sorted([handler_a, handler_b], key=id)
+
+
+def test_invalid_patterns():
+    trie = TopicTrie()
+    with pytest.raises(ValueError):
+        trie.add("m.#.action", handler_a)
+    with pytest.raises(ValueError):
+        trie.add("m..action", handler_a)
+
+
+def test_remove_reports_last_handler():
+    trie = TopicTrie()
+    assert trie.add("m.*", handler_a)
+    assert not trie.add("m.*", handler_b)
+    assert not trie.remove("m.*", handler_a)
+    assert trie.remove("m.*", handler_b)
+    assert len(trie) == 0
+    assert trie.match("m.agent") == []
+
+
+class _FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, frame):
+        self.sent.append(frame)
+
+
+@pytest.mark.asyncio
+async def test_subscribe_many_invalid_pattern_registers_nothing():
+    """A bad pattern leaves both local routes and server state untouched"""
+    ws = _FakeWS()
+    manager = SubscriptionManager(ws)
+
+    with pytest.raises(ValueError):
+        await manager.subscribe_many([("m.agent.*", handler_a), ("m.#.bad", handler_b)])
+
+    assert manager._trie.patterns() == []
+    assert ws.sent == []
+
+    await manager.subscribe_many([("m.agent.*", handler_a), ("m.room.#", handler_b)])
+    assert ws.sent == [{"type": "subscribe", "event_types": ["m.agent.*", "m.room.#"]}]
@@ -0,0 +1,50 @@
+"""
+Tests for request timing of streamed responses
+"""
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from ziwei_taibai.codec import DecodeError
+from ziwei_taibai.tracing import RequestTracer
+
+
+@pytest_asyncio.fixture
+async def stream_client(serve, make_client):
+    async def items(request):
+        return web.json_response({"items": list(range(100))})
+
+    async def broken(request):
+        return web.Response(body=b'{"items": [1, 2, }', content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/api/items", items)
+    app.router.add_get("/api/broken", broken)
+    tracer = RequestTracer()
+    yield make_client(await serve(app), tracer=tracer), tracer
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_is_recorded(stream_client):
+    client, tracer = stream_client
+    assert [item async for item in client.stream("/api/items", key="items")] == list(range(100))
+
+    stream = client.stream("/api/items", key="items")
+    async for item in stream:
+        break
+    await stream.aclose()
+
+    assert tracer.requests == 2
+    assert tracer.errors == 0
+    assert tracer.stats()["/api/items"]["total"]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_decode_error_is_recorded(stream_client):
+    client, tracer = stream_client
+    with pytest.raises(DecodeError):
+        async for _ in client.stream("/api/broken", key="items"):
+            pass
+    assert tracer.requests == 1
+    assert tracer.errors == 1
@@ -13,9 +13,27 @@ from .protocol import (
     ACTION_VERIFICATION_PING,
 )
 from .agent import Agent, discover_tianshu, report_action, heartbeat, register_agent
+from .async_agent import AsyncAgent
+from .audit import AuditPipeline, AuditStats
+from .discovery import DiscoveryCache, configure_discovery_cache, get_discovery_cache
+from .heartbeat import HeartbeatAggregator, HeartbeatResult, HeartbeatStats, get_heartbeat_aggregator
+from .spool import AuditSpool, SpoolReplayer, SpoolStats
 
 __all__ = [
     "Agent",
+    "AsyncAgent",
+    "AuditPipeline",
+    "AuditStats",
+    "AuditSpool",
+    "SpoolReplayer",
+    "SpoolStats",
+    "DiscoveryCache",
+    "get_discovery_cache",
+    "configure_discovery_cache",
+    "HeartbeatAggregator",
+    "HeartbeatResult",
+    "HeartbeatStats",
+    "get_heartbeat_aggregator",
     "discover_tianshu",
     "register_agent",
     "heartbeat",
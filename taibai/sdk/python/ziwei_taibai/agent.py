@@ -1,19 +1,104 @@
 # 太白 Agent 封装：发现、注册、心跳、操作上报
 # 当前以 HTTP 调用天枢/谛听为主；与技术方案 §4 协议对齐
+#
+# 同步接口是 AsyncAgent 的门面：请求在进程内共享的后台事件循环线程上执行，
+# 连接保持在该线程的连接池中复用。事件循环中请直接使用 AsyncAgent。
+
+import asyncio
+import atexit
+import logging
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from .async_agent import AsyncAgent, _get_env
+from .audit import AuditPipeline
+from .heartbeat import HeartbeatResult
+from .pool import ConnectionPool
+from .protocol import ACTION_VERIFICATION_PING
 
-import os
-import time
-import urllib.request
-import urllib.error
-import json
-from typing import Any, Dict, Optional
 
-from .protocol import ACTION_VERIFICATION_PING
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
+class _BackgroundLoop:
+    """同步门面使用的后台事件循环线程（首次使用时启动，进程退出时关闭连接池）"""
 
-def _get_env(key: str, default: Optional[str] = None) -> str:
-    v = os.environ.get(key, default)
-    return (v or "").strip()
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ConnectionPool] = None
+        self._warned = False
+        # 带审计流水线的 Agent，进程退出前发送其剩余事件
+        self._audited: "weakref.WeakSet[AsyncAgent]" = weakref.WeakSet()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        self._ensure()
+        return self._pool
+
+    def _ensure(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._pool = ConnectionPool()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="ziwei-taibai-agent",
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """在后台事件循环上执行协程并等待结果"""
+        loop = self._ensure()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在 Agent 后台事件循环中调用同步接口，请使用 AsyncAgent")
+        if not self._warned:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+            else:
+                self._warned = True
+                logger.warning("Agent called from a running event loop; use AsyncAgent to avoid blocking it")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def shutdown(self):
+        """关闭连接池并停止后台事件循环"""
+        with self._lock:
+            loop, thread, pool = self._loop, self._thread, self._pool
+            self._loop = self._thread = self._pool = None
+        if loop is None or not thread.is_alive():
+            return
+        for agent in list(self._audited):
+            try:
+                asyncio.run_coroutine_threadsafe(agent.audit.close(), loop).result(timeout=10)
+            except Exception as e:
+                logger.warning(f"Failed to flush audit pipeline: {e}")
+        try:
+            asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.debug(f"Failed to close agent connection pool: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+_background = _BackgroundLoop()
+atexit.register(_background.shutdown)
+
+
+def _run_once(agent: AsyncAgent, call: Callable[[AsyncAgent], Awaitable[T]]) -> T:
+    """用临时 AsyncAgent 执行一次调用（会话归还后连接仍留在后台连接池中）"""
+    async def run() -> T:
+        async with agent:
+            return await call(agent)
+    return _background.run(run())
 
 
 def discover_tianshu(api_base: Optional[str] = None) -> Dict[str, Any]:
@@ -21,17 +106,10 @@ def discover_tianshu(api_base: Optional[str] = None) -> Dict[str, Any]:
     base = (api_base or _get_env("TIANSHU_API_BASE", "")).rstrip("/")
     if not base:
         raise ValueError("TIANSHU_API_BASE 未设置")
-    for path in ("/.well-known/tianshu-matrix", "/api/v1/discovery"):
-        url = base + path
-        try:
-            req = urllib.request.Request(url, method="GET")
-            with urllib.request.urlopen(req, timeout=10) as r:
-                return json.loads(r.read().decode())
-        except Exception as e:
-            if path == "/api/v1/discovery":
-                raise RuntimeError(f"发现天枢失败: {url}") from e
-            continue
-    raise RuntimeError("发现天枢失败: 未找到 discovery 端点")
+    return _run_once(
+        AsyncAgent("", tianshu_api_base=base, pool=_background.pool),
+        lambda agent: agent.discover()
+    )
 
 
 def register_agent(
@@ -40,39 +118,18 @@ def register_agent(
     agent_display_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """向天枢注册 Agent（若天枢暴露 POST /api/v1/agents/register）。"""
-    url = api_base.rstrip("/") + "/api/v1/agents/register"
-    payload = {"owner_id": owner_id}
-    if agent_display_id:
-        payload["agent_display_id"] = agent_display_id
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode(),
-        headers={"Content-Type": "application/json"},
-        method="POST",
+    return _run_once(
+        AsyncAgent(owner_id, tianshu_api_base=api_base, pool=_background.pool),
+        lambda agent: agent.register(agent_display_id)
     )
-    try:
-        with urllib.request.urlopen(req, timeout=15) as r:
-            return json.loads(r.read().decode())
-    except urllib.error.HTTPError as e:
-        body = e.read().decode() if e.fp else ""
-        raise RuntimeError(f"注册失败 {e.code}: {body}") from e
 
 
 def heartbeat(api_base: str, agent_id: str) -> Dict[str, Any]:
     """向天枢上报心跳（若天枢暴露 POST /api/v1/agents/heartbeat）。"""
-    url = api_base.rstrip("/") + "/api/v1/agents/heartbeat"
-    req = urllib.request.Request(
-        url,
-        data=json.dumps({"agent_id": agent_id, "status": "online"}).encode(),
-        headers={"Content-Type": "application/json"},
-        method="POST",
+    return _run_once(
+        AsyncAgent("", tianshu_api_base=api_base, agent_id=agent_id, pool=_background.pool),
+        lambda agent: agent.heartbeat()
     )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as r:
-            return json.loads(r.read().decode())
-    except urllib.error.HTTPError as e:
-        body = e.read().decode() if e.fp else ""
-        raise RuntimeError(f"心跳失败 {e.code}: {body}") from e
 
 
 def report_action(
@@ -85,28 +142,18 @@ def report_action(
     url = (diting_audit_url or _get_env("DITING_AUDIT_URL", "")).rstrip("/")
     if not url:
         raise ValueError("DITING_AUDIT_URL 未设置")
-    payload = {
-        "agent_id": agent_id,
-        "action_type": action_type,
-        "timestamp": int(time.time()),
-        "detail": detail or {},
-    }
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode(),
-        headers={"Content-Type": "application/json"},
-        method="POST",
+    return _run_once(
+        AsyncAgent("", diting_audit_url=url, agent_id=agent_id, pool=_background.pool),
+        lambda agent: agent.report_action(action_type, detail)
     )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as r:
-            return json.loads(r.read().decode())
-    except urllib.error.HTTPError as e:
-        body = e.read().decode() if e.fp else ""
-        raise RuntimeError(f"审计上报失败 {e.code}: {body}") from e
 
 
 class Agent:
-    """太白 Agent：封装发现、注册、心跳、操作上报（与技术方案 §4 对齐）。"""
+    """太白 Agent：封装发现、注册、心跳、操作上报（与技术方案 §4 对齐）。
+
+    同步门面，供脚本使用；事件循环中请使用 AsyncAgent。传入 audit 时 trace() 只入队，
+    剩余事件在 close() 或进程退出时发送。
+    """
 
     def __init__(
         self,
@@ -114,42 +161,72 @@ class Agent:
         tianshu_api_base: Optional[str] = None,
         diting_audit_url: Optional[str] = None,
         agent_id: Optional[str] = None,
+        audit: Optional[AuditPipeline] = None,
     ):
-        self.owner = owner
-        self.tianshu_api_base = tianshu_api_base or _get_env("TIANSHU_API_BASE")
-        self.diting_audit_url = diting_audit_url or _get_env("DITING_AUDIT_URL")
-        self._agent_id = agent_id or _get_env("VERIFICATION_AGENT_ID")
+        self._async = AsyncAgent(owner, tianshu_api_base, diting_audit_url, agent_id, audit=audit)
+        if audit is not None:
+            _background._audited.add(self._async)
+
+    # 配置与 agent_id 直接读写底层 AsyncAgent，保持两者一致
+    owner = property(
+        lambda self: self._async.owner,
+        lambda self, value: setattr(self._async, "owner", value)
+    )
+    tianshu_api_base = property(
+        lambda self: self._async.tianshu_api_base,
+        lambda self, value: setattr(self._async, "tianshu_api_base", value)
+    )
+    diting_audit_url = property(
+        lambda self: self._async.diting_audit_url,
+        lambda self, value: setattr(self._async, "diting_audit_url", value)
+    )
+    _agent_id = property(
+        lambda self: self._async._agent_id,
+        lambda self, value: setattr(self._async, "_agent_id", value)
+    )
 
-    def discover(self) -> Dict[str, Any]:
-        return discover_tianshu(self.tianshu_api_base)
+    def _run(self, call: Callable[[AsyncAgent], Awaitable[T]]) -> T:
+        """在后台事件循环上执行（后台循环重建后改用新的连接池）"""
+        pool = _background.pool
+        if self._async._pool is not pool:
+            self._async._pool = pool
+            self._async._clients = {}
+        return _background.run(call(self._async))
+
+    def discover(self, refresh: bool = False) -> Dict[str, Any]:
+        return self._run(lambda agent: agent.discover(refresh))
 
     def register(self, agent_display_id: Optional[str] = None) -> Dict[str, Any]:
-        if not self.tianshu_api_base:
-            raise ValueError("tianshu_api_base 未设置")
-        out = register_agent(self.tianshu_api_base, self.owner, agent_display_id)
-        if out.get("ok") and out.get("agent_id"):
-            self._agent_id = out["agent_id"]
-        return out
+        return self._run(lambda agent: agent.register(agent_display_id))
 
     def heartbeat(self) -> Dict[str, Any]:
-        if not self._agent_id:
-            raise ValueError("无 agent_id，请先 register 或设置 VERIFICATION_AGENT_ID")
-        return heartbeat(self.tianshu_api_base or "", self._agent_id)
+        return self._run(lambda agent: agent.heartbeat())
+
+    def start_heartbeat(
+        self,
+        interval: float = 30.0,
+        callback: Optional[Callable[[HeartbeatResult], Any]] = None
+    ):
+        """由进程级心跳聚合器周期性上报心跳（回调在后台事件循环线程中执行）"""
+        async def start(agent: AsyncAgent):
+            agent.start_heartbeat(interval, callback)
+        self._run(start)
+
+    def stop_heartbeat(self):
+        self._run(lambda agent: agent.stop_heartbeat())
 
     def trace(
         self,
         action_type: str,
         **detail: Any,
     ) -> Dict[str, Any]:
-        if not self._agent_id:
-            raise ValueError("无 agent_id")
-        return report_action(
-            self.diting_audit_url or "",
-            self._agent_id,
-            action_type,
-            detail if detail else None,
-        )
+        return self._run(lambda agent: agent.trace(action_type, **detail))
 
     @property
     def agent_id(self) -> Optional[str]:
         return self._agent_id
+
+    def close(self):
+        """停止心跳，发送审计流水线中剩余的事件，归还连接池中的会话"""
+        if self._async._clients or self._async.audit is not None or self._async._heartbeat is not None:
+            _background.run(self._async.close())
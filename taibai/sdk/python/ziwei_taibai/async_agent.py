@@ -0,0 +1,242 @@
+"""异步 Agent 模块
+
+``AsyncAgent`` 提供与 ``Agent`` 相同的发现、注册、心跳、操作上报接口，基于共享连接池的
+HTTPClient：
+
+- 天枢与谛听按 origin 各复用一个 HTTPClient，连接保持在池中，不再每次调用新建 TCP 连接；
+- 全部方法为协程，在事件循环中调用不会阻塞其他任务；
+- 发现结果经进程级共享的 DiscoveryCache 缓存（内存 + 磁盘，见 ``discovery.py``）；
+- 错误信息与同步版本一致（ValueError / RuntimeError）；
+- 传入 ``audit=AuditPipeline(...)`` 时，``trace()`` / ``report_action()`` 只将事件放入
+  后台批量上报队列，不等待谛听往返；
+- ``start_heartbeat()`` 将 Agent 登记到进程级心跳聚合器，同一天枢的所有 Agent 每个周期
+  合并为一次批量请求（见 ``heartbeat.py``）。
+
+同步脚本继续使用 ``Agent``，它是运行在后台事件循环上的 AsyncAgent 门面。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from .audit import AuditPipeline, _split_url
+from .discovery import DiscoveryCache, get_discovery_cache
+from .heartbeat import HEARTBEAT_PATH, HeartbeatAggregator, HeartbeatResult, get_heartbeat_aggregator
+from .http_client import HTTPClient, HTTPResponse
+from .pool import ConnectionPool
+from .tracing import RequestTracer
+
+
+logger = logging.getLogger(__name__)
+
+REGISTER_PATH = "/api/v1/agents/register"
+
+
+def _get_env(key: str, default: Optional[str] = None) -> str:
+    v = os.environ.get(key, default)
+    return (v or "").strip()
+
+
+class AsyncAgent:
+    """太白异步 Agent：封装发现、注册、心跳、操作上报（与技术方案 §4 对齐）"""
+
+    def __init__(
+        self,
+        owner: str,
+        tianshu_api_base: Optional[str] = None,
+        diting_audit_url: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        pool: Optional[ConnectionPool] = None,
+        tracer: Optional[RequestTracer] = None,
+        audit: Optional[AuditPipeline] = None,
+        discovery: Optional[DiscoveryCache] = None,
+        close_audit: bool = True
+    ):
+        """
+        初始化异步 Agent
+
+        Args:
+            owner: 所有者 ID
+            tianshu_api_base: 天枢 API 地址（默认读取 TIANSHU_API_BASE）
+            diting_audit_url: 谛听审计上报地址（默认读取 DITING_AUDIT_URL）
+            agent_id: 已有的 Agent ID（默认读取 VERIFICATION_AGENT_ID）
+            pool: 连接池（默认使用当前事件循环的进程级共享连接池）
+            tracer: 请求阶段计时器（默认不启用）
+            audit: 审计上报流水线（默认逐条同步上报）
+            discovery: 发现缓存（默认使用进程级共享缓存）
+            close_audit: close() 时是否一并关闭 audit（多个 Agent 共享同一流水线时
+                传 False，由创建者负责关闭）
+        """
+        self.owner = owner
+        self.tianshu_api_base = tianshu_api_base or _get_env("TIANSHU_API_BASE")
+        self.diting_audit_url = diting_audit_url or _get_env("DITING_AUDIT_URL")
+        self._agent_id = agent_id or _get_env("VERIFICATION_AGENT_ID")
+        self._pool = pool
+        self._tracer = tracer
+        self.audit = audit
+        self.close_audit = close_audit
+        self.discovery = discovery
+        self._clients: Dict[str, HTTPClient] = {}
+        self._heartbeat: Optional[HeartbeatAggregator] = None
+        self._unregistering: Set[asyncio.Future] = set()
+
+    def _client(self, base_url: str) -> HTTPClient:
+        """按基础地址复用 HTTPClient"""
+        base_url = base_url.rstrip("/")
+        client = self._clients.get(base_url)
+        if client is None:
+            client = self._clients[base_url] = HTTPClient(base_url, pool=self._pool, tracer=self._tracer)
+        return client
+
+    @staticmethod
+    def _json(response: HTTPResponse) -> Dict[str, Any]:
+        if not isinstance(response.data, dict):
+            raise RuntimeError(f"响应不是 JSON 对象 {response.status}: {response.data}")
+        return response.data
+
+    async def discover(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        发现天枢端点：并发请求 api_base/.well-known/tianshu-matrix 与 /api/v1/discovery，结果经缓存共享
+
+        Args:
+            refresh: 忽略缓存，强制探测
+
+        Returns:
+            发现结果（缓存共享的对象，调用方不应修改）
+        """
+        base = self.tianshu_api_base.rstrip("/")
+        if not base:
+            raise ValueError("TIANSHU_API_BASE 未设置")
+        cache = self.discovery or get_discovery_cache()
+        return await cache.get(base, pool=self._pool, tracer=self._tracer, refresh=refresh)
+
+    async def register(self, agent_display_id: Optional[str] = None) -> Dict[str, Any]:
+        """向天枢注册 Agent（若天枢暴露 POST /api/v1/agents/register）"""
+        if not self.tianshu_api_base:
+            raise ValueError("tianshu_api_base 未设置")
+        payload = {"owner_id": self.owner}
+        if agent_display_id:
+            payload["agent_display_id"] = agent_display_id
+        response = await self._client(self.tianshu_api_base).post(REGISTER_PATH, data=payload, timeout=15)
+        if not response.ok:
+            raise RuntimeError(f"注册失败 {response.status}: {response.data}")
+        out = self._json(response)
+        if out.get("ok") and out.get("agent_id"):
+            self._agent_id = out["agent_id"]
+        return out
+
+    async def heartbeat(self) -> Dict[str, Any]:
+        """向天枢上报心跳（若天枢暴露 POST /api/v1/agents/heartbeat）"""
+        if not self._agent_id:
+            raise ValueError("无 agent_id，请先 register 或设置 VERIFICATION_AGENT_ID")
+        if not self.tianshu_api_base:
+            raise ValueError("tianshu_api_base 未设置")
+        response = await self._client(self.tianshu_api_base).post(
+            HEARTBEAT_PATH,
+            data={"agent_id": self._agent_id, "status": "online"},
+            timeout=10
+        )
+        if not response.ok:
+            raise RuntimeError(f"心跳失败 {response.status}: {response.data}")
+        return self._json(response)
+
+    def start_heartbeat(
+        self,
+        interval: float = 30.0,
+        callback: Optional[Callable[[HeartbeatResult], Any]] = None,
+        aggregator: Optional[HeartbeatAggregator] = None
+    ) -> HeartbeatAggregator:
+        """
+        登记到心跳聚合器，由其周期性上报（需在事件循环中调用）
+
+        Args:
+            interval: 心跳周期（秒）
+            callback: 每个周期收到本 Agent 心跳结果时调用（同步或 async）
+            aggregator: 心跳聚合器（默认使用当前事件循环中该天枢与周期共享的聚合器）
+
+        Returns:
+            所登记的 HeartbeatAggregator
+        """
+        if not self.tianshu_api_base:
+            raise ValueError("tianshu_api_base 未设置")
+        if aggregator is None:
+            aggregator = get_heartbeat_aggregator(
+                self.tianshu_api_base, interval, pool=self._pool, tracer=self._tracer
+            )
+        if self._heartbeat is not None and self._heartbeat is not aggregator:
+            # 换用其他聚合器：从原聚合器注销在后台完成，stop_heartbeat() / close() 时等待
+            task = asyncio.ensure_future(self._heartbeat.unregister(self))
+            self._unregistering.add(task)
+            task.add_done_callback(self._unregistered)
+        self._heartbeat = aggregator
+        aggregator.register(self, callback)
+        return aggregator
+
+    async def stop_heartbeat(self):
+        """从心跳聚合器注销"""
+        aggregator, self._heartbeat = self._heartbeat, None
+        if aggregator is not None:
+            await aggregator.unregister(self)
+        if self._unregistering:
+            await asyncio.gather(*self._unregistering, return_exceptions=True)
+
+    def _unregistered(self, task: asyncio.Future):
+        self._unregistering.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Heartbeat unregister failed: {task.exception()}")
+
+    async def trace(self, action_type: str, **detail: Any) -> Dict[str, Any]:
+        """向谛听上报一条操作（审计）"""
+        if not self._agent_id:
+            raise ValueError("无 agent_id")
+        return await self.report_action(action_type, detail if detail else None)
+
+    async def report_action(self, action_type: str, detail: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        向谛听上报一条操作（审计）
+
+        Args:
+            action_type: 操作类型
+            detail: 操作详情
+
+        Returns:
+            谛听响应；使用审计流水线时为 ``{"ok": True, "queued": True}``
+        """
+        payload = {
+            "agent_id": self._agent_id,
+            "action_type": action_type,
+            "timestamp": int(time.time()),
+            "detail": detail or {},
+        }
+        if self.audit is not None:
+            await self.audit.put(payload)
+            return {"ok": True, "queued": True}
+        url = self.diting_audit_url.rstrip("/")
+        if not url:
+            raise ValueError("DITING_AUDIT_URL 未设置")
+        origin, path = _split_url(url)
+        response = await self._client(origin).post(path, data=payload, timeout=10, route=path.split("?")[0])
+        if not response.ok:
+            raise RuntimeError(f"审计上报失败 {response.status}: {response.data}")
+        return self._json(response)
+
+    @property
+    def agent_id(self) -> Optional[str]:
+        return self._agent_id
+
+    async def close(self):
+        """停止心跳，发送审计流水线中剩余的事件（close_audit=False 时不动流水线），归还连接池中的会话"""
+        await self.stop_heartbeat()
+        if self.audit is not None and self.close_audit:
+            await self.audit.close()
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.close()
+
+    async def __aenter__(self) -> "AsyncAgent":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,427 @@
+"""审计上报流水线模块
+
+将操作上报（``m.agent.action``）从调用方的关键路径上移走：事件先进入有界内存队列，
+由后台 flusher 批量发送到谛听：
+
+- 队列达到 ``batch_size`` 或最早的事件等待超过 ``flush_interval`` 时发送；
+- 优先使用批量接口（``POST <审计地址>/batch``，请求体 ``{"events": [...]}``），
+  谛听不支持时记住并改为并发逐条上报（见 ``bulk.run_bulk``）；
+- 队列满时按 ``OverflowPolicy`` 处理：``DROP_OLDEST`` 丢弃最旧事件，``BLOCK`` 让
+  ``put()`` 等待空间；
+- ``stats()`` 返回发送延迟、每次发送的事件数、排队时长与丢弃 / 失败计数。
+
+传入 ``spool=AuditSpool(目录)`` 时事件先落盘，内存队列由 ``SpoolReplayer`` 取代：
+谛听不可达期间事件保留在磁盘上，恢复后按检查点补发（至少一次），进程重启也不丢失。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .bulk import BulkItemError, run_bulk
+from .dispatch import OverflowPolicy
+from .http_client import HTTPClient
+from .metrics import Histogram
+from .pool import ConnectionPool
+from .resilience import CircuitOpenError
+from .spool import AuditSpool, PartialReplayError, SpoolReplayer
+from .tracing import RequestTracer
+
+
+logger = logging.getLogger(__name__)
+
+# 队列元素：(事件, 序号, 入队时间)
+_Item = Tuple[Dict[str, Any], int, float]
+
+# 可重试的上报错误（spool 模式下整批留在磁盘上重试）
+_RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError)
+_RETRYABLE_STATUSES = (408, 429)
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    """将完整 URL 拆为 (origin, 路径及查询串)"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+@dataclass
+class AuditStats:
+    """审计流水线统计"""
+    submitted: int = 0          # 入队事件数
+    delivered: int = 0          # 谛听已确认的事件数
+    failed: int = 0             # 上报失败的事件数
+    dropped: int = 0            # 因队列溢出丢弃的事件数
+    flushes: int = 0            # 发送次数
+    batched_flushes: int = 0    # 经由批量接口完成的发送次数
+    requests: int = 0           # 实际发出的 HTTP 请求数
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    flush_latency: Dict[str, float] = field(default_factory=dict)  # 每次发送耗时分布（秒）
+    batch_size: Dict[str, float] = field(default_factory=dict)     # 每次发送的事件数分布
+    queue_delay: Dict[str, float] = field(default_factory=dict)    # 入队到送达的耗时分布（秒）
+
+
+class AuditPipeline:
+    """批量、异步的审计上报流水线（单个后台 flusher）"""
+
+    def __init__(
+        self,
+        diting_audit_url: str,
+        maxsize: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        concurrency: int = 8,
+        batch_path: Optional[str] = None,
+        pool: Optional[ConnectionPool] = None,
+        tracer: Optional[RequestTracer] = None,
+        on_failure: Optional[Callable[[List[Dict[str, Any]], BaseException], Any]] = None,
+        spool: Optional[AuditSpool] = None
+    ):
+        """
+        初始化审计流水线（flusher 在首次入队或 start() 时启动，需在事件循环中）
+
+        Args:
+            diting_audit_url: 谛听审计上报地址
+            maxsize: 队列容量
+            batch_size: 每个批量请求包含的事件数（达到即发送）
+            flush_interval: 事件最长等待时间（秒）
+            overflow: 队列满时的处理策略（DROP_OLDEST 或 BLOCK）
+            concurrency: 每次发送中并发请求上限（批量分块与逐条上报共用）
+            batch_path: 批量接口路径（默认为审计路径加 /batch）
+            pool: 连接池（默认使用当前事件循环的进程级共享连接池）
+            tracer: 请求阶段计时器（默认不启用）
+            on_failure: 事件上报失败时的回调 ``(events, error)``（spool 模式下只用于不可重试的失败）
+            spool: 落盘队列（设置后 maxsize / overflow 不再使用，由 spool 的磁盘上限与策略代替）
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        if overflow not in (OverflowPolicy.DROP_OLDEST, OverflowPolicy.BLOCK):
+            raise ValueError(f"Unsupported overflow policy for audit pipeline: {overflow}")
+        url = (diting_audit_url or "").rstrip("/")
+        if not url:
+            raise ValueError("DITING_AUDIT_URL 未设置")
+        origin, self.path = _split_url(url)
+        self.batch_path = batch_path or self.path.split("?")[0] + "/batch"
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.concurrency = max(1, concurrency)
+        self.on_failure = on_failure
+        self.spool = spool
+        self._replayer: Optional[SpoolReplayer] = None
+        self._http = HTTPClient(origin, pool=pool, tracer=tracer)
+
+        self._stats = AuditStats()
+        self._flush_latency = Histogram()
+        self._batch_size = Histogram(unit=1)
+        self._queue_delay = Histogram()
+
+        self._queue: Deque[_Item] = deque()
+        self._seq = 0          # 最后入队事件的序号
+        self._done_seq = 0     # 已处理（送达或失败）的最大序号
+        self._flush_waiters: List[Tuple[int, asyncio.Future]] = []
+        self._flush_now = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def running(self) -> bool:
+        if self._replayer is not None:
+            return self._replayer.running
+        return self._task is not None and not self._task.done()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def start(self):
+        """启动 flusher（需在事件循环中调用）"""
+        if self.running or self._closed:
+            return
+        if self.spool is not None:
+            if self._replayer is None:
+                self._replayer = SpoolReplayer(
+                    self.spool,
+                    self._deliver,
+                    batch_size=self.batch_size * self.concurrency
+                )
+            self._replayer.start()
+            return
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._space = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def put(self, event: Dict[str, Any]):
+        """
+        事件入队（BLOCK 策略下队列满时等待空间）
+
+        Args:
+            event: 审计事件（``{"agent_id", "action_type", "timestamp", "detail"}``）
+        """
+        self.start()
+        if self.spool is not None:
+            if self._closed:
+                raise RuntimeError("AuditPipeline is closed")
+            await self.spool.append(event)
+            self._stats.submitted += 1
+            return
+        while self.overflow == OverflowPolicy.BLOCK and len(self._queue) >= self.maxsize:
+            self._space.clear()
+            await self._space.wait()
+        self.put_nowait(event)
+
+    def put_nowait(self, event: Dict[str, Any]):
+        """
+        事件入队，不等待
+
+        Raises:
+            asyncio.QueueFull: BLOCK 策略下队列已满
+            RuntimeError: 流水线已关闭
+        """
+        if self._closed:
+            raise RuntimeError("AuditPipeline is closed")
+        self.start()
+        if self.spool is not None:
+            # 不等待 fsync；取走 future 的异常（失败已由 spool 记录日志）
+            self.spool.append_nowait(event).add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._stats.submitted += 1
+            return
+        queue = self._queue
+        if len(queue) >= self.maxsize:
+            if self.overflow == OverflowPolicy.BLOCK:
+                raise asyncio.QueueFull()
+            queue.popleft()
+            self._stats.dropped += 1
+            if self._stats.dropped == 1 or self._stats.dropped % 1000 == 0:
+                logger.warning(f"Audit queue full, dropped {self._stats.dropped} events so far")
+        self._seq += 1
+        queue.append((event, self._seq, time.monotonic()))
+        self._stats.submitted += 1
+        if len(queue) > self._stats.max_queue_depth:
+            self._stats.max_queue_depth = len(queue)
+        # 只在 flusher 可能需要提前醒来时唤醒（首个事件开始计时、攒满一批）
+        if len(queue) == 1 or len(queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        """立即发送队列中的事件，并等待调用前入队的事件处理完成"""
+        if self.spool is not None:
+            self.start()
+            await self.spool.wait_drained()
+            return
+        target = self._seq
+        if self._done_seq >= target or not self._queue and not self.running:
+            return
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._flush_waiters.append((target, future))
+        self._flush_now = True
+        self._wakeup.set()
+        await future
+
+    async def close(self, timeout: float = 5.0):
+        """
+        发送剩余事件并停止 flusher，然后归还连接
+
+        Args:
+            timeout: 等待剩余事件发送的最长时间（秒）
+        """
+        if self._closed:
+            return
+        if self.spool is not None:
+            await self._close_spool(timeout)
+            return
+        try:
+            if self._done_seq < self._seq:
+                await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Audit pipeline closed with {len(self._queue)} unsent events")
+        finally:
+            self._closed = True
+            if self._task is not None:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                self._task = None
+            self._release_waiters()
+            await self._http.close()
+
+    async def _close_spool(self, timeout: float):
+        try:
+            if self.spool.pending:
+                await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.info(f"Audit pipeline closed, {self.spool.pending} events remain in spool for replay")
+        finally:
+            self._closed = True
+            if self._replayer is not None:
+                await self._replayer.stop()
+            await self.spool.close()
+            await self._http.close()
+
+    async def __aenter__(self) -> "AuditPipeline":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def stats(self) -> AuditStats:
+        """获取统计快照"""
+        self._stats.queue_depth = len(self._queue)
+        if self.spool is not None:
+            spool_stats = self.spool.stats()
+            self._stats.queue_depth = spool_stats.pending
+            self._stats.dropped = spool_stats.dropped
+        self._stats.flush_latency = self._flush_latency.snapshot()
+        self._stats.batch_size = self._batch_size.snapshot()
+        self._stats.queue_delay = self._queue_delay.snapshot()
+        return self._stats
+
+    async def _run(self):
+        """flusher 循环：攒批或超时后发送"""
+        queue = self._queue
+        while True:
+            if not queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            deadline = queue[0][2] + self.flush_interval
+            while queue and len(queue) < self.batch_size and not self._flush_now:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if queue:
+                await self._flush_once()
+            if not queue:
+                self._flush_now = False
+
+    async def _flush_once(self):
+        """取出至多 batch_size × concurrency 个事件发送"""
+        queue = self._queue
+        count = min(len(queue), self.batch_size * self.concurrency)
+        items = [queue.popleft() for _ in range(count)]
+        self._space.set()
+
+        result = await self._send([event for event, _, _ in items])
+        now = time.monotonic()
+        failed: List[Dict[str, Any]] = []
+        error: Optional[BaseException] = None
+        for (_, _, enqueued_at), item in zip(items, result.results):
+            if item.ok:
+                self._queue_delay.record(now - enqueued_at)
+            else:
+                failed.append(item.item)
+                error = error or item.error
+        if failed:
+            await self._failed(failed, error)
+
+        self._done_seq = items[-1][1]
+        self._release_waiters(self._done_seq)
+
+    async def _deliver(self, events: List[Dict[str, Any]]):
+        """
+        spool 模式下发送一批事件
+
+        Raises:
+            PartialReplayError: 存在可重试的失败（连接错误、超时、熔断、408 / 429 / 5xx），
+                只重试这些事件；检查点在整批送达后才推进，期间重启会重发整批（至少一次）
+        """
+        result = await self._send(events)
+        failed: List[Dict[str, Any]] = []
+        retry: List[Dict[str, Any]] = []
+        error: Optional[BaseException] = None
+        retry_error: Optional[BaseException] = None
+        for item in result.results:
+            if item.ok:
+                continue
+            if _retryable(item.error):
+                retry.append(item.item)
+                retry_error = retry_error or item.error
+            else:
+                failed.append(item.item)
+                error = error or item.error
+        if failed:
+            await self._failed(failed, error)
+        if retry:
+            raise PartialReplayError(retry, retry_error)
+
+    async def _send(self, events: List[Dict[str, Any]]):
+        """经批量接口（或回退为逐条）发送事件并记录统计"""
+        result = await run_bulk(
+            self._http,
+            events,
+            self._post_single,
+            "report action",
+            batch_path=self.batch_path,
+            batch_key="events",
+            concurrency=self.concurrency,
+            batch_size=self.batch_size
+        )
+        stats = self._stats
+        stats.flushes += 1
+        stats.requests += result.requests
+        if result.batched:
+            stats.batched_flushes += 1
+        stats.delivered += sum(1 for item in result.results if item.ok)
+        self._flush_latency.record(result.elapsed)
+        self._batch_size.record(len(events))
+        return result
+
+    async def _failed(self, events: List[Dict[str, Any]], error: Optional[BaseException]):
+        self._stats.failed += len(events)
+        logger.warning(f"Failed to report {len(events)} audit events: {error}")
+        if self.on_failure is not None:
+            try:
+                outcome = self.on_failure(events, error)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+            except Exception as e:
+                logger.error(f"Audit failure callback error: {e}")
+
+    def _release_waiters(self, done_seq: Optional[int] = None):
+        """唤醒已满足的 flush() 调用方（done_seq 为 None 时全部唤醒）"""
+        waiting = []
+        for target, future in self._flush_waiters:
+            if done_seq is None or target <= done_seq:
+                if not future.done():
+                    future.set_result(None)
+            else:
+                waiting.append((target, future))
+        self._flush_waiters = waiting
+
+    async def _post_single(self, event: Dict[str, Any]) -> Any:
+        response = await self._http.post(self.path, data=event, timeout=10, route=self.path.split("?")[0])
+        if not response.ok:
+            raise BulkItemError("report action", response.status, response.data)
+        return response.data
+
+
+def _retryable(error: Optional[BaseException]) -> bool:
+    """上报错误是否可重试"""
+    if isinstance(error, BulkItemError):
+        return error.status in _RETRYABLE_STATUSES or error.status >= 500
+    return isinstance(error, _RETRYABLE_ERRORS)
@@ -0,0 +1,247 @@
+"""批量操作模块
+
+为批量加成员、批量发消息、批量建房提供统一的执行器：
+
+- 优先调用服务端批量接口（``POST <path>/batch``），按 ``batch_size`` 分块并发发送；
+- 服务端不支持批量接口（405 / 501，或不带 JSON 错误体的 404）时记住该接口，
+  改为逐个请求，并发数由信号量上限控制；带 JSON 错误体的 404（如房间不存在）
+  视为逐项失败，不影响之后的批量调用；
+- 返回逐项的结果与错误（BulkResult），单项失败不影响其他项。
+
+批量接口约定：请求体 ``{<key>: [item, ...]}``，响应体 ``{"results": [...]}`` 与请求
+逐项对应，每项为 ``{"status": 200, "data": {...}}`` 或 ``{"status": 4xx, "error": ...}``。
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+from .http_client import HTTPClient, HTTPResponse
+
+
+logger = logging.getLogger(__name__)
+
+I = TypeVar("I")
+T = TypeVar("T")
+
+# 表示服务端没有批量接口的状态码（404 另需判断响应体，见 _batch_unsupported）
+_UNSUPPORTED_STATUSES = (405, 501)
+
+# 各 HTTPClient 上已探测过的批量接口路由 -> 是否支持
+_batch_support: "weakref.WeakKeyDictionary[HTTPClient, Dict[str, bool]]" = weakref.WeakKeyDictionary()
+
+
+class BulkItemError(Exception):
+    """批量接口中单项失败"""
+
+    def __init__(self, action: str, status: int, error: Any):
+        super().__init__(f"Failed to {action}: {error}")
+        self.status = status
+        self.error = error
+
+
+@dataclass
+class ItemResult(Generic[T]):
+    """单项结果"""
+    index: int                              # 在输入中的位置
+    item: Any                               # 输入项
+    value: Optional[T] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BulkResult(Generic[T]):
+    """批量操作结果（results 与输入顺序一致）"""
+    results: List[ItemResult[T]] = field(default_factory=list)
+    batched: bool = False        # 是否经由服务端批量接口完成
+    requests: int = 0            # 实际发出的 HTTP 请求数
+    elapsed: float = 0.0         # 总耗时（秒）
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results)
+
+    @property
+    def values(self) -> List[T]:
+        """成功项的返回值"""
+        return [result.value for result in self.results if result.ok]
+
+    @property
+    def errors(self) -> List[ItemResult[T]]:
+        """失败项"""
+        return [result for result in self.results if not result.ok]
+
+    def raise_for_errors(self):
+        """存在失败项时抛出第一个错误"""
+        for result in self.results:
+            if result.error is not None:
+                raise result.error
+
+
+async def run_bulk(
+    http: HTTPClient,
+    items: Sequence[I],
+    single: Callable[[I], Awaitable[T]],
+    action: str,
+    batch_path: Optional[str] = None,
+    batch_key: str = "items",
+    batch_route: Optional[str] = None,
+    encode: Optional[Callable[[I], Any]] = None,
+    parse: Optional[Callable[[Any], T]] = None,
+    concurrency: int = 16,
+    batch_size: int = 100
+) -> BulkResult[T]:
+    """
+    执行批量操作
+
+    Args:
+        http: HTTP 客户端实例
+        items: 输入项
+        single: 处理单项的协程函数（回退时使用）
+        action: 操作描述（用于错误信息）
+        batch_path: 批量接口路径（None = 直接逐个请求）
+        batch_key: 批量请求体中列表所在的键
+        batch_route: 批量接口路由模板（用于熔断与统计，记录不支持时也以此为键）
+        encode: 将输入项转换为批量请求体中的元素
+        parse: 将批量响应中的 data 转换为返回值
+        concurrency: 并发请求上限（批量分块与逐个请求共用）
+        batch_size: 每个批量请求包含的项数
+
+    Returns:
+        BulkResult 对象
+    """
+    started = time.monotonic()
+    result: BulkResult[T] = BulkResult(
+        results=[ItemResult(index, item) for index, item in enumerate(items)]
+    )
+    if not result.results:
+        return result
+
+    pending = result.results
+    route = batch_route or batch_path
+    support = _batch_support.setdefault(http, {})
+    if batch_path is not None and support.get(route, True):
+        chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+        async def send_chunk(chunk: List[ItemResult[T]]) -> bool:
+            result.requests += 1
+            return await _send_batch(http, batch_path, batch_key, route, chunk, encode, parse, action)
+
+        # 尚未探测过的接口先只发第一块，确认支持后再并发发送其余块
+        if route not in support:
+            support[route] = await send_chunk(chunks[0])
+            handled = [support[route]]
+            if support[route]:
+                handled += await _bounded(chunks[1:], send_chunk, concurrency)
+        else:
+            handled = await _bounded(chunks, send_chunk, concurrency)
+
+        if all(handled):
+            result.batched = True
+            result.elapsed = time.monotonic() - started
+            return result
+        logger.info(f"Batch endpoint {route} not available, falling back to parallel requests")
+        support[route] = False
+        # 只重做未经批量接口处理的块
+        pending = [
+            entry
+            for chunk, ok in zip(chunks, handled + [False] * (len(chunks) - len(handled)))
+            if not ok
+            for entry in chunk
+        ]
+
+    async def run_single(entry: ItemResult[T]):
+        result.requests += 1
+        try:
+            entry.value = await single(entry.item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            entry.error = e
+
+    await _bounded(pending, run_single, concurrency)
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+async def _bounded(entries: Sequence[Any], worker: Callable[[Any], Awaitable[Any]], concurrency: int) -> List[Any]:
+    """以不超过 concurrency 的并发处理 entries，按输入顺序返回结果"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(entry: Any) -> Any:
+        async with semaphore:
+            return await worker(entry)
+
+    return await asyncio.gather(*(run(entry) for entry in entries))
+
+
+def _batch_unsupported(response: HTTPResponse) -> bool:
+    """
+    判断响应是否表示服务端没有该批量接口
+
+    参数化路由（如 ``/api/rooms/{id}/members/batch``）上的 404 可能只是资源不存在：
+    服务端返回 JSON 错误体时视为业务错误，只有路由级 404（无 JSON 体）才视为不支持。
+    """
+    if response.status in _UNSUPPORTED_STATUSES:
+        return True
+    return response.status == 404 and not isinstance(response.data, dict)
+
+
+async def _send_batch(
+    http: HTTPClient,
+    path: str,
+    key: str,
+    route: str,
+    chunk: List[ItemResult[T]],
+    encode: Optional[Callable[[Any], Any]],
+    parse: Optional[Callable[[Any], T]],
+    action: str
+) -> bool:
+    """
+    发送一个批量请求，逐项填充结果
+
+    Returns:
+        服务端不支持批量接口时返回 False（块内各项保持未处理）
+    """
+    body = [encode(entry.item) if encode else entry.item for entry in chunk]
+    try:
+        response = await http.post(path, data={key: body}, route=route)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        for entry in chunk:
+            entry.error = e
+        return True
+
+    if _batch_unsupported(response):
+        return False
+    if not response.ok:
+        error = BulkItemError(action, response.status, response.data)
+        for entry in chunk:
+            entry.error = error
+        return True
+
+    results = response.data.get("results", []) if isinstance(response.data, dict) else []
+    for position, entry in enumerate(chunk):
+        if position >= len(results):
+            entry.error = BulkItemError(action, response.status, "missing result in batch response")
+            continue
+        item_result = results[position]
+        status = item_result.get("status", 200) if isinstance(item_result, dict) else 200
+        if 200 <= status < 300:
+            data = item_result.get("data") if isinstance(item_result, dict) and "status" in item_result else item_result
+            try:
+                entry.value = parse(data) if parse and data is not None else data
+            except Exception as e:
+                # 单项响应无法解析时只影响该项
+                entry.error = e
+        else:
+            entry.error = BulkItemError(action, status, item_result.get("error", item_result))
+    return True
@@ -0,0 +1,388 @@
+"""缓存模块
+
+提供 TTL + LRU 的有界缓存，以及位于 RoomAPI 之前的缓存层 CachedRoomAPI：
+
+- 条目在 TTL 内直接命中；过期后携带 ``If-None-Match`` 重新验证，304 时续期；
+- 重新验证失败（网络错误、5xx）时可返回过期条目（stale-serve）；
+- 通过 SubscriptionManager 接收成员变化、房间更新事件，使相应条目失效。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from .bulk import BulkResult
+from .http_client import HTTPClient, HTTPResponse
+from .message import SubscriptionManager
+from .models import Room, decode_rooms
+from .resilience import CircuitOpenError
+from .room import RoomAPI
+
+
+logger = logging.getLogger(__name__)
+
+# 使房间缓存失效的事件类型
+ROOM_INVALIDATING_EVENTS = (
+    "m.room.member",
+    "m.room.name",
+    "m.room.topic",
+    "m.room.avatar",
+    "m.room.power_levels",
+    "m.room.join_rules",
+    "m.room.tombstone",
+)
+
+
+@dataclass
+class CacheStats:
+    """缓存统计"""
+    hits: int = 0            # TTL 内命中
+    misses: int = 0          # 无条目或已过期，需请求服务端
+    revalidated: int = 0     # 过期条目经 304 确认未变化
+    stale_served: int = 0    # 重新验证失败时返回过期条目
+    evictions: int = 0       # LRU 淘汰
+    invalidations: int = 0   # 事件或写操作导致的失效
+    size: int = 0
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目"""
+    value: Any
+    etag: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class TTLCache:
+    """TTL + LRU 有界缓存（过期条目保留到被淘汰，用于条件请求与 stale-serve）"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 条目有效期（秒）
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # 进行中的加载：键 -> 并发加载数；加载期间的失效使其代数增加，clear() 使纪元增加
+        self._loading: Dict[Hashable, int] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """获取条目（含过期条目），并标记为最近使用"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, value: Any, etag: Optional[str] = None) -> CacheEntry:
+        """写入条目，超出容量时淘汰最久未使用的条目"""
+        entry = CacheEntry(value, etag, time.monotonic() + self.ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+        self.stats.size = len(self._entries)
+        return entry
+
+    def begin_load(self, key: Hashable) -> Tuple[int, int]:
+        """
+        开始从服务端加载条目
+
+        Returns:
+            加载令牌，传给 complete_load()；加载期间条目被失效时令牌作废
+        """
+        self._loading[key] = self._loading.get(key, 0) + 1
+        return self._epoch, self._generations.get(key, 0)
+
+    def complete_load(self, key: Hashable, token: Tuple[int, int], value: Any, etag: Optional[str] = None) -> bool:
+        """
+        加载完成：加载期间未失效时写入条目
+
+        Returns:
+            是否已写入
+        """
+        current = (self._epoch, self._generations.get(key, 0))
+        self.abort_load(key)
+        if current != token:
+            return False
+        self.set(key, value, etag)
+        return True
+
+    def abort_load(self, key: Hashable):
+        """结束加载但不写入"""
+        count = self._loading.get(key, 0) - 1
+        if count > 0:
+            self._loading[key] = count
+        else:
+            self._loading.pop(key, None)
+            self._generations.pop(key, None)
+
+    def loading_keys(self) -> List[Hashable]:
+        """正在加载的键"""
+        return list(self._loading.keys())
+
+    def touch(self, key: Hashable):
+        """续期条目（重新验证确认未变化）"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self, key: Hashable) -> bool:
+        """使单个条目失效（包括正在加载、尚未写入的）"""
+        if key in self._loading:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        if self._entries.pop(key, None) is None:
+            return False
+        self.stats.invalidations += 1
+        self.stats.size = len(self._entries)
+        return True
+
+    def invalidate_many(self, keys: Iterable[Hashable]):
+        """使一组条目失效"""
+        for key in list(keys):
+            self.invalidate(key)
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries.keys())
+
+    def clear(self):
+        """清空缓存（如会话无法恢复、可能错过失效事件时）"""
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+        self._epoch += 1
+        self.stats.size = 0
+
+
+# aiohttp 的超时为 asyncio.TimeoutError（Python 3.11 之前与内置 TimeoutError 不是同一个类）
+_STALE_ERRORS = (aiohttp.ClientError, ConnectionError, asyncio.TimeoutError, CircuitOpenError)
+
+
+class CachedRoomAPI(RoomAPI):
+    """带缓存的房间 API：get_room / list_rooms 走缓存，写操作与房间事件使缓存失效"""
+
+    def __init__(
+        self,
+        http_client: HTTPClient,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        serve_stale: bool = True,
+        lazy_metadata: bool = False
+    ):
+        """
+        初始化带缓存的房间 API
+
+        Args:
+            http_client: HTTP 客户端实例
+            maxsize: 缓存最大条目数（房间与列表查询共用）
+            ttl: 条目有效期（秒）
+            serve_stale: 重新验证失败时是否返回过期条目
+            lazy_metadata: 是否延迟解码缓存中 Room 的 metadata
+        """
+        super().__init__(http_client, lazy_metadata=lazy_metadata)
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.serve_stale = serve_stale
+        self._subscriptions: Optional[SubscriptionManager] = None
+        self._events: Tuple[str, ...] = ()
+
+    def cache_stats(self) -> CacheStats:
+        """获取命中、未命中与 stale-serve 统计"""
+        return self.cache.stats
+
+    async def get_room(self, room_id: str) -> Room:
+        """获取房间详情（缓存命中时返回共享的 Room 对象，不应就地修改）"""
+        return await self._cached(
+            ("room", room_id),
+            f"/api/rooms/{room_id}",
+            None,
+            "/api/rooms/{id}",
+            self._room,
+            "get room"
+        )
+
+    async def list_rooms(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Room]:
+        """获取房间列表（缓存命中时返回共享的列表，不应就地修改）"""
+        params: Dict[str, Any] = {
+            "limit": limit,
+            "offset": offset,
+        }
+        if user_id:
+            params["user_id"] = user_id
+        return await self._cached(
+            ("list", user_id, limit, offset),
+            "/api/rooms",
+            params,
+            "/api/rooms",
+            lambda data: decode_rooms(data, lazy_metadata=self.lazy_metadata),
+            "list rooms"
+        )
+
+    async def _cached(self, key, path, params, route, parse, action: str):
+        stats = self.cache.stats
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh:
+            stats.hits += 1
+            return entry.value
+
+        stats.misses += 1
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        token = self.cache.begin_load(key)
+        loaded = False
+        try:
+            try:
+                response = await self._http.get(path, params=params, headers=headers, route=route)
+            except _STALE_ERRORS as e:
+                if entry is not None and self.serve_stale:
+                    stats.stale_served += 1
+                    logger.warning(f"Serving stale {key} after error: {e}")
+                    return entry.value
+                raise
+
+            if response.status == 304 and entry is not None:
+                stats.revalidated += 1
+                self.cache.touch(key)
+                return entry.value
+            if response.status >= 500 and entry is not None and self.serve_stale:
+                stats.stale_served += 1
+                return entry.value
+            if not response.ok:
+                raise Exception(f"Failed to {action}: {response.data}")
+
+            value = parse(response.data)
+            # 请求期间收到失效事件时不写回，避免失效前的数据再保留一个完整 TTL
+            self.cache.complete_load(key, token, value, _etag(response))
+            loaded = True
+            return value
+        finally:
+            if not loaded:
+                self.cache.abort_load(key)
+
+    def invalidate_room(self, room_id: Optional[str] = None):
+        """
+        使房间缓存失效
+
+        Args:
+            room_id: 房间 ID（None = 清空全部）；列表查询结果总是一并失效
+        """
+        if room_id is None:
+            self.cache.clear()
+            return
+        self.cache.invalidate(("room", room_id))
+        self._invalidate_lists()
+
+    def _invalidate_lists(self):
+        """列表查询结果（包括正在加载的）全部失效"""
+        keys = self.cache.keys() + self.cache.loading_keys()
+        self.cache.invalidate_many(k for k in keys if k[0] == "list")
+
+    async def attach(
+        self,
+        subscriptions: SubscriptionManager,
+        event_types: Iterable[str] = ROOM_INVALIDATING_EVENTS
+    ):
+        """
+        订阅房间事件，收到时使对应条目失效
+
+        Args:
+            subscriptions: 订阅管理器（WSClient 或多路复用通道上的）
+            event_types: 触发失效的事件类型或模式
+        """
+        await self.detach()
+        self._subscriptions = subscriptions
+        self._events = tuple(event_types)
+        await subscriptions.subscribe_many([(event, self._on_room_event) for event in self._events])
+
+    async def detach(self):
+        """取消事件订阅"""
+        if self._subscriptions is not None:
+            await self._subscriptions.unsubscribe_many(self._events, self._on_room_event)
+            self._subscriptions = None
+
+    def _on_room_event(self, data: Dict[str, Any]):
+        self.invalidate_room(data.get("room_id"))
+
+    # 写操作：调用服务端后使相关条目失效
+
+    async def create_room(self, *args, **kwargs) -> Room:
+        room = await super().create_room(*args, **kwargs)
+        self.invalidate_room(room.id)
+        return room
+
+    async def create_rooms(self, *args, **kwargs) -> BulkResult[Room]:
+        result = await super().create_rooms(*args, **kwargs)
+        self._invalidate_lists()
+        return result
+
+    async def join_room(self, room_id: str, user_id: str) -> Room:
+        try:
+            return await super().join_room(room_id, user_id)
+        finally:
+            self.invalidate_room(room_id)
+
+    async def leave_room(self, room_id: str, user_id: str) -> bool:
+        try:
+            return await super().leave_room(room_id, user_id)
+        finally:
+            self.invalidate_room(room_id)
+
+    async def add_member(self, room_id: str, user_id: str) -> Room:
+        try:
+            return await super().add_member(room_id, user_id)
+        finally:
+            self.invalidate_room(room_id)
+
+    async def add_members(self, room_id: str, *args, **kwargs) -> BulkResult[Room]:
+        try:
+            return await super().add_members(room_id, *args, **kwargs)
+        finally:
+            self.invalidate_room(room_id)
+
+    async def remove_member(self, room_id: str, user_id: str) -> bool:
+        try:
+            return await super().remove_member(room_id, user_id)
+        finally:
+            self.invalidate_room(room_id)
+
+    async def update_room(self, room_id: str, *args, **kwargs) -> Room:
+        try:
+            return await super().update_room(room_id, *args, **kwargs)
+        finally:
+            self.invalidate_room(room_id)
+
+    async def delete_room(self, room_id: str) -> bool:
+        try:
+            return await super().delete_room(room_id)
+        finally:
+            self.invalidate_room(room_id)
+
+
+def _etag(response: HTTPResponse) -> Optional[str]:
+    for name, value in response.headers.items():
+        if name.lower() == "etag":
+            return value
+    return None
@@ -0,0 +1,167 @@
+"""编解码模块
+
+提供可插拔的 JSON 编解码器：安装了 orjson 或 msgspec 时优先使用，
+否则回退到标准库 json。所有编解码器均可直接从 bytes 解码。
+另提供 msgpack 二进制编解码器，用于协商后的 WebSocket 二进制帧。
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 可选依赖
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
+
+class DecodeError(ValueError):
+    """解码失败（各编解码器的解码异常统一为该类型）"""
+
+
+class JSONCodec:
+    """编解码器基类（标准库实现）"""
+
+    name = "json"
+    binary = False
+
+    def dumps(self, obj: Any) -> bytes:
+        """序列化为 UTF-8 bytes"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def dumps_str(self, obj: Any) -> str:
+        """序列化为 str（用于 WebSocket 文本帧）"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        """从 bytes 或 str 反序列化"""
+        try:
+            if isinstance(data, memoryview):
+                data = data.tobytes()
+            return json.loads(data)
+        except (ValueError, TypeError) as e:
+            raise DecodeError(str(e)) from e
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson 实现"""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def dumps_str(self, obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise DecodeError(str(e)) from e
+
+
+class MsgspecCodec(JSONCodec):
+    """msgspec 实现"""
+
+    name = "msgspec"
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def dumps_str(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise DecodeError(str(e)) from e
+
+
+class MsgpackCodec(JSONCodec):
+    """msgpack 二进制实现（仅用于二进制帧，不参与自动选择）"""
+
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def dumps_str(self, obj: Any) -> str:
+        raise TypeError("msgpack codec produces binary frames only")
+
+    def loads(self, data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(data, str):
+            raise DecodeError("msgpack codec cannot decode text")
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except ValueError as e:
+            raise DecodeError(str(e)) from e
+
+
+_CODECS = {
+    "json": (JSONCodec, True),
+    "orjson": (OrjsonCodec, orjson is not None),
+    "msgspec": (MsgspecCodec, msgspec is not None),
+    "msgpack": (MsgpackCodec, msgpack is not None),
+}
+
+# 自动选择时的优先级
+_PREFERENCE = ("orjson", "msgspec", "json")
+
+_instances: Dict[str, JSONCodec] = {}
+
+
+def available_codecs(binary: bool = False) -> List[str]:
+    """
+    列出当前环境可用的编解码器名称
+
+    Args:
+        binary: 是否包含二进制编解码器（msgpack，不能解码 JSON）
+
+    Returns:
+        编解码器名称列表
+    """
+    return [name for name, (cls, ok) in _CODECS.items() if ok and (binary or not cls.binary)]
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """
+    获取编解码器
+
+    Args:
+        name: 编解码器名称（json / orjson / msgspec / msgpack），为空时自动选择最快的可用 JSON 实现
+
+    Returns:
+        JSONCodec 实例
+
+    Raises:
+        ValueError: 指定的编解码器未知或未安装
+    """
+    if name is None:
+        name = next(n for n in _PREFERENCE if _CODECS[n][1])
+    if name not in _CODECS:
+        raise ValueError(f"Unknown codec: {name}")
+    cls, ok = _CODECS[name]
+    if not ok:
+        raise ValueError(f"Codec {name} is not installed")
+    if name not in _instances:
+        _instances[name] = cls()
+    return _instances[name]
+
+
+default_codec = get_codec()
@@ -0,0 +1,281 @@
+"""天枢发现模块
+
+缓存天枢发现结果，避免每次初始化 / 重启都依次探测两个端点：
+
+- 同时请求 ``/.well-known/tianshu-matrix`` 与 ``/api/v1/discovery``，取先成功者；
+- 结果缓存在内存（进程内所有 Agent 共享）与磁盘（跨进程、跨重启）；
+- TTL 内直接返回；过期但在 ``stale_ttl`` 内时先返回旧结果，后台刷新
+  （stale-while-revalidate）；同一事件循环内对同一天枢的并发刷新只发出一次。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .http_client import HTTPClient
+from .pool import ConnectionPool
+from .resilience import ResiliencePolicy
+from .tracing import RequestTracer
+
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_PATHS = ("/.well-known/tianshu-matrix", "/api/v1/discovery")
+
+
+def _default_cache_dir() -> str:
+    base = os.environ.get("TAIBAI_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "ziwei_taibai")
+    return os.path.join(base, "discovery")
+
+
+@dataclass
+class DiscoveryStats:
+    """发现缓存统计"""
+    hits: int = 0            # TTL 内命中（内存或磁盘）
+    disk_loads: int = 0      # 从磁盘载入的条目
+    stale_served: int = 0    # 返回过期条目并后台刷新
+    misses: int = 0          # 无可用条目，等待探测
+    refreshes: int = 0       # 成功的探测
+    failures: int = 0        # 两个端点都失败的探测
+
+
+@dataclass
+class _Entry:
+    value: Dict[str, Any]
+    fetched_at: float        # 墙钟时间（磁盘条目跨进程比较）
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+async def probe_discovery(client: HTTPClient, timeout: float = 10.0) -> Dict[str, Any]:
+    """
+    并发探测两个发现端点，返回先成功的结果
+
+    Args:
+        client: 以天枢 API 地址为 base_url 的 HTTPClient
+        timeout: 单个请求超时（秒）
+
+    Returns:
+        发现结果
+
+    Raises:
+        RuntimeError: 两个端点都失败
+    """
+    async def probe(path: str) -> Dict[str, Any]:
+        response = await client.get(path, timeout=timeout, route=path, coalesce=True)
+        if not response.ok:
+            raise RuntimeError(f"{response.status}: {response.data}")
+        if not isinstance(response.data, dict):
+            raise RuntimeError(f"响应不是 JSON 对象 {response.status}: {response.data}")
+        return response.data
+
+    tasks = {asyncio.ensure_future(probe(path)): path for path in DISCOVERY_PATHS}
+    pending = set(tasks)
+    error: Optional[BaseException] = None
+    failed_path = DISCOVERY_PATHS[-1]
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+                failed_path = tasks[task]
+                logger.debug(f"Discovery via {client.base_url}{failed_path} failed: {error}")
+    finally:
+        for task in pending:
+            task.cancel()
+    raise RuntimeError(f"发现天枢失败: {client.base_url}{failed_path}") from error
+
+
+class DiscoveryCache:
+    """天枢发现结果缓存（内存 + 磁盘，可在线程与事件循环间共享）"""
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        stale_ttl: float = 86400.0,
+        cache_dir: Optional[str] = None,
+        persist: bool = True,
+        timeout: float = 10.0
+    ):
+        """
+        初始化发现缓存
+
+        Args:
+            ttl: 结果有效期（秒）
+            stale_ttl: 过期后仍可先返回旧结果的时长（秒，期间后台刷新）
+            cache_dir: 磁盘缓存目录（默认 $TAIBAI_CACHE_DIR/discovery 或 ~/.cache/ziwei_taibai/discovery）
+            persist: 是否使用磁盘缓存
+            timeout: 探测超时（秒，单个请求与整次探测均以此为上限）
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cache_dir = cache_dir or _default_cache_dir()
+        self.persist = persist
+        self.timeout = timeout
+        self.stats = DiscoveryStats()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._background: Set[asyncio.Future] = set()
+
+    async def get(
+        self,
+        api_base: str,
+        pool: Optional[ConnectionPool] = None,
+        tracer: Optional[RequestTracer] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取发现结果
+
+        Args:
+            api_base: 天枢 API 地址
+            pool: 探测使用的连接池（默认当前事件循环的共享连接池）
+            tracer: 请求阶段计时器
+            refresh: 忽略缓存，强制探测
+
+        Returns:
+            发现结果（共享对象，调用方不应修改）
+        """
+        base = api_base.rstrip("/")
+        entry = None if refresh else self._lookup(base)
+        if entry is not None:
+            if entry.age < self.ttl:
+                self.stats.hits += 1
+                return entry.value
+            if entry.age < self.ttl + self.stale_ttl:
+                self.stats.stale_served += 1
+                task = asyncio.ensure_future(self._refresh(base, pool, tracer))
+                self._background.add(task)
+                task.add_done_callback(self._finish_background)
+                return entry.value
+        self.stats.misses += 1
+        return await self._refresh(base, pool, tracer)
+
+    def invalidate(self, api_base: Optional[str] = None):
+        """删除缓存条目（None = 全部），包括磁盘上的"""
+        with self._lock:
+            bases = list(self._entries) if api_base is None else [api_base.rstrip("/")]
+            for base in bases:
+                self._entries.pop(base, None)
+        if self.persist:
+            for base in bases:
+                try:
+                    os.remove(self._path(base))
+                except OSError:
+                    pass
+
+    def _finish_background(self, task: asyncio.Future):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background discovery refresh failed, keeping stale result: {task.exception()}")
+
+    def _lookup(self, base: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(base)
+        if entry is None and self.persist:
+            entry = self._load(base)
+            if entry is not None:
+                self.stats.disk_loads += 1
+                with self._lock:
+                    entry = self._entries.setdefault(base, entry)
+        return entry
+
+    async def _refresh(
+        self,
+        base: str,
+        pool: Optional[ConnectionPool],
+        tracer: Optional[RequestTracer]
+    ) -> Dict[str, Any]:
+        """探测并更新缓存（同一事件循环内对同一地址只进行一次）"""
+        key = (asyncio.get_running_loop(), base)
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._probe(base, pool, tracer))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(inflight)
+
+    async def _probe(
+        self,
+        base: str,
+        pool: Optional[ConnectionPool],
+        tracer: Optional[RequestTracer]
+    ) -> Dict[str, Any]:
+        # 探测自身并发两个端点，不经重试 / 对冲；整体耗时也以 timeout 为上限
+        client = HTTPClient(base, pool=pool, tracer=tracer, resilience=ResiliencePolicy.disabled())
+        try:
+            try:
+                value = await asyncio.wait_for(probe_discovery(client, self.timeout), self.timeout)
+            except asyncio.TimeoutError as e:
+                raise RuntimeError(f"发现天枢失败: {base}") from e
+        except Exception:
+            self.stats.failures += 1
+            raise
+        finally:
+            await client.close()
+        self.stats.refreshes += 1
+        entry = _Entry(value, time.time())
+        with self._lock:
+            self._entries[base] = entry
+        if self.persist:
+            await asyncio.get_running_loop().run_in_executor(None, self._save, base, entry)
+        return value
+
+    def _path(self, base: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(base.encode()).hexdigest() + ".json")
+
+    def _load(self, base: str) -> Optional[_Entry]:
+        try:
+            with open(self._path(base), "r") as f:
+                data = json.load(f)
+            if data.get("api_base") != base:
+                return None
+            return _Entry(data["value"], float(data["fetched_at"]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"Ignoring unreadable discovery cache for {base}: {e}")
+            return None
+
+    def _save(self, base: str, entry: _Entry):
+        path = self._path(base)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"api_base": base, "fetched_at": entry.fetched_at, "value": entry.value}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"Failed to persist discovery cache for {base}: {e}")
+
+
+# 进程内共享的发现缓存
+_default_cache: Optional[DiscoveryCache] = None
+_default_lock = threading.Lock()
+
+
+def get_discovery_cache() -> DiscoveryCache:
+    """获取进程级共享的发现缓存"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DiscoveryCache()
+        return _default_cache
+
+
+def configure_discovery_cache(cache: DiscoveryCache):
+    """替换进程级共享的发现缓存（如修改 TTL、磁盘目录或关闭磁盘缓存）"""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,232 @@
+"""消息分发模块
+
+为 WebSocket 消息回调提供按订阅者隔离的有界队列与独立 worker，
+慢订阅者只会积压自己的队列，不会阻塞接收循环读帧。
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, List, Optional
+
+from .metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    """队列满时的处理策略"""
+    BLOCK = "block"                # 等待队列腾出空间（对接收循环施加背压）
+    DROP_OLDEST = "drop_oldest"    # 丢弃队列中最旧的消息
+    DISCONNECT = "disconnect"      # 断开（移除）该订阅者
+
+
+@dataclass
+class SubscriberStats:
+    """订阅者统计"""
+    name: str
+    received: int = 0      # 入队消息数
+    delivered: int = 0     # 回调已处理消息数
+    dropped: int = 0       # 因溢出丢弃的消息数
+    errors: int = 0        # 回调异常次数
+    lag: int = 0           # 当前积压（队列长度）
+    max_lag: int = 0       # 历史最大积压
+    disconnected: bool = False
+
+
+class Subscriber:
+    """单个订阅者：有界队列 + worker"""
+
+    def __init__(
+        self,
+        callback: Callable[[Any], Any],
+        maxsize: int = 1000,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        name: Optional[str] = None,
+        latency: Optional[Histogram] = None
+    ):
+        """
+        初始化订阅者
+
+        Args:
+            callback: 回调函数（同步或 async 均可）
+            maxsize: 队列容量
+            overflow: 队列满时的处理策略
+            name: 订阅者名称（用于日志与统计）
+            latency: 记录分发延迟（入队到回调完成）的直方图
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.callback = callback
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.name = name or getattr(callback, "__qualname__", repr(callback))
+        self.stats = SubscriberStats(name=self.name)
+        self.latency = latency
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """启动 worker（需在事件循环中调用）"""
+        if self.running or self.stats.disconnected:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._worker())
+
+    async def stop(self, drain: bool = False):
+        """
+        停止 worker
+
+        Args:
+            drain: 是否先处理完队列中剩余消息
+        """
+        if not self._task:
+            return
+        if drain and self._queue is not None and not self._task.done():
+            await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def put(self, item: Any) -> bool:
+        """
+        投递消息
+
+        Returns:
+            False 表示订阅者因溢出被断开
+        """
+        if self.stats.disconnected:
+            return False
+        if not self.running:
+            self.start()
+        queue = self._queue
+        self.stats.received += 1
+
+        if queue.full():
+            if self.overflow == OverflowPolicy.DISCONNECT:
+                self.stats.dropped += 1
+                self.stats.disconnected = True
+                logger.warning(f"Subscriber {self.name} overflowed, disconnecting")
+                await self.stop()
+                return False
+            if self.overflow == OverflowPolicy.DROP_OLDEST:
+                try:
+                    queue.get_nowait()
+                    queue.task_done()
+                    self.stats.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+
+        await queue.put((item, time.monotonic()))
+        self.stats.lag = queue.qsize()
+        if self.stats.lag > self.stats.max_lag:
+            self.stats.max_lag = self.stats.lag
+        return True
+
+    async def _worker(self):
+        """worker 循环：逐条调用回调"""
+        queue = self._queue
+        while True:
+            item, enqueued_at = await queue.get()
+            try:
+                result = self.callback(item)
+                if inspect.isawaitable(result):
+                    await result
+                if self.latency is not None:
+                    self.latency.record(time.monotonic() - enqueued_at)
+                self.stats.delivered += 1
+            except asyncio.CancelledError:
+                queue.task_done()
+                raise
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Message callback error ({self.name}): {e}")
+            self.stats.lag = queue.qsize()
+            queue.task_done()
+
+
+class Dispatcher:
+    """按订阅者隔离的消息分发器"""
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK
+    ):
+        """
+        初始化分发器
+
+        Args:
+            maxsize: 默认队列容量
+            overflow: 默认溢出策略
+        """
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._subscribers: List[Subscriber] = []
+        self._running = False
+        # 所有订阅者共享的分发延迟直方图
+        self.latency = Histogram()
+
+    def add(
+        self,
+        callback: Callable[[Any], Any],
+        maxsize: Optional[int] = None,
+        overflow: Optional[OverflowPolicy] = None,
+        name: Optional[str] = None
+    ) -> Subscriber:
+        """注册订阅者"""
+        subscriber = Subscriber(
+            callback,
+            maxsize=maxsize or self.maxsize,
+            overflow=overflow or self.overflow,
+            name=name,
+            latency=self.latency
+        )
+        self._subscribers.append(subscriber)
+        if self._running:
+            subscriber.start()
+        return subscriber
+
+    async def remove(self, callback: Callable[[Any], Any]):
+        """移除回调对应的订阅者"""
+        for subscriber in [s for s in self._subscribers if s.callback == callback]:
+            self._subscribers.remove(subscriber)
+            await subscriber.stop()
+
+    def start(self):
+        """启动全部 worker"""
+        self._running = True
+        for subscriber in self._subscribers:
+            subscriber.start()
+
+    async def stop(self, drain: bool = False):
+        """停止全部 worker"""
+        self._running = False
+        for subscriber in self._subscribers:
+            await subscriber.stop(drain=drain)
+
+    async def dispatch(self, item: Any):
+        """将消息投递给所有订阅者；溢出断开的订阅者会被移除"""
+        disconnected = []
+        for subscriber in self._subscribers:
+            if not await subscriber.put(item):
+                disconnected.append(subscriber)
+        for subscriber in disconnected:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def stats(self) -> List[SubscriberStats]:
+        """获取各订阅者统计"""
+        return [s.stats for s in self._subscribers]
@@ -0,0 +1,298 @@
+"""心跳聚合模块
+
+进程内的所有 Agent 共用一个 HeartbeatAggregator，而不是各自每个周期 POST 一次：
+
+- 每个周期收集已登记 Agent 的存活状态，合并为批量请求
+  ``POST /api/v1/agents/heartbeat/batch``（请求体 ``{"heartbeats": [...]}``）；
+  天枢不支持时记住并改为并发逐个上报（见 ``bulk.run_bulk``）；
+- Agent 数超过 ``batch_size`` 时分块，各块分散在周期内发送；周期起点带随机抖动，
+  避免多个进程同时发送；
+- 每个 Agent 的结果（HeartbeatResult）通过其登记的回调返回。
+"""
+
+import asyncio
+import inspect
+import logging
+import random
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .bulk import run_bulk
+from .http_client import HTTPClient
+from .metrics import Histogram
+from .pool import ConnectionPool
+from .tracing import RequestTracer
+
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_PATH = "/api/v1/agents/heartbeat"
+HEARTBEAT_BATCH_PATH = "/api/v1/agents/heartbeat/batch"
+
+
+@dataclass
+class HeartbeatResult:
+    """单个 Agent 的心跳结果"""
+    agent_id: Optional[str]
+    ok: bool
+    data: Any = None
+    error: Optional[BaseException] = None
+    latency: float = 0.0         # 所在请求的耗时（秒）
+
+
+@dataclass
+class HeartbeatStats:
+    """心跳聚合统计"""
+    agents: int = 0              # 当前登记的 Agent 数
+    rounds: int = 0              # 已完成的周期数
+    heartbeats: int = 0          # 已上报的心跳数
+    failures: int = 0            # 失败的心跳数
+    requests: int = 0            # 实际发出的 HTTP 请求数
+    batched_rounds: int = 0      # 全部经由批量接口完成的周期数
+    request_latency: Dict[str, float] = field(default_factory=dict)  # 每块心跳的发送耗时分布（秒）
+
+
+@dataclass
+class _Member:
+    agent: Any                   # agent_id 字符串，或带 agent_id 属性的对象（如 AsyncAgent）
+    callback: Optional[Callable[[HeartbeatResult], Any]]
+    status: str
+
+    @property
+    def agent_id(self) -> Optional[str]:
+        return self.agent if isinstance(self.agent, str) else getattr(self.agent, "agent_id", None)
+
+
+class HeartbeatAggregator:
+    """进程级心跳聚合器（每个周期一次批量请求）"""
+
+    def __init__(
+        self,
+        tianshu_api_base: str,
+        interval: float = 30.0,
+        jitter: float = 0.1,
+        batch_size: int = 1000,
+        concurrency: int = 16,
+        batch_path: str = HEARTBEAT_BATCH_PATH,
+        pool: Optional[ConnectionPool] = None,
+        tracer: Optional[RequestTracer] = None
+    ):
+        """
+        初始化心跳聚合器（登记首个 Agent 时启动，需在事件循环中）
+
+        Args:
+            tianshu_api_base: 天枢 API 地址
+            interval: 心跳周期（秒）
+            jitter: 周期抖动比例（周期长度在 ``interval × (1 ± jitter)`` 内随机）
+            batch_size: 每个批量请求包含的心跳数（超过时分块并分散在周期内发送）
+            concurrency: 逐个上报时的并发请求上限
+            batch_path: 批量接口路径
+            pool: 连接池（默认使用当前事件循环的进程级共享连接池）
+            tracer: 请求阶段计时器（默认不启用）
+        """
+        if not tianshu_api_base:
+            raise ValueError("tianshu_api_base 未设置")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self.tianshu_api_base = tianshu_api_base.rstrip("/")
+        self.interval = interval
+        self.jitter = max(0.0, min(jitter, 1.0))
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.batch_path = batch_path
+        self._pool = pool
+        self._tracer = tracer
+        self._http: Optional[HTTPClient] = None
+        self._members: Dict[Any, _Member] = {}
+        self._stats = HeartbeatStats()
+        self._latency = Histogram()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def register(
+        self,
+        agent: Union[str, Any],
+        callback: Optional[Callable[[HeartbeatResult], Any]] = None,
+        status: str = "online"
+    ):
+        """
+        登记 Agent（已登记时更新回调与状态），并启动聚合器
+
+        Args:
+            agent: agent_id，或带 ``agent_id`` 属性的对象（每个周期读取，注册完成前跳过）
+            callback: 每个周期收到该 Agent 心跳结果时调用（同步或 async）
+            status: 上报的状态
+        """
+        self._members[agent] = _Member(agent, callback, status)
+        self._stats.agents = len(self._members)
+        if not self.running:
+            if self._http is None:
+                self._http = HTTPClient(self.tianshu_api_base, pool=self._pool, tracer=self._tracer)
+            self._task = asyncio.ensure_future(self._run())
+
+    def set_status(self, agent: Union[str, Any], status: str):
+        """修改 Agent 下个周期上报的状态"""
+        member = self._members.get(agent)
+        if member is not None:
+            member.status = status
+
+    async def unregister(self, agent: Union[str, Any]):
+        """注销 Agent；没有 Agent 时停止聚合器并归还连接"""
+        self._members.pop(agent, None)
+        self._stats.agents = len(self._members)
+        if not self._members:
+            await self.close()
+
+    async def beat(self) -> Dict[Optional[str], HeartbeatResult]:
+        """立即为所有已登记的 Agent 发送一次心跳（不影响周期调度）"""
+        members = list(self._members.values())
+        results: Dict[Optional[str], HeartbeatResult] = {}
+        for start in range(0, len(members), self.batch_size):
+            for result in await self._send(members[start:start + self.batch_size]):
+                results[result.agent_id] = result
+        return results
+
+    async def close(self):
+        """停止聚合器并归还连接"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            # 在心跳回调中注销最后一个 Agent 时，由周期任务自身结束
+            if task is not asyncio.current_task():
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def stats(self) -> HeartbeatStats:
+        """获取统计快照"""
+        self._stats.request_latency = self._latency.snapshot()
+        return self._stats
+
+    async def _run(self):
+        """周期循环：起点随机错开，块在周期内分散发送"""
+        await asyncio.sleep(random.uniform(0, self.interval * self.jitter))
+        while True:
+            started = time.monotonic()
+            period = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            members = list(self._members.values())
+            chunks = [members[i:i + self.batch_size] for i in range(0, len(members), self.batch_size)]
+            slot = period / max(1, len(chunks))
+            requests = self._stats.requests
+            batched = await asyncio.gather(*(
+                self._send_after(index * slot + (random.uniform(0, slot * self.jitter) if index else 0.0), chunk)
+                for index, chunk in enumerate(chunks)
+            ))
+            self._stats.rounds += 1
+            if chunks and all(batched):
+                self._stats.batched_rounds += 1
+            logger.debug(
+                f"Heartbeat round: {len(members)} agents, {self._stats.requests - requests} requests, "
+                f"{time.monotonic() - started:.2f}s"
+            )
+            await asyncio.sleep(max(0.0, started + period - time.monotonic()))
+
+    async def _send_after(self, delay: float, members: List[_Member]) -> bool:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        results = await self._send(members)
+        return bool(results) and getattr(results, "batched", False)
+
+    async def _send(self, members: List[_Member]) -> "_Results":
+        """发送一块心跳并回调"""
+        results = _Results()
+        if self._http is None:
+            self._http = HTTPClient(self.tianshu_api_base, pool=self._pool, tracer=self._tracer)
+        ready: List[Tuple[_Member, str]] = []
+        for member in members:
+            agent_id = member.agent_id
+            if agent_id:
+                ready.append((member, agent_id))
+            else:
+                results.append(HeartbeatResult(
+                    None, False, error=ValueError("无 agent_id，请先 register 或设置 VERIFICATION_AGENT_ID")
+                ))
+                await self._callback(member, results[-1])
+
+        if ready:
+            bulk = await run_bulk(
+                self._http,
+                [{"agent_id": agent_id, "status": member.status} for member, agent_id in ready],
+                self._post_single,
+                "send heartbeat",
+                batch_path=self.batch_path,
+                batch_key="heartbeats",
+                concurrency=self.concurrency,
+                batch_size=len(ready)
+            )
+            results.batched = bulk.batched
+            self._stats.requests += bulk.requests
+            self._latency.record(bulk.elapsed)
+            for (member, agent_id), item in zip(ready, bulk.results):
+                result = HeartbeatResult(agent_id, item.ok, item.value, item.error, bulk.elapsed)
+                results.append(result)
+                self._stats.heartbeats += 1
+                if not item.ok:
+                    self._stats.failures += 1
+                await self._callback(member, result)
+        return results
+
+    async def _post_single(self, heartbeat: Dict[str, Any]) -> Any:
+        response = await self._http.post(HEARTBEAT_PATH, data=heartbeat, timeout=10)
+        if not response.ok:
+            raise RuntimeError(f"心跳失败 {response.status}: {response.data}")
+        return response.data
+
+    async def _callback(self, member: _Member, result: HeartbeatResult):
+        if member.callback is None:
+            return
+        try:
+            outcome = member.callback(result)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            logger.error(f"Heartbeat callback error ({result.agent_id}): {e}")
+
+
+class _Results(list):
+    """一块心跳的结果（附带是否经由批量接口）"""
+    batched = False
+
+
+# 各事件循环中按 (天枢地址, 周期) 共享的聚合器
+_aggregators: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, float], HeartbeatAggregator]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_heartbeat_aggregator(tianshu_api_base: str, interval: float = 30.0, **kwargs: Any) -> HeartbeatAggregator:
+    """
+    获取当前事件循环中共享的心跳聚合器（不存在时按参数创建）
+
+    Args:
+        tianshu_api_base: 天枢 API 地址
+        interval: 心跳周期（秒）
+        **kwargs: 创建时传给 HeartbeatAggregator 的其他参数
+
+    Returns:
+        HeartbeatAggregator 实例
+    """
+    aggregators = _aggregators.setdefault(asyncio.get_running_loop(), {})
+    key = (tianshu_api_base.rstrip("/"), float(interval))
+    aggregator = aggregators.get(key)
+    if aggregator is None:
+        aggregator = aggregators[key] = HeartbeatAggregator(tianshu_api_base, interval=interval, **kwargs)
+    return aggregator
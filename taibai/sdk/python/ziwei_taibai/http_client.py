@@ -1,16 +1,45 @@
 """HTTP 客户端模块
 
 提供异步 HTTP 通信支持，支持 GET/POST/PUT/DELETE 方法，
-JSON 序列化/反序列化，以及超时控制。
+JSON 序列化/反序列化，超时控制，以及列表响应的流式解码。
 """
 
 import asyncio
-import json
-from typing import Any, Dict, Optional
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 from dataclasses import dataclass
 
 import aiohttp
 
+from .codec import DecodeError, JSONCodec, default_codec
+from .metrics import Histogram
+from .pool import ConnectionPool, get_pool
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    ResiliencePolicy,
+    ResilienceStats,
+    RetryBudget,
+    route_template,
+)
+from .streaming import JSONStreamDecoder
+from .tracing import RequestTracer
+
+logger = logging.getLogger(__name__)
+
+_IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+_RETRYABLE_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+
+def _freeze(mapping: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """将查询参数 / 请求头转为可哈希的键"""
+    if not mapping:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in mapping.items()))
+
 
 @dataclass
 class HTTPResponse:
@@ -31,7 +60,12 @@ class HTTPClient:
         self,
         base_url: str,
         timeout: float = 30.0,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        codec: Optional[JSONCodec] = None,
+        pool: Optional[ConnectionPool] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+        coalesce_gets: bool = False,
+        tracer: Optional[RequestTracer] = None
     ):
         """
         初始化 HTTP 客户端
@@ -40,19 +74,45 @@ class HTTPClient:
             base_url: 基础 URL
             timeout: 超时时间（秒）
             headers: 默认请求头
+            codec: JSON 编解码器（默认自动选择 orjson/msgspec/json）
+            pool: 连接池（默认使用当前事件循环的进程级共享连接池）
+            resilience: 重试预算、对冲与熔断策略（默认关闭，传入 ResiliencePolicy() 启用）
+            coalesce_gets: 是否默认合并并发的相同 GET 请求（single-flight；默认关闭，也可按调用指定）
+            tracer: 请求阶段计时器（按路由记录 DNS / 建连 / 首字节 / 响应体耗时与慢请求，默认不启用）
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.default_headers = headers or {}
+        self.codec = codec or default_codec
+        self._pool = pool
+        self._acquired: Optional[ConnectionPool] = None
         self._session: Optional[aiohttp.ClientSession] = None
+        
+        # 弹性层：重试预算、按路由的延迟分布与熔断器（需显式启用）
+        self.resilience = resilience if resilience is not None else ResiliencePolicy.disabled()
+        self._retry_budget = RetryBudget(
+            ratio=self.resilience.budget_ratio,
+            min_per_second=self.resilience.budget_min_per_second,
+            max_tokens=self.resilience.budget_max_tokens
+        )
+        self._latency: Dict[str, Histogram] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._circuit_callbacks: list[Callable[[str, CircuitState, CircuitState], Any]] = []
+        self._resilience_stats = ResilienceStats()
+        
+        # single-flight：进行中的 GET，键为 (路径, 查询参数, 请求头, 超时, 路由)
+        self.coalesce_gets = coalesce_gets
+        self._inflight: Dict[Tuple[Any, ...], asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        
+        self.tracer = tracer
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """获取或创建会话"""
+        """获取共享连接池中的会话"""
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(
-                timeout=self.timeout,
-                headers=self.default_headers
-            )
+            # 连接池已关闭时重新获取（旧池无需归还）
+            self._acquired = self._pool or get_pool()
+            self._session = self._acquired.acquire()
         return self._session
     
     async def _build_url(self, path: str) -> str:
@@ -67,22 +127,233 @@ class HTTPClient:
         data: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        route: Optional[str] = None,
+        coalesce: Optional[bool] = None
     ) -> HTTPResponse:
         """
         发送 HTTP 请求
         
+        幂等方法在连接错误、超时或 502/503/504 时按重试预算重试；GET 超过该路由
+        延迟分位数仍未返回时发送对冲请求；路由熔断打开时抛出 CircuitOpenError。
+        启用合并时并发的相同 GET 只发出一次，所有调用方共享同一个 HTTPResponse
+        （含解析后的 data，调用方不应修改）；合并的 GET 可能早于同一资源上并发的
+        写请求开始，只应用于只读、可容忍该情况的路径。
+        
         Args:
             method: HTTP 方法
-            path: data: 请求数据（JSON）
- 请求路径
-                       params: URL 查询参数
+            path: 请求路径
+            data: 请求数据（JSON）
+            params: URL 查询参数
             headers: 请求头
             timeout: 超时时间（覆盖默认）
+            route: 路由模板（如 /api/rooms/{id}，用于熔断与延迟统计；默认由路径推断）
+            coalesce: 是否合并该 GET（None = 使用 coalesce_gets）
             
         Returns:
             HTTPResponse 对象
         """
+        method = method.upper()
+        if coalesce is None:
+            coalesce = self.coalesce_gets
+        if method != 'GET' or not coalesce:
+            return await self._request(method, path, data, params, headers, timeout, route)
+        
+        # 超时与路由也是键的一部分：不同超时的调用方不共享请求，统计按各自路由归属
+        key = (
+            path.lstrip('/'),
+            _freeze(params),
+            _freeze(headers),
+            timeout,
+            route,
+        )
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(
+                self._request(method, path, data, params, headers, timeout, route)
+            )
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda task: self._finish_inflight(key, task))
+        else:
+            self._resilience_stats.coalesced += 1
+        self._waiters[inflight] = self._waiters.get(inflight, 0) + 1
+        try:
+            # shield：单个调用方取消不影响共享同一请求的其他调用方
+            return await asyncio.shield(inflight)
+        finally:
+            remaining = self._waiters.pop(inflight) - 1
+            if remaining:
+                self._waiters[inflight] = remaining
+            elif not inflight.done():
+                # 所有调用方都已取消：共享请求不再有人等待，一并取消
+                inflight.cancel()
+    
+    def _finish_inflight(self, key: Tuple[Any, ...], task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # 调用方已全部离开时，避免 "exception was never retrieved"
+    
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+        route: Optional[str]
+    ) -> HTTPResponse:
+        """经过熔断、重试与对冲的请求"""
+        route = route or route_template(path)
+        policy = self.resilience
+        breaker = self._breaker(route)
+        if breaker is not None and not breaker.allow():
+            self._resilience_stats.short_circuited += 1
+            raise CircuitOpenError(route, breaker.retry_after)
+        
+        self._resilience_stats.requests += 1
+        self._retry_budget.deposit()
+        
+        async def send() -> HTTPResponse:
+            return await self._send(method, path, data, params, headers, timeout, route)
+        
+        attempt = 0
+        recorded = False
+        try:
+            while True:
+                try:
+                    if method == 'GET' and policy.hedge:
+                        response = await self._hedged(route, send)
+                    else:
+                        response = await self._timed(route, send)
+                except _RETRYABLE_ERRORS as e:
+                    error: Optional[BaseException] = e
+                    response = None
+                else:
+                    error = None
+                    if response.status not in policy.retry_statuses:
+                        if breaker is not None:
+                            breaker.record_success()
+                        recorded = True
+                        return response
+                
+                if breaker is not None:
+                    breaker.record_failure()
+                recorded = True
+                if not self._may_retry(method, attempt, breaker):
+                    if error is not None:
+                        raise error
+                    return response
+                
+                attempt += 1
+                recorded = False
+                self._resilience_stats.retries += 1
+                delay = random.uniform(0, min(policy.max_backoff, policy.backoff * (2 ** attempt)))
+                logger.debug(f"Retrying {method} {route} in {delay:.3f}s (attempt {attempt})")
+                await asyncio.sleep(delay)
+        finally:
+            if breaker is not None and not recorded:
+                breaker.release()
+    
+    def _may_retry(self, method: str, attempt: int, breaker: Optional[CircuitBreaker]) -> bool:
+        """幂等、未超过次数、熔断器放行且预算充足时才重试"""
+        if method not in _IDEMPOTENT_METHODS or attempt >= self.resilience.max_retries:
+            return False
+        if breaker is not None and not breaker.allow():
+            return False
+        if not self._retry_budget.withdraw():
+            self._resilience_stats.retries_denied += 1
+            return False
+        return True
+    
+    async def _timed(self, route: str, send: Callable[[], Awaitable[HTTPResponse]]) -> HTTPResponse:
+        """发送一次请求，成功时记录该路由的延迟"""
+        started = time.monotonic()
+        response = await send()
+        if response.status not in self.resilience.retry_statuses:
+            self._route_latency(route).record(time.monotonic() - started)
+        return response
+    
+    async def _hedged(self, route: str, send: Callable[[], Awaitable[HTTPResponse]]) -> HTTPResponse:
+        """
+        对冲 GET：原始请求超过延迟分位数未返回时再发一份，取先成功者并取消另一个
+        """
+        policy = self.resilience
+        latency = self._route_latency(route)
+        if latency.count < policy.hedge_min_samples:
+            return await self._timed(route, send)
+        delay = max(policy.hedge_min_delay, latency.percentile(policy.hedge_percentile))
+        
+        primary = asyncio.ensure_future(self._timed(route, send))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._retry_budget.withdraw():
+                self._resilience_stats.hedges += 1
+                tasks.add(asyncio.ensure_future(self._timed(route, send)))
+            
+            # 取第一个成功（非可重试状态）的结果；全部失败时返回最后一个结果
+            last: Optional[asyncio.Future] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if task.exception() is None and task.result().status not in policy.retry_statuses:
+                        if task is not primary:
+                            self._resilience_stats.hedge_wins += 1
+                        return task.result()
+            return last.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _route_latency(self, route: str) -> Histogram:
+        latency = self._latency.get(route)
+        if latency is None:
+            latency = self._latency[route] = Histogram()
+        return latency
+    
+    def _breaker(self, route: str) -> Optional[CircuitBreaker]:
+        if not self.resilience.breaker:
+            return None
+        breaker = self._breakers.get(route)
+        if breaker is None:
+            breaker = self._breakers[route] = CircuitBreaker(
+                route,
+                failure_threshold=self.resilience.failure_threshold,
+                reset_timeout=self.resilience.reset_timeout,
+                on_state_change=self._circuit_callbacks
+            )
+        return breaker
+    
+    def on_circuit_state_change(self, callback: Callable[[str, CircuitState, CircuitState], Any]):
+        """注册熔断器状态变化回调，参数为 (route, old_state, new_state)"""
+        self._circuit_callbacks.append(callback)
+    
+    def circuit_states(self) -> Dict[str, CircuitState]:
+        """各路由熔断器的当前状态"""
+        return {route: breaker.state for route, breaker in self._breakers.items()}
+    
+    def resilience_stats(self) -> ResilienceStats:
+        """获取重试、对冲与熔断统计"""
+        return self._resilience_stats
+    
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """各路由成功请求的延迟分布快照（秒）"""
+        return {route: h.snapshot() for route, h in self._latency.items()}
+    
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+        route: Optional[str] = None
+    ) -> HTTPResponse:
+        """发送一次请求"""
         session = await self._get_session()
         url = await self._build_url(path)
         
@@ -100,68 +371,215 @@ class HTTPClient:
             request_kwargs['params'] = params
         
         if data is not None:
-            request_kwargs['json'] = data
+            request_kwargs['data'] = self.codec.dumps(data)
+            request_headers.setdefault('Content-Type', 'application/json')
         
         if timeout is not None:
             request_kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        else:
+            request_kwargs['timeout'] = self.timeout
+        
+        timing = None
+        if self.tracer is not None:
+            timing = self.tracer.start(method, route or route_template(path), url)
+            request_kwargs['trace_request_ctx'] = timing
         
-        async with session.request(**request_kwargs) as response:
+        try:
+            async with session.request(**request_kwargs) as response:
+                body = await response.read()
+                if timing is not None:
+                    self.tracer.finish(timing, response.status)
+                response_data = self._decode_body(response, body)
+                
+                return HTTPResponse(
+                    status=response.status,
+                    data=response_data,
+                    headers=dict(response.headers)
+                )
+        except asyncio.CancelledError:
+            # 被取消的请求（如落败的对冲请求）不计入统计
+            raise
+        except Exception as e:
+            if timing is not None:
+                self.tracer.finish(timing, error=e)
+            raise
+    
+    async def stream(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        key: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        route: Optional[str] = None,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[Any]:
+        """
+        流式 GET：边接收边解码列表元素，内存占用与页大小无关
+
+        响应为 NDJSON（``application/x-ndjson`` / ``application/jsonl``）时逐行解码，
+        否则解码顶层 JSON 数组或顶层对象中 ``key`` 对应的数组。经过熔断器，但不重试、
+        不对冲、不合并（已产出的元素无法撤回）。
+
+        Args:
+            path: 请求路径
+            params: URL 查询参数
+            key: 顶层对象中数组所在的键（如 "messages"）
+            headers: 请求头
+            timeout: 超时时间（覆盖默认；流式读取时按两次数据之间的间隔计算）
+            route: 路由模板（默认由路径推断）
+            chunk_size: 每次读取的字节数
+
+        Yields:
+            解码后的列表元素
+
+        Raises:
+            aiohttp.ClientResponseError: 响应状态码非 2xx
+            DecodeError: 响应体不是完整的 JSON 数组
+        """
+        route = route or route_template(path)
+        breaker = self._breaker(route)
+        if breaker is not None and not breaker.allow():
+            self._resilience_stats.short_circuited += 1
+            raise CircuitOpenError(route, breaker.retry_after)
+        self._resilience_stats.requests += 1
+
+        session = await self._get_session()
+        url = await self._build_url(path)
+        request_headers = {
+            **self.default_headers,
+            'Accept': 'application/x-ndjson, application/json',
+        }
+        if headers:
+            request_headers.update(headers)
+        # 总超时会截断长流，改为限制连接与两次读取之间的间隔
+        read_timeout = timeout if timeout is not None else self.timeout.total
+        request_timeout = aiohttp.ClientTimeout(total=None, connect=read_timeout, sock_read=read_timeout)
+
+        timing = self.tracer.start('GET', route, url) if self.tracer is not None else None
+        recorded = False
+        status: Optional[int] = None
+        error: Optional[BaseException] = None
+        try:
+            async with session.get(
+                url,
+                params=params,
+                headers=request_headers,
+                timeout=request_timeout,
+                trace_request_ctx=timing
+            ) as response:
+                status = response.status
+                if breaker is not None:
+                    if response.status in self.resilience.retry_statuses:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                recorded = True
+                if not response.ok:
+                    body = await response.read()
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        response.history,
+                        status=response.status,
+                        message=str(self._decode_body(response, body) or response.reason or ''),
+                        headers=response.headers
+                    )
+
+                content_type = response.content_type
+                decoder = JSONStreamDecoder(
+                    key=key,
+                    ndjson='ndjson' in content_type or 'jsonl' in content_type,
+                    codec=self.codec
+                )
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    for item in decoder.feed(chunk):
+                        yield item
+                    if decoder.done:
+                        break
+                for item in decoder.close():
+                    yield item
+        except _RETRYABLE_ERRORS as e:
+            if breaker is not None and not recorded:
+                breaker.record_failure()
+                recorded = True
+            error = e
+            raise
+        except aiohttp.ClientResponseError:
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if breaker is not None and not recorded:
+                breaker.release()
+            # 读完、非 2xx、出错与提前停止消费（break / aclose()）都计入统计
+            if timing is not None:
+                self.tracer.finish(timing, status, error=error)
+
+    def _decode_body(self, response: aiohttp.ClientResponse, body: bytes) -> Any:
+        """解码响应体：JSON 直接从 bytes 解码，其他类型返回文本"""
+        if 'json' in response.content_type:
+            if not body.strip():
+                return None
             try:
-                response_data = await response.json()
-            except (aiohttp.ContentTypeError, json.JSONDecodeError):
-                response_data = await response.text()
-            
-            return HTTPResponse(
-                status=response.status,
-                data=response_data,
-                headers=dict(response.headers)
-            )
+                return self.codec.loads(body)
+            except DecodeError:
+                pass
+        return body.decode(response.charset or 'utf-8', errors='replace')
     
     async def get(
         self,
         path: str,
         params: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        route: Optional[str] = None,
+        coalesce: Optional[bool] = None
     ) -> HTTPResponse:
-        """发送 GET 请求"""
-        return await self.request('GET', path, params=params, headers=headers, timeout=timeout)
+        """发送 GET 请求（coalesce 见 request()）"""
+        return await self.request(
+            'GET', path, params=params, headers=headers, timeout=timeout, route=route, coalesce=coalesce
+        )
     
     async def post(
         self,
         path: str,
         data: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        route: Optional[str] = None
     ) -> HTTPResponse:
         """发送 POST 请求"""
-        return await self.request('POST', path, data=data, headers=headers, timeout=timeout)
+        return await self.request('POST', path, data=data, headers=headers, timeout=timeout, route=route)
     
     async def put(
         self,
         path: str,
         data: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        route: Optional[str] = None
     ) -> HTTPResponse:
         """发送 PUT 请求"""
-        return await self.request('PUT', path, data=data, headers=headers, timeout=timeout)
+        return await self.request('PUT', path, data=data, headers=headers, timeout=timeout, route=route)
     
     async def delete(
         self,
         path: str,
         data: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        route: Optional[str] = None
     ) -> HTTPResponse:
         """发送 DELETE 请求"""
-        return await self.request('DELETE', path, data=data, headers=headers, timeout=timeout)
+        return await self.request('DELETE', path, data=data, headers=headers, timeout=timeout, route=route)
     
     async def close(self):
-        """关闭会话"""
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        """归还会话（其他客户端仍在使用时，连接保留在共享连接池中）"""
+        if self._acquired is not None:
+            await self._acquired.release()
+            self._acquired = None
+        self._session = None
     
     async def __aenter__(self):
         return self
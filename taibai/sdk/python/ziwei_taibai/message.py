@@ -3,35 +3,49 @@
 提供消息发送和订阅功能。
 """
 
-from typing import Any, Callable, Dict, Optional
-from dataclasses import dataclass
+import asyncio
+import inspect
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from .bulk import BulkResult, run_bulk
 from .http_client import HTTPClient, HTTPResponse
+from .models import Message, decode_message, decode_messages
+from .pagination import Paginator
+from .topic import TopicTrie, validate_pattern
 
 
-@dataclass
-class Message:
-    """消息对象"""
-    id: str
-    sender: str
-    recipient: str
-    content: Any
-    type: str = "text"
-    timestamp: Optional[float] = None
-    metadata: Optional[Dict[str, Any]] = None
+logger = logging.getLogger(__name__)
+
+
+def _encode_message(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """将 send_message 的关键字参数转换为请求体"""
+    data = {
+        "recipient": spec["recipient"],
+        "content": spec["content"],
+        "type": spec.get("msg_type", "text"),
+    }
+    if spec.get("metadata"):
+        data["metadata"] = spec["metadata"]
+    return data
 
 
 class MessageAPI:
     """消息 API"""
     
-    def __init__(self, http_client: HTTPClient):
+    def __init__(self, http_client: HTTPClient, lazy_metadata: bool = False):
         """
         初始化消息 API
         
         Args:
             http_client: HTTP 客户端实例
+            lazy_metadata: 是否延迟解码 Message.metadata（大量保留消息时节省内存）
         """
         self._http = http_client
+        self.lazy_metadata = lazy_metadata
+    
+    def _message(self, msg_data: Dict[str, Any], default_type: str = "text") -> Message:
+        return decode_message(msg_data, default_type, self.lazy_metadata)
     
     async def send_message(
         self,
@@ -52,29 +66,49 @@ class MessageAPI:
         Returns:
             Message 对象
         """
-        data = {
+        data = _encode_message({
             "recipient": recipient,
             "content": content,
-            "type": msg_type,
-        }
-        
-        if metadata:
-            data["metadata"] = metadata
-        
+            "msg_type": msg_type,
+            "metadata": metadata,
+        })
         response = await self._http.post("/api/messages", data=data)
         
         if not response.ok:
             raise Exception(f"Failed to send message: {response.data}")
         
-        msg_data = response.data
-        return Message(
-            id=msg_data.get("id", ""),
-            sender=msg_data.get("sender", ""),
-            recipient=msg_data.get("recipient", ""),
-            content=msg_data.get("content", ""),
-            type=msg_data.get("type", msg_type),
-            timestamp=msg_data.get("timestamp"),
-            metadata=msg_data.get("metadata")
+        return self._message(response.data, msg_type)
+    
+    async def send_messages(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        concurrency: int = 16,
+        batch_size: int = 100
+    ) -> BulkResult[Message]:
+        """
+        批量发送消息
+        
+        优先使用服务端批量接口，不支持时以不超过 concurrency 的并发逐条发送。
+        
+        Args:
+            messages: 消息列表，每项为 send_message 的关键字参数（recipient, content, msg_type, metadata）
+            concurrency: 并发请求上限
+            batch_size: 每个批量请求包含的消息数
+            
+        Returns:
+            BulkResult 对象（逐项的 Message 或错误）
+        """
+        return await run_bulk(
+            self._http,
+            messages,
+            lambda spec: self.send_message(**spec),
+            "send message",
+            batch_path="/api/messages/batch",
+            batch_key="messages",
+            encode=_encode_message,
+            parse=self._message,
+            concurrency=concurrency,
+            batch_size=batch_size
         )
     
     async def get_message(self, message_id: str) -> Message:
@@ -87,21 +121,12 @@ class MessageAPI:
         Returns:
             Message 对象
         """
-        response = await self._http.get(f"/api/messages/{message_id}")
+        response = await self._http.get(f"/api/messages/{message_id}", route="/api/messages/{id}")
         
         if not response.ok:
             raise Exception(f"Failed to get message: {response.data}")
         
-        msg_data = response.data
-        return Message(
-            id=msg_data.get("id", ""),
-            sender=msg_data.get("sender", ""),
-            recipient=msg_data.get("recipient", ""),
-            content=msg_data.get("content", ""),
-            type=msg_data.get("type", "text"),
-            timestamp=msg_data.get("timestamp"),
-            metadata=msg_data.get("metadata")
-        )
+        return self._message(response.data)
     
     async def list_messages(
         self,
@@ -133,19 +158,71 @@ class MessageAPI:
         if not response.ok:
             raise Exception(f"Failed to list messages: {response.data}")
         
-        messages = []
-        for msg_data in response.data.get("messages", []):
-            messages.append(Message(
-                id=msg_data.get("id", ""),
-                sender=msg_data.get("sender", ""),
-                recipient=msg_data.get("recipient", ""),
-                content=msg_data.get("content", ""),
-                type=msg_data.get("type", "text"),
-                timestamp=msg_data.get("timestamp"),
-                metadata=msg_data.get("metadata")
-            ))
+        return decode_messages(response.data, lazy_metadata=self.lazy_metadata)
+    
+    async def stream_messages(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> AsyncIterator[Message]:
+        """
+        流式获取消息列表：边接收边解码，内存占用与 limit 无关
+        
+        Args:
+            user_id: 用户 ID（可选，用于筛选）
+            limit: 返回数量限制
+            offset: 偏移量
+            
+        Yields:
+            Message 对象
+        """
+        params = {
+            "limit": limit,
+            "offset": offset,
+        }
+        
+        if user_id:
+            params["user_id"] = user_id
         
-        return messages
+        async for msg_data in self._http.stream("/api/messages", params=params, key="messages"):
+            yield self._message(msg_data)
+    
+    def iter_messages(
+        self,
+        user_id: Optional[str] = None,
+        page_size: int = 50,
+        prefetch: int = 2,
+        max_items: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Paginator[Message]:
+        """
+        分页迭代消息（``async for``），处理当前页时预取后续页
+        
+        服务端返回 next_cursor / next_batch 时自动切换为游标分页。
+        
+        Args:
+            user_id: 用户 ID（可选，用于筛选）
+            page_size: 每页数量
+            prefetch: 进行中的预取请求上限
+            max_items: 最多返回的数量（None = 全部）
+            cursor: 起始游标（从上次中断处继续）
+            
+        Returns:
+            Paginator 迭代器
+        """
+        params = {"user_id": user_id} if user_id else None
+        return Paginator(
+            self._http,
+            "/api/messages",
+            "messages",
+            self._message,
+            params=params,
+            page_size=page_size,
+            prefetch=prefetch,
+            max_items=max_items,
+            cursor=cursor
+        )
     
     async def delete_message(self, message_id: str) -> bool:
         """
@@ -157,7 +234,7 @@ class MessageAPI:
         Returns:
             是否删除成功
         """
-        response = await self._http.delete(f"/api/messages/{message_id}")
+        response = await self._http.delete(f"/api/messages/{message_id}", route="/api/messages/{id}")
         
         if not response.ok:
             raise Exception(f"Failed to delete message: {response.data}")
@@ -166,7 +243,13 @@ class MessageAPI:
 
 
 class SubscriptionManager:
-    """订阅管理器"""
+    """
+    订阅管理器
+    
+    基于 ``TopicTrie`` 路由：同一事件类型可注册多个回调，支持 ``m.agent.*``
+    （单段通配）与 ``m.#``（多段通配）模式。服务端订阅按模式引用计数，
+    首个回调注册时发送 subscribe，最后一个回调移除时发送 unsubscribe。
+    """
     
     def __init__(self, ws_client):
         """
@@ -176,7 +259,7 @@ class SubscriptionManager:
             ws_client: WebSocket 客户端实例
         """
         self._ws = ws_client
-        self._subscriptions: Dict[str, Callable[[Any], Any]] = {}
+        self._trie = TopicTrie()
     
     async def subscribe(
         self,
@@ -187,45 +270,115 @@ class SubscriptionManager:
         订阅消息
         
         Args:
-            event_type: 事件类型
-            callback: 回调函数
+            event_type: 事件类型或通配模式（如 m.agent.*）
+            callback: 回调函数（同步或 async 均可）
+        """
+        await self.subscribe_many([(event_type, callback)])
+    
+    async def subscribe_many(self, subscriptions: Iterable[Tuple[str, Callable[[Any], Any]]]):
         """
-        self._subscriptions[event_type] = callback
+        批量订阅：新增的模式合并为一个 subscribe 帧发送
         
-        # 发送订阅请求
-        await self._ws.send({
-            "type": "subscribe",
-            "event_type": event_type
-        })
+        Args:
+            subscriptions: (事件类型或模式, 回调) 列表
+
+        Raises:
+            ValueError: 存在不合法的模式（此时不注册任何回调）
+        """
+        subscriptions = list(subscriptions)
+        # 先校验全部模式，避免部分回调已注册而 subscribe 帧未发送
+        for event_type, _ in subscriptions:
+            validate_pattern(event_type)
+        added = [
+            event_type for event_type, callback in subscriptions
+            if self._trie.add(event_type, callback)
+        ]
+        if added:
+            await self._ws.send(self._frame("subscribe", added))
     
-    async def unsubscribe(self, event_type: str):
+    async def unsubscribe(
+        self,
+        event_type: str,
+        callback: Optional[Callable[[Any], Any]] = None
+    ):
         """
         取消订阅
         
         Args:
-            event_type: 事件类型
+            event_type: 事件类型或通配模式
+            callback: 要移除的回调（None = 移除该模式下全部回调）
         """
-        if event_type in self._subscriptions:
-            del self._subscriptions[event_type]
+        await self.unsubscribe_many([event_type], callback)
+    
+    async def unsubscribe_many(
+        self,
+        event_types: Iterable[str],
+        callback: Optional[Callable[[Any], Any]] = None
+    ):
+        """
+        批量取消订阅：不再有回调的模式合并为一个 unsubscribe 帧发送
         
-        # 发送取消订阅请求
-        await self._ws.send({
-            "type": "unsubscribe",
-            "event_type": event_type
-        })
+        Args:
+            event_types: 事件类型或模式列表
+            callback: 要移除的回调（None = 移除全部回调）
+        """
+        removed = [
+            event_type for event_type in event_types
+            if self._trie.remove(event_type, callback)
+        ]
+        if removed:
+            await self._ws.send(self._frame("unsubscribe", removed))
+    
+    async def resubscribe(self):
+        """重新发送全部订阅请求（用于重连后恢复服务端订阅状态）"""
+        patterns = self._trie.patterns()
+        if patterns:
+            await self._ws.send(self._frame("subscribe", patterns))
+    
+    @staticmethod
+    def _frame(frame_type: str, event_types: List[str]) -> Dict[str, Any]:
+        """单个模式沿用 event_type 字段，多个模式使用 event_types 列表"""
+        if len(event_types) == 1:
+            return {"type": frame_type, "event_type": event_types[0]}
+        return {"type": frame_type, "event_types": event_types}
     
     def handle_message(self, msg):
-        """处理接收到的消息"""
-        event_type = msg.data.get("type", "")
+        """
+        处理接收到的消息：调用所有匹配的回调
         
-        if event_type in self._subscriptions:
-            callback = self._subscriptions[event_type]
+        Returns:
+            存在 async 回调时返回等待它们完成的 future，否则为 None
+        """
+        data = msg.data
+        if not isinstance(data, dict):
+            return None
+        event_type = data.get("type", "")
+        if not event_type:
+            return None
+        
+        pending = []
+        for callback in self._trie.match(event_type):
             try:
-                callback(msg.data)
+                result = callback(data)
+                if inspect.isawaitable(result):
+                    pending.append(result)
             except Exception as e:
-                print(f"Subscription callback error: {e}")
+                logger.error(f"Subscription callback error: {e}")
+        if not pending:
+            return None
+        future = asyncio.gather(*pending, return_exceptions=True)
+        future.add_done_callback(_log_callback_errors)
+        return future
     
     @property
     def subscribed_events(self) -> list[str]:
-        """获取已订阅的事件类型列表"""
-        return list(self._subscriptions.keys())
+        """获取已订阅的事件类型（模式）列表"""
+        return self._trie.patterns()
+
+
+def _log_callback_errors(future: asyncio.Future):
+    if future.cancelled():
+        return
+    for result in future.result():
+        if isinstance(result, Exception):
+            logger.error(f"Subscription callback error: {result}")
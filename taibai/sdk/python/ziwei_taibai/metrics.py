@@ -0,0 +1,149 @@
+"""指标模块
+
+提供 HDR 风格的对数-线性分桶直方图，用于记录往返时延、回调分发延迟等，
+在固定相对误差下以很小的内存开销给出 p50/p99/p999 等分位数。
+"""
+
+from typing import Any, Dict, Optional
+
+
+class Histogram:
+    """
+    HDR 风格直方图
+
+    数值按 ``unit`` 量化为整数后分桶：每个 2 的幂区间再均分为 ``2 ** sub_bucket_bits``
+    个子桶，相对误差不超过 ``1 / 2 ** sub_bucket_bits``（默认约 3%）。
+    分桶为稀疏字典，只为出现过的桶分配内存。
+    """
+
+    def __init__(self, unit: float = 1e-6, sub_bucket_bits: int = 5):
+        """
+        初始化直方图
+
+        Args:
+            unit: 量化单位（默认 1 微秒，记录值以秒为单位）
+            sub_bucket_bits: 每个 2 的幂区间的子桶位数（精度）
+        """
+        if unit <= 0:
+            raise ValueError("unit must be positive")
+        if sub_bucket_bits < 1:
+            raise ValueError("sub_bucket_bits must be >= 1")
+        self.unit = unit
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._counts: Dict[int, int] = {}
+        self.reset()
+
+    def reset(self):
+        """清空记录"""
+        self._counts.clear()
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, ticks: int) -> int:
+        if ticks < self._sub_count:
+            return ticks
+        exponent = ticks.bit_length() - 1
+        shift = exponent - self.sub_bucket_bits
+        return ((shift + 1) << self.sub_bucket_bits) + ((ticks >> shift) - self._sub_count)
+
+    def _bucket_value(self, index: int) -> float:
+        """桶的代表值（桶区间中点）"""
+        if index < self._sub_count:
+            return index * self.unit
+        shift = (index >> self.sub_bucket_bits) - 1
+        low = (self._sub_count + (index & (self._sub_count - 1))) << shift
+        return (low + ((1 << shift) - 1) / 2) * self.unit
+
+    def record(self, value: float, count: int = 1):
+        """记录一个数值（负值按 0 计）"""
+        if value < 0:
+            value = 0.0
+        index = self._index(int(value / self.unit))
+        self._counts[index] = self._counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        """合并另一个同配置的直方图"""
+        if other.unit != self.unit or other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("cannot merge histograms with different configuration")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可 JSON 序列化的字典（用于跨进程合并）"""
+        return {
+            "unit": self.unit,
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "counts": {str(index): count for index, count in self._counts.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        """由 to_dict() 的结果重建直方图"""
+        histogram = cls(data["unit"], data["sub_bucket_bits"])
+        histogram._counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        获取分位数
+
+        Args:
+            q: 百分位（0-100）
+
+        Returns:
+            分位数值；无记录时为 0
+        """
+        if not self.count:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 100:
+            return self.max
+        target = self.count * q / 100.0
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                value = self._bucket_value(index)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        """常用统计快照"""
+        return {
+            "count": self.count,
+            "min": self.min or 0.0,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max or 0.0,
+        }
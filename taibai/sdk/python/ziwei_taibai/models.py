@@ -0,0 +1,157 @@
+"""数据模型模块
+
+Room / Message 是带 ``__slots__`` 的 dataclass（无逐实例 ``__dict__``），并由同一组解码函数构造：
+
+- 发送者、接收者、房间 ID、所有者与成员 ID 经 ``sys.intern`` 驻留，
+  大量对象引用同一批 ID 时只保存一份字符串；
+- ``lazy_metadata=True`` 时 metadata 以紧凑 JSON bytes 保存，首次访问时才解码，
+  适合大量缓存但很少读取 metadata 的场景。
+
+内存对比见 ``benchmarks/bench_models.py``。
+"""
+
+import json
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+from .codec import default_codec
+
+
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class _Model:
+    """slotted 模型基类：metadata 存于 ``_metadata`` 槽，延迟解码的在首次访问时解码"""
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（metadata 会被解码；不像 dataclasses.asdict 那样深拷贝）"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        """附加元数据（延迟解码的在首次访问时解码）"""
+        metadata = self._metadata
+        if type(metadata) is bytes:
+            metadata = self._metadata = default_codec.loads(metadata)
+        return metadata
+
+    @metadata.setter
+    def metadata(self, value: Optional[Dict[str, Any]]):
+        self._metadata = value
+
+
+def _slotted(cls: type) -> type:
+    """
+    以 ``__slots__`` 重建 dataclass（同 Python 3.10+ 的 ``dataclass(slots=True)``）
+
+    dataclasses.fields / asdict / replace、生成的 __init__ / __repr__ / __eq__ 照常可用；
+    metadata 字段由 _Model.metadata 属性读写 ``_metadata`` 槽。
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names:
+        namespace.pop(name, None)       # 字段默认值已保存在 __init__ 中
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = tuple("_metadata" if name == "metadata" else name for name in names)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_slotted
+@dataclass
+class Room(_Model):
+    """房间对象"""
+    id: str
+    name: str
+    owner: str
+    members: List[str]
+    created_at: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@_slotted
+@dataclass
+class Message(_Model):
+    """消息对象"""
+    id: str
+    sender: str
+    recipient: str
+    content: Any
+    type: str = "text"
+    timestamp: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def _metadata(data: Dict[str, Any], lazy: bool) -> Any:
+    metadata = data.get("metadata")
+    if lazy and metadata:
+        # 标准库编码结果大小精确；orjson 返回的 bytes 带有预分配余量，长期保存反而更占内存
+        return _JSON_ENCODER.encode(metadata).encode()
+    return metadata
+
+
+def decode_room(data: Dict[str, Any], lazy_metadata: bool = False) -> Room:
+    """
+    由响应数据构造 Room
+
+    Args:
+        data: 房间数据
+        lazy_metadata: 是否延迟解码 metadata
+
+    Returns:
+        Room 对象
+    """
+    get = data.get
+    return Room(
+        _intern(get("id", "")),
+        get("name", ""),
+        _intern(get("owner", "")),
+        [_intern(member) for member in get("members") or ()],
+        get("created_at"),
+        _metadata(data, lazy_metadata)
+    )
+
+
+def decode_message(
+    data: Dict[str, Any],
+    default_type: str = "text",
+    lazy_metadata: bool = False
+) -> Message:
+    """
+    由响应数据构造 Message
+
+    Args:
+        data: 消息数据
+        default_type: 数据中缺少 type 时使用的类型
+        lazy_metadata: 是否延迟解码 metadata
+
+    Returns:
+        Message 对象
+    """
+    get = data.get
+    return Message(
+        get("id", ""),
+        _intern(get("sender", "")),
+        _intern(get("recipient", "")),
+        get("content", ""),
+        _intern(get("type", default_type)),
+        get("timestamp"),
+        _metadata(data, lazy_metadata)
+    )
+
+
+def decode_rooms(data: Dict[str, Any], key: str = "rooms", lazy_metadata: bool = False) -> List[Room]:
+    """由列表响应数据构造 Room 列表"""
+    return [decode_room(item, lazy_metadata) for item in data.get(key) or ()]
+
+
+def decode_messages(data: Dict[str, Any], key: str = "messages", lazy_metadata: bool = False) -> List[Message]:
+    """由列表响应数据构造 Message 列表"""
+    return [decode_message(item, lazy_metadata=lazy_metadata) for item in data.get(key) or ()]
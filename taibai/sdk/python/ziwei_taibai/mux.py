@@ -0,0 +1,313 @@
+"""WebSocket 多路复用模块
+
+在同一个物理 WSClient 上承载多个逻辑通道（每个 agent 一个），
+按通道 ID 或房间 ID 路由入站消息，使连接数随节点数而非 agent 数增长。
+
+帧约定：
+- 出站消息附带 ``channel`` 字段标识所属逻辑通道；
+- ``{"type": "channel_open", "channel": ...}`` / ``{"type": "channel_close", "channel": ...}``
+  通知服务端通道的建立与关闭（重连后自动重新打开）；
+- 入站帧带 ``channel`` 时只投递给该通道；否则带 ``room_id`` 时投递给关注该房间的通道；
+  两者皆无时广播给所有通道。
+"""
+
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .dispatch import Dispatcher, OverflowPolicy, SubscriberStats
+from .message import SubscriptionManager
+from .ws_client import WSClient, WSMessage
+
+
+logger = logging.getLogger(__name__)
+
+FRAME_CHANNEL_OPEN = "channel_open"
+FRAME_CHANNEL_CLOSE = "channel_close"
+
+
+@dataclass
+class MuxStats:
+    """多路复用统计"""
+    channels: int = 0
+    rooms: int = 0
+    routed: int = 0       # 按通道 ID 路由的消息数
+    room_routed: int = 0  # 按房间 ID 路由的消息数
+    broadcast: int = 0    # 广播给全部通道的消息数
+    unrouted: int = 0     # 无匹配通道而丢弃的消息数
+
+
+class Channel:
+    """逻辑通道：在共享连接上代表一个 agent"""
+
+    def __init__(
+        self,
+        mux: "Multiplexer",
+        channel_id: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        初始化逻辑通道
+
+        Args:
+            mux: 所属多路复用器
+            channel_id: 通道 ID（通常为 agent_id）
+            metadata: 打开通道时随 channel_open 帧发送的附加信息
+        """
+        self.id = channel_id
+        self.metadata = metadata or {}
+        self._mux = mux
+        self._rooms: Set[str] = set()
+        self._dispatcher = Dispatcher(
+            maxsize=mux.channel_queue_size,
+            overflow=mux.channel_overflow
+        )
+        self._closed = False
+
+        # 每个通道独立的订阅管理
+        self.subscriptions = SubscriptionManager(self)
+        self._dispatcher.add(self.subscriptions.handle_message, name=f"{channel_id}:subscriptions")
+
+    @property
+    def is_connected(self) -> bool:
+        """底层连接是否可用"""
+        return not self._closed and self._mux.ws.is_connected
+
+    @property
+    def rooms(self) -> List[str]:
+        """该通道关注的房间"""
+        return list(self._rooms)
+
+    def on_message(
+        self,
+        callback: Callable[[WSMessage], Any],
+        queue_size: Optional[int] = None,
+        overflow: Optional[OverflowPolicy] = None
+    ):
+        """注册该通道的消息回调（独立队列 + worker）"""
+        self._dispatcher.add(callback, maxsize=queue_size, overflow=overflow)
+
+    async def send(self, data: Dict[str, Any], wait: bool = False):
+        """
+        通过共享连接发送消息
+
+        Args:
+            data: 要发送的数据（自动附加 channel 字段）
+            wait: 是否等待消息实际写出
+        """
+        if self._closed:
+            raise ConnectionError(f"Channel {self.id} is closed")
+        await self._mux.ws.send({**data, self._mux.channel_field: self.id}, wait=wait)
+
+    def watch_room(self, room_id: str):
+        """关注房间：不带 channel 字段的该房间事件会投递到本通道"""
+        self._rooms.add(room_id)
+        self._mux._add_room_route(room_id, self)
+
+    def unwatch_room(self, room_id: str):
+        """取消关注房间"""
+        self._rooms.discard(room_id)
+        self._mux._remove_room_route(room_id, self)
+
+    def subscriber_stats(self) -> List[SubscriberStats]:
+        """该通道各回调的积压统计"""
+        return self._dispatcher.stats()
+
+    async def close(self):
+        """关闭通道"""
+        await self._mux.close_channel(self.id)
+
+    def _open_frame(self) -> Dict[str, Any]:
+        frame = {"type": FRAME_CHANNEL_OPEN, self._mux.channel_field: self.id}
+        if self.metadata:
+            frame["metadata"] = self.metadata
+        return frame
+
+    async def _deliver(self, msg: WSMessage):
+        await self._dispatcher.dispatch(msg)
+
+
+class Multiplexer:
+    """在一个 WSClient 上复用多个逻辑通道"""
+
+    def __init__(
+        self,
+        ws_client: WSClient,
+        channel_field: str = "channel",
+        channel_queue_size: int = 1000,
+        channel_overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+    ):
+        """
+        初始化多路复用器
+
+        Args:
+            ws_client: 共享的 WebSocket 客户端
+            channel_field: 帧中标识通道的字段名
+            channel_queue_size: 每个通道回调的默认队列容量
+            channel_overflow: 通道回调队列满时的默认策略（默认丢弃最旧，避免单个 agent 阻塞整条连接）
+        """
+        self.ws = ws_client
+        self.channel_field = channel_field
+        self.channel_queue_size = channel_queue_size
+        self.channel_overflow = channel_overflow
+        self._channels: Dict[str, Channel] = {}
+        self._room_routes: Dict[str, Set[Channel]] = {}
+        self._stats = MuxStats()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.ws.on_message(self._route)
+        self.ws.on_connect(self._on_connect)
+
+    @property
+    def channels(self) -> List[str]:
+        """当前打开的通道 ID"""
+        return list(self._channels.keys())
+
+    def get_channel(self, channel_id: str) -> Optional[Channel]:
+        """获取已打开的通道"""
+        return self._channels.get(channel_id)
+
+    async def open_channel(
+        self,
+        channel_id: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Channel:
+        """
+        打开（或获取已存在的）逻辑通道
+
+        Args:
+            channel_id: 通道 ID（通常为 agent_id）
+            metadata: 随 channel_open 帧发送的附加信息
+
+        Returns:
+            Channel 对象
+        """
+        channel = self._channels.get(channel_id)
+        if channel is not None:
+            return channel
+
+        channel = Channel(self, channel_id, metadata)
+        self._channels[channel_id] = channel
+        channel._dispatcher.start()
+        if self.ws.is_connected:
+            await self.ws.send(channel._open_frame())
+        return channel
+
+    async def close_channel(self, channel_id: str):
+        """关闭逻辑通道"""
+        channel = self._channels.pop(channel_id, None)
+        if channel is None:
+            return
+        for room_id in list(channel._rooms):
+            self._remove_room_route(room_id, channel)
+        channel._closed = True
+        await channel._dispatcher.stop()
+        if self.ws.is_connected:
+            await self.ws.send({"type": FRAME_CHANNEL_CLOSE, self.channel_field: channel_id})
+
+    async def connect(self):
+        """建立共享连接"""
+        await self.ws.connect()
+
+    async def close(self):
+        """关闭全部通道与共享连接"""
+        tasks = [task for task in self._tasks if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for channel_id in list(self._channels):
+            await self.close_channel(channel_id)
+        await self.ws.close()
+        shared = _shared.get(asyncio.get_running_loop(), {})
+        if shared.get(self.ws.url) is self:
+            del shared[self.ws.url]
+
+    def stats(self) -> MuxStats:
+        """获取路由统计"""
+        self._stats.channels = len(self._channels)
+        self._stats.rooms = len(self._room_routes)
+        return self._stats
+
+    def _add_room_route(self, room_id: str, channel: Channel):
+        self._room_routes.setdefault(room_id, set()).add(channel)
+
+    def _remove_room_route(self, room_id: str, channel: Channel):
+        channels = self._room_routes.get(room_id)
+        if channels is None:
+            return
+        channels.discard(channel)
+        if not channels:
+            del self._room_routes[room_id]
+
+    async def _route(self, msg: WSMessage):
+        """按 channel / room_id 路由入站消息"""
+        data = msg.data if isinstance(msg.data, dict) else {}
+
+        channel_id = data.get(self.channel_field)
+        if channel_id is not None:
+            channel = self._channels.get(channel_id)
+            if channel is None:
+                self._stats.unrouted += 1
+                return
+            self._stats.routed += 1
+            await channel._deliver(msg)
+            return
+
+        room_id = data.get("room_id")
+        if room_id is not None:
+            channels = self._room_routes.get(room_id)
+            if not channels:
+                self._stats.unrouted += 1
+                return
+            self._stats.room_routed += 1
+            for channel in list(channels):
+                await channel._deliver(msg)
+            return
+
+        self._stats.broadcast += 1
+        for channel in list(self._channels.values()):
+            await channel._deliver(msg)
+
+    def _on_connect(self):
+        """（重）连接后重新打开所有通道并恢复订阅"""
+        if self._channels:
+            task = asyncio.ensure_future(self._reopen_channels())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _reopen_channels(self):
+        for channel in list(self._channels.values()):
+            try:
+                await self.ws.send(channel._open_frame())
+                await channel.subscriptions.resubscribe()
+            except Exception as e:
+                logger.error(f"Failed to reopen channel {channel.id}: {e}")
+
+
+# 各事件循环中按 URL 共享的多路复用器（WSClient 绑定创建它的事件循环）
+_shared: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Multiplexer]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_shared_multiplexer(url: str, **ws_kwargs: Any) -> Multiplexer:
+    """
+    获取当前事件循环中按 URL 共享的多路复用器（需在事件循环中调用）
+
+    同一事件循环中连接同一天枢节点的所有 agent 复用一条 WebSocket 连接。
+
+    Args:
+        url: WebSocket 服务器 URL
+        **ws_kwargs: 首次创建时传给 WSClient 的参数
+
+    Returns:
+        Multiplexer 实例（需调用 connect() 建立连接）
+    """
+    shared = _shared.setdefault(asyncio.get_running_loop(), {})
+    mux = shared.get(url)
+    if mux is None:
+        mux = shared[url] = Multiplexer(WSClient(url, **ws_kwargs))
+    return mux
@@ -0,0 +1,249 @@
+"""出站发送队列模块
+
+将 WebSocket 发送统一交给单个 writer 任务，避免并发发送者争用 socket；
+支持高/低水位背压、小消息合并为批量帧，以及队列深度与发送延迟统计。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+
+logger = logging.getLogger(__name__)
+
+# 批量帧格式：{"type":"batch","messages":[<msg>,<msg>,...]}
+_BATCH_PREFIX = '{"type":"batch","messages":['
+_BATCH_SUFFIX = ']}'
+
+# 队列元素：(已编码帧, 入队时间, 可选的完成 future, 是否可合并)
+_Item = Tuple[Union[str, bytes], float, Optional[asyncio.Future], bool]
+
+
+def _settle(future: asyncio.Future, callback: Callable[[], None]):
+    """future 完成回调：取走异常（避免未检索告警）后通知调用方"""
+    if not future.cancelled():
+        future.exception()
+    callback()
+
+
+@dataclass
+class SendStats:
+    """发送统计"""
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    messages_sent: int = 0
+    frames_sent: int = 0
+    batches_sent: int = 0
+    errors: int = 0
+    last_latency: float = 0.0   # 最近一条消息从入队到写出的耗时（秒）
+    avg_latency: float = 0.0    # 指数加权平均（秒）
+    max_latency: float = 0.0
+
+
+class OutboundQueue:
+    """单 writer 的有界出站队列"""
+
+    def __init__(
+        self,
+        write: Callable[[Union[str, bytes]], Awaitable[None]],
+        maxsize: int = 1000,
+        high_water: Optional[int] = None,
+        low_water: Optional[int] = None,
+        coalesce: bool = False,
+        max_batch_messages: int = 64,
+        max_batch_bytes: int = 64 * 1024,
+        small_message_bytes: int = 4096,
+        ready: Optional[asyncio.Event] = None
+    ):
+        """
+        初始化出站队列
+
+        Args:
+            write: 写出单个帧的协程函数（str 为文本帧，bytes 为二进制帧）
+            maxsize: 队列容量（满时 put 阻塞）
+            high_water: 高水位，达到后 drain() 阻塞（默认 maxsize 的 80%）
+            low_water: 低水位，回落到该值后 drain() 放行（默认 maxsize 的 20%）
+            coalesce: 是否将小消息合并为批量帧（需服务端支持 batch 帧）
+            max_batch_messages: 单个批量帧最多包含的消息数
+            max_batch_bytes: 单个批量帧的最大字节数
+            small_message_bytes: 可参与合并的单条消息上限
+            ready: 可写事件；未置位时 writer 等待（如重连期间）
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self._write = write
+        self.maxsize = maxsize
+        self.high_water = high_water if high_water is not None else max(1, maxsize * 4 // 5)
+        self.low_water = low_water if low_water is not None else maxsize // 5
+        if self.low_water > self.high_water:
+            raise ValueError("low_water must not exceed high_water")
+        self.coalesce = coalesce
+        self.max_batch_messages = max_batch_messages
+        self.max_batch_bytes = max_batch_bytes
+        self.small_message_bytes = small_message_bytes
+        self._ready = ready
+        self.stats = SendStats()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._writable: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._carry: Optional[_Item] = None
+
+    def _ensure_queue(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._writable = asyncio.Event()
+            self._writable.set()
+
+    @property
+    def depth(self) -> int:
+        """当前队列深度"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """启动 writer 任务（需在事件循环中调用）"""
+        self._ensure_queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """停止 writer；未写出的消息以 CancelledError 结束"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            pending = [self._carry] if self._carry is not None else []
+            self._carry = None
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for _, _, future, _ in pending:
+                self._queue.task_done()
+                if future and not future.done():
+                    future.cancel()
+            self._update_depth()
+
+    async def put(
+        self,
+        text: Union[str, bytes],
+        wait: bool = False,
+        coalesce: bool = True,
+        on_dequeued: Optional[Callable[[], None]] = None
+    ):
+        """
+        入队一条已编码的消息
+
+        Args:
+            text: 已序列化的文本（或二进制帧）
+            wait: 是否等待该消息实际写出（写出失败时抛出异常）
+            coalesce: 是否允许与其他消息合并（非 JSON 对象的文本、二进制帧应为 False）
+            on_dequeued: 消息离开队列（写出、失败或取消）时的回调
+        """
+        self._ensure_queue()
+        future = None
+        if wait or on_dequeued is not None:
+            future = asyncio.get_running_loop().create_future()
+            if on_dequeued is not None:
+                future.add_done_callback(lambda f: _settle(f, on_dequeued))
+        await self._queue.put((text, time.monotonic(), future, coalesce))
+        self._update_depth()
+        if wait:
+            await future
+
+    async def drain(self):
+        """等待队列深度回落到低水位以下（若当前未超过高水位则立即返回）"""
+        self._ensure_queue()
+        await self._writable.wait()
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中所有消息写出
+
+        Returns:
+            是否在超时前全部写出
+        """
+        if self._queue is None or self._task is None:
+            return self.depth == 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _update_depth(self):
+        depth = self._queue.qsize()
+        self.stats.queue_depth = depth
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+        if depth >= self.high_water:
+            self._writable.clear()
+        elif depth <= self.low_water:
+            self._writable.set()
+
+    def _collect_batch(self, first: _Item) -> List[_Item]:
+        """从队列中取出可与 first 合并的小消息；放不下的一条留到下一帧"""
+        batch = [first]
+        if not self.coalesce or not first[3] or len(first[0]) > self.small_message_bytes:
+            return batch
+        size = len(first[0])
+        while len(batch) < self.max_batch_messages and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if (not item[3] or len(item[0]) > self.small_message_bytes
+                    or size + len(item[0]) > self.max_batch_bytes):
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0]) + 1
+        return batch
+
+    async def _writer(self):
+        """writer 循环"""
+        queue = self._queue
+        while True:
+            if self._carry is not None:
+                first, self._carry = self._carry, None
+            else:
+                first = await queue.get()
+            batch = self._collect_batch(first)
+            try:
+                if self._ready is not None:
+                    await self._ready.wait()
+                if len(batch) == 1:
+                    frame = batch[0][0]
+                else:
+                    frame = _BATCH_PREFIX + ",".join(item[0] for item in batch) + _BATCH_SUFFIX
+                await self._write(frame)
+            except asyncio.CancelledError:
+                for item in batch:
+                    queue.task_done()
+                    if item[2] and not item[2].done():
+                        item[2].cancel()
+                raise
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Send error: {e}")
+                for item in batch:
+                    if item[2] and not item[2].done():
+                        item[2].set_exception(e)
+            else:
+                now = time.monotonic()
+                self.stats.frames_sent += 1
+                self.stats.messages_sent += len(batch)
+                if len(batch) > 1:
+                    self.stats.batches_sent += 1
+                for _, enqueued_at, future, _ in batch:
+                    latency = now - enqueued_at
+                    self.stats.last_latency = latency
+                    self.stats.avg_latency += (latency - self.stats.avg_latency) * 0.1
+                    if latency > self.stats.max_latency:
+                        self.stats.max_latency = latency
+                    if future and not future.done():
+                        future.set_result(None)
+            for _ in batch:
+                queue.task_done()
+            self._update_depth()
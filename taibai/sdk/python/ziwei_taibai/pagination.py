@@ -0,0 +1,238 @@
+"""分页模块
+
+将 ``limit`` / ``offset`` 列表接口包装为 ``async for`` 迭代器，调用方处理当前页时
+后台预取后续页：
+
+- 服务端响应中带游标（``next_cursor`` / ``next_batch``）时切换为游标分页，后续页按
+  游标请求（深分页不退化），此时每次只能预取下一页；
+- 否则按偏移量分页，可并行预取多页，进行中的预取请求数不超过 ``prefetch``；
+- 响应中带 ``total`` 时不再请求超出范围的页。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from .http_client import HTTPClient
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 响应中表示下一页游标的字段
+CURSOR_KEYS = ("next_cursor", "next_batch")
+
+
+@dataclass
+class PaginatorStats:
+    """分页统计"""
+    pages: int = 0               # 已获取的页数
+    items: int = 0               # 已产出的元素数
+    prefetched: int = 0          # 调用方需要时已就绪的页数
+    waited_seconds: float = 0.0  # 调用方等待页面的累计时长（秒）
+    cursor_mode: bool = False    # 是否已切换为游标分页
+
+
+class Paginator(Generic[T]):
+    """带预取的分页迭代器（``async for item in paginator``）"""
+
+    def __init__(
+        self,
+        http_client: HTTPClient,
+        path: str,
+        key: str,
+        parse: Callable[[Dict[str, Any]], T],
+        params: Optional[Dict[str, Any]] = None,
+        page_size: int = 50,
+        prefetch: int = 2,
+        max_items: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        cursor_param: str = "cursor",
+        route: Optional[str] = None
+    ):
+        """
+        初始化分页迭代器
+
+        Args:
+            http_client: HTTP 客户端实例
+            path: 列表接口路径
+            key: 响应中元素列表所在的键（如 "rooms"）
+            parse: 将单个元素数据转换为对象的函数
+            params: 额外的查询参数（如 user_id）
+            page_size: 每页数量（limit）
+            prefetch: 进行中的预取请求上限（至少 1）
+            max_items: 最多产出的元素数（None = 不限）
+            offset: 起始偏移量
+            cursor: 起始游标（从上次中断处继续时使用）
+            cursor_param: 游标分页时的查询参数名
+            route: 路由模板（默认与 path 相同）
+        """
+        if page_size <= 0:
+            raise ValueError("page_size must be positive")
+        self._http = http_client
+        self.path = path
+        self.key = key
+        self.parse = parse
+        self.params = dict(params or {})
+        self.page_size = page_size
+        self.prefetch = max(1, prefetch)
+        self.max_items = max_items
+        self.cursor_param = cursor_param
+        self.route = route or path
+        self.stats = PaginatorStats(cursor_mode=cursor is not None)
+
+        self._start_offset = offset
+        self._next_offset = offset
+        self._cursor = cursor
+        self._total: Optional[int] = None
+        self._probing = cursor is None      # 首页返回前不知道服务端是否支持游标
+        self._exhausted = False
+        self._pending: Deque["asyncio.Task[Tuple[List[Dict[str, Any]], Optional[str]]]"] = deque()
+        self._page: List[T] = []
+        self._index = 0
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """下一页的游标（游标分页时可保存，用于之后继续）"""
+        return self._cursor
+
+    def __aiter__(self) -> "Paginator[T]":
+        return self
+
+    async def __anext__(self) -> T:
+        if self.max_items is not None and self.stats.items >= self.max_items:
+            await self.aclose()
+            raise StopAsyncIteration
+        while self._index >= len(self._page):
+            page = await self._next_page()
+            if page is None:
+                raise StopAsyncIteration
+            self._page = [self.parse(item) for item in page]
+            self._index = 0
+        item = self._page[self._index]
+        self._index += 1
+        self.stats.items += 1
+        return item
+
+    async def pages(self) -> AsyncIterator[List[T]]:
+        """按页迭代（与逐个迭代共享进度）"""
+        if self._index < len(self._page):
+            rest = self._page[self._index:]
+            self._index = len(self._page)
+            self.stats.items += len(rest)
+            yield rest
+        while self.max_items is None or self.stats.items < self.max_items:
+            page = await self._next_page()
+            if page is None:
+                return
+            if self.max_items is not None:
+                page = page[:self.max_items - self.stats.items]
+            self.stats.items += len(page)
+            yield [self.parse(item) for item in page]
+        await self.aclose()
+
+    async def collect(self) -> List[T]:
+        """读取全部剩余元素"""
+        return [item async for item in self]
+
+    async def aclose(self):
+        """取消进行中的预取请求"""
+        self._exhausted = True
+        while self._pending:
+            task = self._pending.popleft()
+            task.cancel()
+
+    async def __aenter__(self) -> "Paginator[T]":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def _next_page(self) -> Optional[List[Dict[str, Any]]]:
+        """取下一页（按请求顺序），并补充预取"""
+        self._schedule()
+        if not self._pending:
+            return None
+
+        task = self._pending.popleft()
+        if task.done():
+            self.stats.prefetched += 1
+        started = time.monotonic()
+        try:
+            items, next_cursor = await task
+        except BaseException:
+            await self.aclose()
+            raise
+        self.stats.waited_seconds += time.monotonic() - started
+        self.stats.pages += 1
+
+        if self._probing:
+            self._probing = False
+            self.stats.cursor_mode = next_cursor is not None
+            if self.stats.cursor_mode:
+                logger.debug(f"{self.path}: server returned a cursor, switching to cursor pagination")
+        if self.stats.cursor_mode:
+            self._cursor = next_cursor
+            if next_cursor is None or not items:
+                self._exhausted = True
+        elif len(items) < self.page_size:
+            # 偏移量分页的最后一页；之后预取的页都为空
+            await self.aclose()
+
+        if not items:
+            await self.aclose()
+            return None
+        self._schedule()
+        return items
+
+    def _schedule(self):
+        """在上限内发起预取"""
+        if self._exhausted:
+            return
+        if self._probing or self.stats.cursor_mode:
+            # 游标分页依赖上一页的响应，只能逐页预取
+            if not self._pending and (self._probing or self._cursor is not None):
+                self._start({self.cursor_param: self._cursor} if self._cursor is not None else {
+                    "offset": self._next_offset
+                })
+                self._next_offset += self.page_size
+            return
+        while len(self._pending) < self.prefetch:
+            if self._total is not None and self._next_offset >= self._total:
+                self._exhausted = True
+                return
+            if self.max_items is not None and self._next_offset >= self._start_offset + self.max_items:
+                # 不预取 max_items 用不到的页
+                return
+            self._start({"offset": self._next_offset})
+            self._next_offset += self.page_size
+
+    def _start(self, page_params: Dict[str, Any]):
+        params = {**self.params, "limit": self.page_size, **page_params}
+        task = asyncio.ensure_future(self._fetch(params))
+        # 调用方提前退出时，被丢弃的预取结果不产生未取回异常的警告
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._pending.append(task)
+
+    async def _fetch(self, params: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        response = await self._http.get(self.path, params=params, route=self.route)
+        if not response.ok:
+            raise Exception(f"Failed to list {self.key}: {response.data}")
+        data = response.data if response.data is not None else {}
+        if not isinstance(data, dict):
+            raise Exception(f"Failed to list {self.key}: unexpected response {data!r}")
+        total = data.get("total")
+        if isinstance(total, int):
+            self._total = total
+        next_cursor = None
+        for name in CURSOR_KEYS:
+            if data.get(name):
+                next_cursor = str(data[name])
+                break
+        # 服务端可能以 null 表示空页
+        return data.get(self.key) or [], next_cursor
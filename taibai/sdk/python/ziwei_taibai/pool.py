@@ -0,0 +1,287 @@
+"""连接池模块
+
+进程级共享的 aiohttp 会话/连接器注册表：同一事件循环内的 HTTPClient、RoomAPI、
+MessageAPI 与 WSClient 默认共用一个连接池，复用 keep-alive 连接、DNS 缓存与 TLS 上下文。
+
+- HTTP 请求走有上限的连接器（``limit`` / ``limit_per_host`` / ``keepalive_timeout``）；
+- WebSocket 长连接走不限数量的连接器（长连接不归还连接池，计入上限会阻塞后续请求），
+  但与 HTTP 共享 DNS 缓存和 SSLContext。
+"""
+
+import asyncio
+import logging
+import socket
+import ssl
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp.abc import AbstractResolver, ResolveResult
+
+from .tracing import timing_trace_config
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolConfig:
+    """连接池配置"""
+    limit: int = 100                 # 全部主机的 HTTP 并发连接上限（0 = 不限）
+    limit_per_host: int = 20         # 单主机 HTTP 并发连接上限（0 = 不限）
+    keepalive_timeout: float = 30.0  # 空闲连接保活时间（秒）
+    ttl_dns_cache: float = 300.0     # DNS 缓存 TTL（秒，0 = 不缓存）
+    verify_ssl: bool = True
+
+
+@dataclass
+class PoolStats:
+    """连接池利用率统计"""
+    users: int = 0                   # 当前使用该池的客户端数
+    limit: int = 0
+    limit_per_host: int = 0
+    requests: int = 0                # HTTP 请求总数
+    in_flight: int = 0               # 进行中的 HTTP 请求数
+    max_in_flight: int = 0
+    connections_created: int = 0     # 新建连接数
+    connections_reused: int = 0      # 复用 keep-alive 连接数
+    queued: int = 0                  # 因达到连接上限而排队的次数
+    queued_seconds: float = 0.0      # 累计排队时长（秒）
+    ws_connects: int = 0             # WebSocket 建连次数
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+    utilisation: float = 0.0         # in_flight / limit（limit 为 0 时为 0）
+
+
+class _CachingResolver(AbstractResolver):
+    """带 TTL 的共享 DNS 缓存（HTTP 与 WebSocket 连接器共用；并发解析同一主机只查询一次）"""
+
+    def __init__(self, ttl: float, stats: PoolStats):
+        self._resolver = aiohttp.DefaultResolver()
+        self._ttl = ttl
+        self._stats = stats
+        self._cache: Dict[Tuple[str, int, int], Tuple[float, List[ResolveResult]]] = {}
+        self._inflight: Dict[Tuple[str, int, int], asyncio.Future] = {}
+
+    async def resolve(
+        self,
+        host: str,
+        port: int = 0,
+        family: socket.AddressFamily = socket.AF_INET
+    ) -> List[ResolveResult]:
+        key = (host, port, family)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._stats.dns_cache_hits += 1
+            return cached[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats.dns_cache_hits += 1
+            return await asyncio.shield(inflight)
+
+        self._stats.dns_cache_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._resolver.resolve(host, port, family)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        if self._ttl > 0:
+            self._cache[key] = (time.monotonic() + self._ttl, result)
+        future.set_result(result)
+        return result
+
+    async def close(self):
+        self._cache.clear()
+        await self._resolver.close()
+
+
+class ConnectionPool:
+    """一个事件循环内共享的 HTTP / WebSocket 会话"""
+
+    def __init__(self, config: Optional[PoolConfig] = None, auto_close: bool = False):
+        """
+        初始化连接池（会话在首次使用时创建，需在事件循环中）
+
+        Args:
+            config: 连接池配置（默认使用进程级配置）
+            auto_close: 最后一个客户端归还后是否自动关闭（进程级共享池为 True）
+        """
+        self.config = config or _default_config
+        self.auto_close = auto_close
+        self._stats = PoolStats(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host
+        )
+        self._resolver: Optional[_CachingResolver] = None
+        self._ssl: Optional[ssl.SSLContext] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientSession] = None
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def acquire(self, websocket: bool = False) -> aiohttp.ClientSession:
+        """
+        获取共享会话（与 release() 成对调用）
+
+        Args:
+            websocket: 是否用于 WebSocket 长连接
+
+        Returns:
+            共享的 ClientSession（调用方不应关闭）
+        """
+        if self._closed:
+            raise RuntimeError("ConnectionPool is closed")
+        self._stats.users += 1
+        return self._ws_session() if websocket else self._http_session()
+
+    async def release(self):
+        """归还会话；仍有其他客户端使用时连接保留在池中复用"""
+        if self._stats.users > 0:
+            self._stats.users -= 1
+        if self.auto_close and self._stats.users == 0:
+            await self.close()
+
+    def stats(self) -> PoolStats:
+        """获取连接池利用率统计"""
+        if self.config.limit:
+            self._stats.utilisation = self._stats.in_flight / self.config.limit
+        return self._stats
+
+    async def close(self):
+        """关闭全部会话与连接"""
+        self._closed = True
+        for session in (self._http, self._ws):
+            if session is not None and not session.closed:
+                await session.close()
+        self._http = None
+        self._ws = None
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+    def _shared(self) -> Tuple[_CachingResolver, object]:
+        if self._resolver is None:
+            self._resolver = _CachingResolver(self.config.ttl_dns_cache, self._stats)
+        if self._ssl is None and self.config.verify_ssl:
+            # 共享 SSLContext：只加载一次 CA 证书
+            self._ssl = ssl.create_default_context()
+        return self._resolver, (self._ssl if self.config.verify_ssl else False)
+
+    def _http_session(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            resolver, ssl_context = self._shared()
+            connector = aiohttp.TCPConnector(
+                limit=self.config.limit,
+                limit_per_host=self.config.limit_per_host,
+                keepalive_timeout=self.config.keepalive_timeout,
+                use_dns_cache=False,
+                resolver=resolver,
+                ssl=ssl_context
+            )
+            self._http = aiohttp.ClientSession(
+                connector=connector,
+                # 第二个 TraceConfig 只为携带 RequestTiming 的请求（启用了 tracer 的 HTTPClient）计时
+                trace_configs=[self._trace_config(), timing_trace_config()]
+            )
+        return self._http
+
+    def _ws_session(self) -> aiohttp.ClientSession:
+        if self._ws is None or self._ws.closed:
+            resolver, ssl_context = self._shared()
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                use_dns_cache=False,
+                resolver=resolver,
+                ssl=ssl_context
+            )
+            trace = aiohttp.TraceConfig()
+            trace.on_request_end.append(self._on_ws_connect)
+            self._ws = aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+        return self._ws
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_end)
+        trace.on_connection_create_end.append(self._on_connection_create)
+        trace.on_connection_reuseconn.append(self._on_connection_reuse)
+        trace.on_connection_queued_start.append(self._on_queued_start)
+        trace.on_connection_queued_end.append(self._on_queued_end)
+        return trace
+
+    async def _on_request_start(self, session, ctx, params):
+        stats = self._stats
+        stats.requests += 1
+        stats.in_flight += 1
+        if stats.in_flight > stats.max_in_flight:
+            stats.max_in_flight = stats.in_flight
+
+    async def _on_request_end(self, session, ctx, params):
+        self._stats.in_flight -= 1
+
+    async def _on_connection_create(self, session, ctx, params):
+        self._stats.connections_created += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self._stats.connections_reused += 1
+
+    async def _on_queued_start(self, session, ctx, params):
+        self._stats.queued += 1
+        ctx.queued_at = time.monotonic()
+
+    async def _on_queued_end(self, session, ctx, params):
+        self._stats.queued_seconds += time.monotonic() - ctx.queued_at
+
+    async def _on_ws_connect(self, session, ctx, params):
+        self._stats.ws_connects += 1
+
+
+_default_config = PoolConfig()
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ConnectionPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def configure_pool(config: PoolConfig):
+    """设置进程级连接池配置（对之后创建的连接池生效）"""
+    global _default_config
+    _default_config = config
+
+
+def get_pool() -> ConnectionPool:
+    """
+    获取当前事件循环的共享连接池（不存在或已关闭时创建）
+
+    共享池在最后一个客户端 close() 后自动关闭，下次使用时重新创建。
+
+    Returns:
+        ConnectionPool 实例
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool.closed:
+        pool = ConnectionPool(auto_close=True)
+        _pools[loop] = pool
+    return pool
+
+
+async def close_pool():
+    """强制关闭当前事件循环的共享连接池"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
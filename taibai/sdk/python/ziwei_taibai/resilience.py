@@ -0,0 +1,225 @@
+"""请求弹性模块
+
+为 HTTPClient 提供：
+- 重试预算（令牌桶）：每个原始请求存入 ``ratio`` 个令牌，重试与对冲请求各消耗一个，
+  故障期间重试流量被限制在正常流量的固定比例内，避免惊群；
+- 对冲请求：幂等 GET 超过该路由延迟的指定分位数仍未返回时，再发一份相同请求，取先成功者；
+- 熔断器：按路由模板（如 ``/api/rooms/{id}``）统计连续失败，打开后快速失败，
+  经过 ``reset_timeout`` 后放行单个探测请求，状态变化可通过回调观察。
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    """熔断器状态"""
+    CLOSED = "closed"          # 正常放行
+    OPEN = "open"              # 快速失败
+    HALF_OPEN = "half_open"    # 放行单个探测请求
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求未发出"""
+
+    def __init__(self, route: str, retry_after: float):
+        super().__init__(f"Circuit open for {route}, retry after {retry_after:.1f}s")
+        self.route = route
+        self.retry_after = retry_after
+
+
+@dataclass
+class ResiliencePolicy:
+    """弹性策略配置"""
+    max_retries: int = 2                                   # 幂等请求最大重试次数（0 = 不重试）
+    retry_statuses: Tuple[int, ...] = (502, 503, 504)      # 可重试的响应状态码
+    backoff: float = 0.05                                  # 退避基数（秒，full jitter 指数退避）
+    max_backoff: float = 1.0                               # 单次退避上限（秒）
+    budget_ratio: float = 0.2                              # 每个请求存入的重试令牌
+    budget_min_per_second: float = 1.0                     # 低流量时的保底重试速率
+    budget_max_tokens: float = 20.0                        # 令牌桶容量
+    hedge: bool = True                                     # 是否对 GET 发送对冲请求
+    hedge_percentile: float = 95.0                         # 对冲触发的延迟分位数
+    hedge_min_samples: int = 20                            # 路由样本不足时不对冲
+    hedge_min_delay: float = 0.01                          # 对冲触发延迟下限（秒）
+    breaker: bool = True                                   # 是否启用熔断器
+    failure_threshold: int = 5                             # 连续失败多少次后打开
+    reset_timeout: float = 30.0                            # 打开后多久进入半开（秒）
+
+    @classmethod
+    def disabled(cls) -> "ResiliencePolicy":
+        """不重试、不对冲、不熔断（HTTPClient 的默认策略）"""
+        return cls(max_retries=0, hedge=False, breaker=False)
+
+
+@dataclass
+class ResilienceStats:
+    """弹性层统计"""
+    requests: int = 0
+    retries: int = 0            # 已执行的重试
+    retries_denied: int = 0     # 因预算不足放弃的重试
+    hedges: int = 0             # 已发出的对冲请求
+    hedge_wins: int = 0         # 对冲请求先于原始请求成功的次数
+    short_circuited: int = 0    # 因熔断快速失败的请求
+    coalesced: int = 0          # 合并到进行中相同 GET 的请求（未发出网络请求）
+
+
+class RetryBudget:
+    """重试预算（令牌桶）"""
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        """
+        初始化重试预算
+
+        Args:
+            ratio: 每个原始请求存入的令牌数（即重试流量占正常流量的上限比例）
+            min_per_second: 保底补充速率（低流量时仍允许少量重试）
+            max_tokens: 令牌桶容量
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        """记录一个原始请求"""
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """申请一次重试（或对冲），预算不足时返回 False"""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+StateChangeCallback = Callable[[str, CircuitState, CircuitState], None]
+
+
+class CircuitBreaker:
+    """单个路由的熔断器"""
+
+    def __init__(
+        self,
+        route: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        on_state_change: Optional[List[StateChangeCallback]] = None
+    ):
+        """
+        初始化熔断器
+
+        Args:
+            route: 路由模板
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开后多久进入半开（秒）
+            on_state_change: 状态变化回调列表，参数为 (route, old, new)
+        """
+        self.route = route
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._callbacks = on_state_change if on_state_change is not None else []
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """距离进入半开的剩余时间（秒）"""
+        if self._state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """是否放行请求（半开状态下只放行一个探测请求）"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._probing = False
+        if self._state != CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self._state == CircuitState.HALF_OPEN or (
+            self._state == CircuitState.CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._transition(CircuitState.OPEN)
+
+    def release(self):
+        """请求被取消、未产生结果时释放探测名额"""
+        self._probing = False
+
+    def _transition(self, new: CircuitState):
+        old, self._state = self._state, new
+        if new == CircuitState.OPEN:
+            logger.warning(f"Circuit for {self.route} opened after {self._failures} failures")
+        else:
+            logger.info(f"Circuit for {self.route}: {old.value} -> {new.value}")
+        for callback in self._callbacks:
+            try:
+                callback(self.route, old, new)
+            except Exception as e:
+                logger.error(f"Circuit state callback error: {e}")
+
+
+_ID_CHARS = re.compile(r"[!$@:%]")
+
+
+def _is_id_segment(segment: str) -> bool:
+    if _ID_CHARS.search(segment) or segment.isdigit() or len(segment) >= 24:
+        return True
+    # 含数字的较长段（如 agent-0001、uuid）；v1 / v2 等版本段保留
+    return len(segment) > 3 and any(c.isdigit() for c in segment)
+
+
+def route_template(path: str) -> str:
+    """
+    由请求路径推断路由模板（未显式传入 route 时使用）
+
+    纯数字、含 Matrix 标识符字符（``! $ @ : %``）、含数字的较长段或过长的路径段
+    视为 ID，替换为 ``{id}``，如 ``/api/rooms/!abc:example.com/members`` →
+    ``/api/rooms/{id}/members``。
+    """
+    path = path.split("?", 1)[0]
+    segments = [
+        "{id}" if segment and _is_id_segment(segment) else segment
+        for segment in path.strip("/").split("/")
+    ]
+    return "/" + "/".join(segments)
@@ -3,34 +3,30 @@
 提供房间创建、加入和管理功能。
 """
 
-from typing import Any, Dict, List, Optional
-from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
 
+from .bulk import BulkResult, run_bulk
 from .http_client import HTTPClient
-
-
-@dataclass
-class Room:
-    """房间对象"""
-    id: str
-    name: str
-    owner: str
-    members: List[str]
-    created_at: Optional[float] = None
-    metadata: Optional[Dict[str, Any]] = None
+from .models import Room, decode_room, decode_rooms
+from .pagination import Paginator
 
 
 class RoomAPI:
     """房间 API"""
     
-    def __init__(self, http_client: HTTPClient):
+    def __init__(self, http_client: HTTPClient, lazy_metadata: bool = False):
         """
         初始化房间 API
         
         Args:
             http_client: HTTP 客户端实例
+            lazy_metadata: 是否延迟解码 Room.metadata（大量缓存房间时节省内存）
         """
         self._http = http_client
+        self.lazy_metadata = lazy_metadata
+    
+    def _room(self, room_data: Dict[str, Any]) -> Room:
+        return decode_room(room_data, self.lazy_metadata)
     
     async def create_room(
         self,
@@ -65,13 +61,35 @@ class RoomAPI:
             raise Exception(f"Failed to create room: {response.data}")
         
         room_data = response.data
-        return Room(
-            id=room_data.get("id", ""),
-            name=room_data.get("name", ""),
-            owner=room_data.get("owner", ""),
-            members=room_data.get("members", []),
-            created_at=room_data.get("created_at"),
-            metadata=room_data.get("metadata")
+        return self._room(room_data)
+    
+    async def create_rooms(
+        self,
+        rooms: Sequence[Dict[str, Any]],
+        concurrency: int = 16,
+        batch_size: int = 100
+    ) -> BulkResult[Room]:
+        """
+        批量创建房间
+        
+        Args:
+            rooms: 房间参数列表，每项为 create_room 的关键字参数（name, members, metadata）
+            concurrency: 并发请求上限
+            batch_size: 每个批量请求包含的房间数
+            
+        Returns:
+            BulkResult 对象（逐项的 Room 或错误）
+        """
+        return await run_bulk(
+            self._http,
+            rooms,
+            lambda spec: self.create_room(**spec),
+            "create room",
+            batch_path="/api/rooms/batch",
+            batch_key="rooms",
+            parse=self._room,
+            concurrency=concurrency,
+            batch_size=batch_size
         )
     
     async def get_room(self, room_id: str) -> Room:
@@ -84,20 +102,13 @@ class RoomAPI:
         Returns:
             Room 对象
         """
-        response = await self._http.get(f"/api/rooms/{room_id}")
+        response = await self._http.get(f"/api/rooms/{room_id}", route="/api/rooms/{id}")
         
         if not response.ok:
             raise Exception(f"Failed to get room: {response.data}")
         
         room_data = response.data
-        return Room(
-            id=room_data.get("id", ""),
-            name=room_data.get("name", ""),
-            owner=room_data.get("owner", ""),
-            members=room_data.get("members", []),
-            created_at=room_data.get("created_at"),
-            metadata=room_data.get("metadata")
-        )
+        return self._room(room_data)
     
     async def list_rooms(
         self,
@@ -129,18 +140,71 @@ class RoomAPI:
         if not response.ok:
             raise Exception(f"Failed to list rooms: {response.data}")
         
-        rooms = []
-        for room_data in response.data.get("rooms", []):
-            rooms.append(Room(
-                id=room_data.get("id", ""),
-                name=room_data.get("name", ""),
-                owner=room_data.get("owner", ""),
-                members=room_data.get("members", []),
-                created_at=room_data.get("created_at"),
-                metadata=room_data.get("metadata")
-            ))
-        
-        return rooms
+        return decode_rooms(response.data, lazy_metadata=self.lazy_metadata)
+    
+    async def stream_rooms(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> AsyncIterator[Room]:
+        """
+        流式获取房间列表：边接收边解码，内存占用与 limit 无关
+        
+        Args:
+            user_id: 用户 ID（可选，用于筛选用户加入的房间）
+            limit: 返回数量限制
+            offset: 偏移量
+            
+        Yields:
+            Room 对象
+        """
+        params = {
+            "limit": limit,
+            "offset": offset,
+        }
+        
+        if user_id:
+            params["user_id"] = user_id
+        
+        async for room_data in self._http.stream("/api/rooms", params=params, key="rooms"):
+            yield self._room(room_data)
+    
+    def iter_rooms(
+        self,
+        user_id: Optional[str] = None,
+        page_size: int = 50,
+        prefetch: int = 2,
+        max_items: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Paginator[Room]:
+        """
+        分页迭代房间（``async for``），处理当前页时预取后续页
+        
+        服务端返回 next_cursor / next_batch 时自动切换为游标分页。
+        
+        Args:
+            user_id: 用户 ID（可选，用于筛选用户加入的房间）
+            page_size: 每页数量
+            prefetch: 进行中的预取请求上限
+            max_items: 最多返回的数量（None = 全部）
+            cursor: 起始游标（从上次中断处继续）
+            
+        Returns:
+            Paginator 迭代器
+        """
+        params = {"user_id": user_id} if user_id else None
+        return Paginator(
+            self._http,
+            "/api/rooms",
+            "rooms",
+            self._room,
+            params=params,
+            page_size=page_size,
+            prefetch=prefetch,
+            max_items=max_items,
+            cursor=cursor
+        )
     
     async def join_room(self, room_id: str, user_id: str) -> Room:
         """
@@ -155,21 +219,15 @@ class RoomAPI:
         """
         response = await self._http.post(
             f"/api/rooms/{room_id}/join",
-            data={"user_id": user_id}
+            data={"user_id": user_id},
+            route="/api/rooms/{id}/join"
         )
         
         if not response.ok:
             raise Exception(f"Failed to join room: {response.data}")
         
         room_data = response.data
-        return Room(
-            id=room_data.get("id", ""),
-            name=room_data.get("name", ""),
-            owner=room_data.get("owner", ""),
-            members=room_data.get("members", []),
-            created_at=room_data.get("created_at"),
-            metadata=room_data.get("metadata")
-        )
+        return self._room(room_data)
     
     async def leave_room(self, room_id: str, user_id: str) -> bool:
         """
@@ -184,7 +242,8 @@ class RoomAPI:
         """
         response = await self._http.post(
             f"/api/rooms/{room_id}/leave",
-            data={"user_id": user_id}
+            data={"user_id": user_id},
+            route="/api/rooms/{id}/leave"
         )
         
         if not response.ok:
@@ -205,20 +264,48 @@ class RoomAPI:
         """
         response = await self._http.post(
             f"/api/rooms/{room_id}/members",
-            data={"user_id": user_id}
+            data={"user_id": user_id},
+            route="/api/rooms/{id}/members"
         )
         
         if not response.ok:
             raise Exception(f"Failed to add member: {response.data}")
         
         room_data = response.data
-        return Room(
-            id=room_data.get("id", ""),
-            name=room_data.get("name", ""),
-            owner=room_data.get("owner", ""),
-            members=room_data.get("members", []),
-            created_at=room_data.get("created_at"),
-            metadata=room_data.get("metadata")
+        return self._room(room_data)
+    
+    async def add_members(
+        self,
+        room_id: str,
+        user_ids: Sequence[str],
+        concurrency: int = 16,
+        batch_size: int = 100
+    ) -> BulkResult[Room]:
+        """
+        批量添加房间成员
+        
+        优先使用服务端批量接口，不支持时以不超过 concurrency 的并发逐个添加。
+        
+        Args:
+            room_id: 房间 ID
+            user_ids: 用户 ID 列表
+            concurrency: 并发请求上限
+            batch_size: 每个批量请求包含的用户数
+            
+        Returns:
+            BulkResult 对象（逐项的 Room 或错误）
+        """
+        return await run_bulk(
+            self._http,
+            user_ids,
+            lambda user_id: self.add_member(room_id, user_id),
+            "add member",
+            batch_path=f"/api/rooms/{room_id}/members/batch",
+            batch_key="user_ids",
+            batch_route="/api/rooms/{id}/members/batch",
+            parse=self._room,
+            concurrency=concurrency,
+            batch_size=batch_size
         )
     
     async def remove_member(self, room_id: str, user_id: str) -> bool:
@@ -233,7 +320,8 @@ class RoomAPI:
             是否移除成功
         """
         response = await self._http.delete(
-            f"/api/rooms/{room_id}/members/{user_id}"
+            f"/api/rooms/{room_id}/members/{user_id}",
+            route="/api/rooms/{id}/members/{user_id}"
         )
         
         if not response.ok:
@@ -266,20 +354,13 @@ class RoomAPI:
         if metadata:
             data["metadata"] = metadata
         
-        response = await self._http.put(f"/api/rooms/{room_id}", data=data)
+        response = await self._http.put(f"/api/rooms/{room_id}", data=data, route="/api/rooms/{id}")
         
         if not response.ok:
             raise Exception(f"Failed to update room: {response.data}")
         
         room_data = response.data
-        return Room(
-            id=room_data.get("id", ""),
-            name=room_data.get("name", ""),
-            owner=room_data.get("owner", ""),
-            members=room_data.get("members", []),
-            created_at=room_data.get("created_at"),
-            metadata=room_data.get("metadata")
-        )
+        return self._room(room_data)
     
     async def delete_room(self, room_id: str) -> bool:
         """
@@ -291,7 +372,7 @@ class RoomAPI:
         Returns:
             是否删除成功
         """
-        response = await self._http.delete(f"/api/rooms/{room_id}")
+        response = await self._http.delete(f"/api/rooms/{room_id}", route="/api/rooms/{id}")
         
         if not response.ok:
             raise Exception(f"Failed to delete room: {response.data}")
@@ -0,0 +1,123 @@
+"""可恢复会话模块
+
+跟踪 WebSocket 会话的收发序号：入站按 seq 去重并记录最后确认的序号，
+出站在有界重放缓冲区中保留未被服务端确认的消息，重连后据此续传。
+
+帧约定：
+- 服务端 → 客户端：事件帧带 ``seq``；``{"type": "session", "session_id": ...}`` 下发会话 ID；
+  ``{"type": "ack", "ack": N}`` 确认客户端 seq <= N 的消息；
+  ``{"type": "resume_failed"}`` 表示会话无法恢复。
+- 客户端 → 服务端：出站消息带 ``seq``；``{"type": "ack", "ack": N}`` 确认已收到的事件；
+  重连后首帧 ``{"type": "resume", "session_id": ..., "last_seq": N}``。
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+FRAME_SESSION = "session"
+FRAME_ACK = "ack"
+FRAME_RESUME = "resume"
+FRAME_RESUME_FAILED = "resume_failed"
+
+
+@dataclass
+class SessionStats:
+    """会话恢复统计"""
+    resumes: int = 0              # 发起恢复次数
+    resume_failures: int = 0      # 服务端拒绝恢复次数
+    replayed: int = 0             # 重连后重放的出站消息数
+    duplicates_dropped: int = 0   # 按 seq 丢弃的重复入站事件数
+    replay_dropped: int = 0       # 重放缓冲区溢出丢弃的出站消息数
+    unacked: int = 0              # 当前未确认的出站消息数
+
+
+class ResumeState:
+    """会话序号与重放缓冲区"""
+
+    def __init__(self, replay_buffer_size: int = 1000):
+        """
+        初始化会话状态
+
+        Args:
+            replay_buffer_size: 未确认出站消息的最大保留条数
+        """
+        if replay_buffer_size <= 0:
+            raise ValueError("replay_buffer_size must be positive")
+        self.replay_buffer_size = replay_buffer_size
+        self.session_id: Optional[str] = None
+        self.last_received_seq = 0
+        self.last_acked_seq = 0
+        self.stats = SessionStats()
+        self._next_seq = 1
+        # seq -> [消息, 是否已离开出站队列]
+        self._unacked: "OrderedDict[int, List[Any]]" = OrderedDict()
+
+    def stamp(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """为出站消息分配 seq 并放入重放缓冲区"""
+        seq = self._next_seq
+        self._next_seq += 1
+        stamped = dict(data)
+        stamped["seq"] = seq
+        if len(self._unacked) >= self.replay_buffer_size:
+            self._unacked.popitem(last=False)
+            self.stats.replay_dropped += 1
+        self._unacked[seq] = [stamped, False]
+        self.stats.unacked = len(self._unacked)
+        return stamped
+
+    def mark_dequeued(self, seq: int):
+        """标记消息已离开出站队列（已写出或写出失败），重连时需重放"""
+        entry = self._unacked.get(seq)
+        if entry is not None:
+            entry[1] = True
+
+    def ack(self, seq: int):
+        """服务端确认 seq 及之前的所有出站消息"""
+        if seq <= self.last_acked_seq:
+            return
+        self.last_acked_seq = seq
+        while self._unacked:
+            first = next(iter(self._unacked))
+            if first > seq:
+                break
+            del self._unacked[first]
+        self.stats.unacked = len(self._unacked)
+
+    def observe(self, seq: int) -> bool:
+        """
+        记录入站事件 seq
+
+        Returns:
+            False 表示重复事件（已收到过），应丢弃
+        """
+        if seq <= self.last_received_seq:
+            self.stats.duplicates_dropped += 1
+            return False
+        self.last_received_seq = seq
+        return True
+
+    def resume_frame(self) -> Dict[str, Any]:
+        """重连后发送的恢复帧"""
+        self.stats.resumes += 1
+        return {
+            "type": FRAME_RESUME,
+            "session_id": self.session_id,
+            "last_seq": self.last_received_seq,
+        }
+
+    def ack_frame(self) -> Dict[str, Any]:
+        """确认已收到事件的帧"""
+        return {"type": FRAME_ACK, "ack": self.last_received_seq}
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """需要重放的出站消息（未确认且已离开出站队列）"""
+        messages = [entry[0] for entry in self._unacked.values() if entry[1]]
+        self.stats.replayed += len(messages)
+        return messages
+
+    def reset(self, session_id: Optional[str] = None):
+        """会话无法恢复时重置入站序号（出站未确认消息保留并在新会话重放）"""
+        self.session_id = session_id
+        self.last_received_seq = 0
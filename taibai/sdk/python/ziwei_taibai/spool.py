@@ -0,0 +1,602 @@
+"""审计事件落盘队列模块
+
+谛听不可达时审计事件不能丢失，也不能阻塞任务执行。事件先追加写入本地 spool，
+再由 SpoolReplayer 按检查点发送到谛听：
+
+- 只追加的分段文件（``<序号>.seg``），当前分段超过 ``segment_bytes`` 时滚动；
+- 每条记录为 ``长度 + CRC32 + JSON``，打开时校验并截断崩溃留下的半条记录；
+- fsync 批量提交：``append()`` 在 ``fsync_interval`` 内的写入共用一次 fsync
+  （在线程池中执行，不阻塞事件循环），返回即已落盘；
+- 检查点（``checkpoint.json``，原子替换）记录已送达的位置，重启后从检查点继续，
+  语义为至少一次；检查点之前的分段被删除（压缩）；
+- 磁盘占用不超过 ``max_bytes``：超出时按 ``OverflowPolicy`` 丢弃最旧分段
+  （``DROP_OLDEST``，计入 dropped）或让 ``append()`` 等待空间（``BLOCK``）。
+
+spool 只在单个事件循环中使用。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .codec import JSONCodec, default_codec
+from .dispatch import OverflowPolicy
+from .metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# 记录头：payload 长度、CRC32
+_HEADER = struct.Struct("<II")
+_SEGMENT_SUFFIX = ".seg"
+_CHECKPOINT = "checkpoint.json"
+
+
+@dataclass(frozen=True, order=True)
+class SpoolPosition:
+    """spool 中的位置（record 为全局记录序号，用于比较先后）"""
+    record: int
+    segment: int
+    offset: int
+
+
+@dataclass
+class SpoolStats:
+    """spool 统计"""
+    appended: int = 0            # 追加的记录数
+    committed: int = 0           # 检查点推进的记录数（已送达）
+    dropped: int = 0             # 因磁盘上限丢弃的未送达记录数
+    pending: int = 0             # 检查点之后的记录数
+    recovered: int = 0           # 打开时检查点之后的记录数
+    truncated_bytes: int = 0     # 打开时截断的损坏尾部字节数
+    segments: int = 0
+    disk_bytes: int = 0
+    compacted_segments: int = 0  # 已删除的分段数
+    fsyncs: int = 0
+    fsync_latency: Dict[str, float] = field(default_factory=dict)  # 每次 fsync 耗时分布（秒）
+
+
+@dataclass
+class _Segment:
+    seq: int
+    path: str
+    base: int          # 首条记录的全局序号
+    size: int = 0
+    records: int = 0
+
+
+def _scan(path: str) -> Tuple[List[int], int]:
+    """
+    扫描分段文件
+
+    Returns:
+        (各记录起始偏移, 最后一条完整记录的结束偏移)
+    """
+    offsets: List[int] = []
+    end = 0
+    with open(path, "rb") as f:
+        data = f.read()
+    while end + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, end)
+        start = end + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        offsets.append(end)
+        end = start + length
+    return offsets, end
+
+
+class AuditSpool:
+    """分段、只追加、fsync 批量提交的本地审计队列"""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 8 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+        fsync_interval: float = 0.01,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        codec: Optional[JSONCodec] = None
+    ):
+        """
+        初始化 spool（首次使用时打开目录并恢复）
+
+        Args:
+            directory: spool 目录（不存在时创建）
+            segment_bytes: 分段滚动大小
+            max_bytes: 磁盘占用上限（至少为 2 × segment_bytes）
+            fsync_interval: fsync 批量提交窗口（秒，0 = 尽快提交）
+            overflow: 超过磁盘上限时的处理策略（DROP_OLDEST 或 BLOCK）
+            codec: JSON 编解码器（默认自动选择）
+        """
+        if segment_bytes <= 0 or max_bytes <= 0:
+            raise ValueError("segment_bytes and max_bytes must be positive")
+        if max_bytes < 2 * segment_bytes:
+            # 否则写满的当前分段与新记录无法同时容纳，BLOCK 策略下 append() 会一直等待
+            raise ValueError("max_bytes must be at least 2 * segment_bytes")
+        if overflow not in (OverflowPolicy.DROP_OLDEST, OverflowPolicy.BLOCK):
+            raise ValueError(f"Unsupported overflow policy for spool: {overflow}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.overflow = overflow
+        self.codec = codec or default_codec
+
+        self._stats = SpoolStats()
+        self._fsync_latency = Histogram()
+        self._segments: List[_Segment] = []
+        self._file = None                      # 当前分段的追加句柄
+        self._retired: List[Any] = []          # 已滚动、待 fsync 后关闭的句柄
+        self._checkpoint: Optional[SpoolPosition] = None
+        self._reader: Optional[SpoolPosition] = None
+        self._reader_file: Optional[Tuple[int, Any]] = None
+        self._sync_future: Optional[asyncio.Future] = None
+        self._data: Optional[asyncio.Event] = None      # 有未读记录
+        self._room: Optional[asyncio.Event] = None      # 腾出磁盘空间
+        self._drained: Optional[asyncio.Event] = None   # 检查点追上写入位置
+        self._opened = False
+        self._closed = False
+
+    # ---- 打开与恢复 ----
+
+    def open(self):
+        """打开目录：加载检查点，校验分段并截断损坏的尾部（重复调用无副作用）"""
+        if self._opened:
+            return
+        if self._closed:
+            raise RuntimeError("AuditSpool is closed")
+        os.makedirs(self.directory, exist_ok=True)
+        seqs = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+        saved = self._load_checkpoint()
+
+        base = 0
+        checkpoint: Optional[SpoolPosition] = None
+        for seq in seqs:
+            path = self._segment_path(seq)
+            if saved is not None and seq < saved[0]:
+                # 检查点之前的分段已全部送达（上次删除前退出）
+                os.remove(path)
+                self._stats.compacted_segments += 1
+                continue
+            offsets, end = _scan(path)
+            size = os.path.getsize(path)
+            if end < size:
+                if seq != seqs[-1]:
+                    logger.error(f"Spool segment {path} is corrupt after offset {end}, truncating")
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._stats.truncated_bytes += size - end
+            segment = _Segment(seq, path, base, end, len(offsets))
+            self._segments.append(segment)
+            if saved is not None and seq == saved[0]:
+                index = sum(1 for offset in offsets if offset < saved[1])
+                offset = offsets[index] if index < len(offsets) else end
+                checkpoint = SpoolPosition(base + index, seq, offset)
+            base += len(offsets)
+
+        if not self._segments:
+            self._segments.append(self._new_segment(saved[0] if saved else 1, 0))
+        if checkpoint is None:
+            # 无检查点或检查点所在分段已不存在：从最早的分段开始
+            first = self._segments[0]
+            checkpoint = SpoolPosition(first.base, first.seq, 0)
+
+        active = self._segments[-1]
+        self._file = open(active.path, "ab", buffering=0)
+        self._checkpoint = self._reader = checkpoint
+        self._data = asyncio.Event()
+        self._room = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._opened = True
+        self._stats.recovered = self._pending()
+        if self._pending():
+            self._data.set()
+            logger.info(f"Spool {self.directory}: recovered {self._stats.recovered} undelivered events")
+        else:
+            self._drained.set()
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}{_SEGMENT_SUFFIX}")
+
+    def _new_segment(self, seq: int, base: int) -> _Segment:
+        segment = _Segment(seq, self._segment_path(seq), base)
+        open(segment.path, "ab").close()
+        return segment
+
+    def _load_checkpoint(self) -> Optional[Tuple[int, int]]:
+        path = os.path.join(self.directory, _CHECKPOINT)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Invalid spool checkpoint {path}, replaying from the start: {e}")
+            return None
+
+    # ---- 写入 ----
+
+    async def append(self, event: Dict[str, Any]):
+        """追加一条事件，返回时已 fsync 落盘（BLOCK 策略下磁盘满时等待空间）"""
+        self.open()
+        record = self._encode(event)
+        while self.overflow == OverflowPolicy.BLOCK and not self._has_room(len(record)):
+            self._room.clear()
+            await self._room.wait()
+        await self._write(record)
+
+    def append_nowait(self, event: Dict[str, Any]) -> asyncio.Future:
+        """
+        追加一条事件，不等待 fsync
+
+        Returns:
+            该记录落盘时完成的 future
+
+        Raises:
+            asyncio.QueueFull: BLOCK 策略下磁盘占用已达上限
+        """
+        self.open()
+        record = self._encode(event)
+        if self.overflow == OverflowPolicy.BLOCK and not self._has_room(len(record)):
+            raise asyncio.QueueFull()
+        return self._write(record)
+
+    def _encode(self, event: Dict[str, Any]) -> bytes:
+        payload = self.codec.dumps(event)
+        return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def _disk_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+
+    def _has_room(self, size: int) -> bool:
+        return self._disk_bytes() + size <= self.max_bytes or self._disk_bytes() == 0
+
+    def _write(self, record: bytes) -> asyncio.Future:
+        if self._closed:
+            raise RuntimeError("AuditSpool is closed")
+        while not self._has_room(len(record)):
+            self._drop_oldest()
+        active = self._segments[-1]
+        if active.size and active.size + len(record) > self.segment_bytes:
+            active = self._rotate()
+        self._file.write(record)
+        active.size += len(record)
+        active.records += 1
+        self._stats.appended += 1
+        self._data.set()
+        self._drained.clear()
+        return self._schedule_sync()
+
+    def _rotate(self) -> _Segment:
+        """滚动到新分段（旧句柄在下一次 fsync 后关闭）"""
+        last = self._segments[-1]
+        segment = self._new_segment(last.seq + 1, last.base + last.records)
+        self._segments.append(segment)
+        self._retired.append(self._file)
+        self._file = open(segment.path, "ab", buffering=0)
+        return segment
+
+    def _drop_oldest(self):
+        """删除最旧的分段以满足磁盘上限，未送达的记录计入 dropped"""
+        if len(self._segments) == 1:
+            self._rotate()
+        oldest = self._segments.pop(0)
+        lost = oldest.base + oldest.records - max(self._checkpoint.record, oldest.base)
+        if lost > 0:
+            self._stats.dropped += lost
+            logger.error(f"Spool over {self.max_bytes} bytes, dropped {lost} undelivered events")
+        first = self._segments[0]
+        start = SpoolPosition(first.base, first.seq, 0)
+        self._checkpoint = max(self._checkpoint, start)
+        self._reader = max(self._reader, start)
+        self._close_reader(oldest.seq)
+        self._remove(oldest)
+
+    def _schedule_sync(self) -> asyncio.Future:
+        """加入当前的 fsync 批次"""
+        if self._sync_future is None:
+            loop = asyncio.get_running_loop()
+            self._sync_future = loop.create_future()
+            loop.call_later(self.fsync_interval, lambda: asyncio.ensure_future(self._sync()))
+        return self._sync_future
+
+    async def _sync(self):
+        future, self._sync_future = self._sync_future, None
+        retired, self._retired = self._retired, []
+        if future is None and not retired:
+            return
+        files = retired + ([self._file] if self._file is not None else [])
+        started = time.monotonic()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _fsync_all, files)
+        except Exception as e:
+            logger.error(f"Spool fsync failed: {e}")
+            if future is not None and not future.done():
+                future.set_exception(e)
+            return
+        finally:
+            for f in retired:
+                f.close()
+        self._stats.fsyncs += 1
+        self._fsync_latency.record(time.monotonic() - started)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    # ---- 读取与检查点 ----
+
+    def _pending(self) -> int:
+        last = self._segments[-1]
+        return last.base + last.records - self._checkpoint.record
+
+    @property
+    def pending(self) -> int:
+        """检查点之后（未确认送达）的记录数"""
+        return self._pending() if self._opened else 0
+
+    async def read(self, max_items: int = 100) -> Tuple[List[Dict[str, Any]], SpoolPosition]:
+        """
+        读取下一批未读事件（没有时等待）
+
+        Args:
+            max_items: 最多读取的记录数
+
+        Returns:
+            (事件列表, 读完后的位置)，送达后将位置传给 commit()
+        """
+        self.open()
+        while True:
+            events, position = self._read_batch(max_items)
+            if events:
+                return events, position
+            self._data.clear()
+            await self._data.wait()
+
+    def _read_batch(self, max_items: int) -> Tuple[List[Dict[str, Any]], SpoolPosition]:
+        events: List[Dict[str, Any]] = []
+        position = self._reader
+        while len(events) < max_items:
+            segment = self._segment(position.segment)
+            if segment is None or position.record >= segment.base + segment.records:
+                following = self._next_segment(position.segment)
+                if following is None:
+                    break
+                position = SpoolPosition(following.base, following.seq, 0)
+                continue
+            f = self._open_reader(segment)
+            f.seek(position.offset)
+            header = f.read(_HEADER.size)
+            length, crc = _HEADER.unpack(header)
+            payload = f.read(length)
+            position = SpoolPosition(position.record + 1, segment.seq, position.offset + _HEADER.size + length)
+            if zlib.crc32(payload) != crc:
+                logger.error(f"Spool record checksum mismatch in {segment.path} at {position.offset}, skipping")
+                continue
+            events.append(self.codec.loads(payload))
+        self._reader = position
+        return events, position
+
+    def _segment(self, seq: int) -> Optional[_Segment]:
+        for segment in self._segments:
+            if segment.seq == seq:
+                return segment
+        return None
+
+    def _next_segment(self, seq: int) -> Optional[_Segment]:
+        for segment in self._segments:
+            if segment.seq > seq:
+                return segment
+        return None
+
+    def _open_reader(self, segment: _Segment):
+        if self._reader_file is None or self._reader_file[0] != segment.seq:
+            self._close_reader()
+            self._reader_file = (segment.seq, open(segment.path, "rb"))
+        return self._reader_file[1]
+
+    def _close_reader(self, seq: Optional[int] = None):
+        if self._reader_file is not None and (seq is None or self._reader_file[0] == seq):
+            self._reader_file[1].close()
+            self._reader_file = None
+
+    def rewind(self):
+        """读取位置回到检查点（未确认的批次将被重新读取）"""
+        if self._opened:
+            self._reader = self._checkpoint
+            if self._pending():
+                self._data.set()
+
+    async def commit(self, position: SpoolPosition):
+        """
+        确认 position 之前的事件已送达：持久化检查点并删除已送达的分段（包括全部送达的当前分段）
+
+        Args:
+            position: read() 返回的位置
+        """
+        if position <= self._checkpoint:
+            return
+        self._stats.committed += position.record - self._checkpoint.record
+        active = self._segments[-1]
+        if position.segment == active.seq and position.record == active.base + active.records and active.records:
+            # 当前分段已全部送达：滚动到新分段，使其可被删除
+            active = self._rotate()
+            position = SpoolPosition(active.base, active.seq, 0)
+            self._reader = max(self._reader, position)
+        self._checkpoint = position
+        data = json.dumps({"segment": position.segment, "offset": position.offset}).encode()
+        await asyncio.get_running_loop().run_in_executor(
+            None, _write_atomic, os.path.join(self.directory, _CHECKPOINT), data
+        )
+        # 压缩：检查点之前的分段全部送达，可以删除
+        while len(self._segments) > 1 and self._segments[0].seq < self._checkpoint.segment:
+            segment = self._segments.pop(0)
+            self._close_reader(segment.seq)
+            self._remove(segment)
+        self._room.set()
+        if not self._pending():
+            self._drained.set()
+
+    def _remove(self, segment: _Segment):
+        try:
+            os.remove(segment.path)
+        except FileNotFoundError:
+            pass
+        self._stats.compacted_segments += 1
+        self._room.set()
+
+    async def wait_drained(self):
+        """等待检查点追上当前写入位置"""
+        self.open()
+        await self._drained.wait()
+
+    def stats(self) -> SpoolStats:
+        """获取统计快照"""
+        if self._opened:
+            self._stats.pending = self._pending()
+            self._stats.segments = len(self._segments)
+            self._stats.disk_bytes = self._disk_bytes()
+        self._stats.fsync_latency = self._fsync_latency.snapshot()
+        return self._stats
+
+    async def close(self):
+        """fsync 并关闭文件（未送达的事件保留在磁盘上，下次打开时继续）"""
+        if self._closed or not self._opened:
+            self._closed = True
+            return
+        if self._sync_future is not None:
+            await self._sync()
+        self._closed = True
+        files = self._retired + [self._file]
+        await asyncio.get_running_loop().run_in_executor(None, _fsync_all, files)
+        for f in files:
+            f.close()
+        self._retired = []
+        self._file = None
+        self._close_reader()
+
+
+def _fsync_all(files: List[Any]):
+    for f in files:
+        os.fsync(f.fileno())
+
+
+def _write_atomic(path: str, data: bytes):
+    """写入临时文件、fsync 后原子替换"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class PartialReplayError(Exception):
+    """一批事件中部分已送达：只需重试 pending 中的事件"""
+
+    def __init__(self, pending: List[Dict[str, Any]], cause: BaseException):
+        super().__init__(str(cause))
+        self.pending = pending
+        self.cause = cause
+
+
+@dataclass
+class ReplayStats:
+    """重放统计"""
+    batches: int = 0
+    events: int = 0
+    retries: int = 0
+    last_error: Optional[str] = None
+    backoff: float = 0.0         # 当前退避（秒，0 = 正常发送）
+
+
+class SpoolReplayer:
+    """将 spool 中的事件按批发送，成功后推进检查点；失败时退避重试同一批"""
+
+    def __init__(
+        self,
+        spool: AuditSpool,
+        send: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        batch_size: int = 100,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30.0
+    ):
+        """
+        初始化重放器
+
+        Args:
+            spool: 审计 spool
+            send: 发送一批事件的协程函数（抛出异常表示整批重试，PartialReplayError 表示只重试其中未送达的事件）
+            batch_size: 每批最多事件数
+            min_backoff: 重试最小退避（秒）
+            max_backoff: 重试最大退避（秒）
+        """
+        self.spool = spool
+        self.send = send
+        self.batch_size = batch_size
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stats = ReplayStats()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """启动重放（需在事件循环中调用）"""
+        if not self.running:
+            self.spool.open()
+            self.spool.rewind()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """停止重放（进行中的批次未确认，下次从检查点重新发送）"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            events, position = await self.spool.read(self.batch_size)
+            self.stats.events += len(events)
+            delay = 0.0
+            while True:
+                try:
+                    await self.send(events)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if isinstance(e, PartialReplayError):
+                        events = e.pending
+                        e = e.cause
+                    # decorrelated jitter 退避，谛听恢复前只重试同一批
+                    delay = min(self.max_backoff, random.uniform(self.min_backoff, max(self.min_backoff, delay * 3)))
+                    self.stats.retries += 1
+                    self.stats.last_error = f"{type(e).__name__}: {e}"
+                    self.stats.backoff = delay
+                    logger.warning(f"Audit replay failed, retrying {len(events)} events in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+            self.stats.backoff = 0.0
+            self.stats.batches += 1
+            await self.spool.commit(position)
@@ -0,0 +1,267 @@
+"""流式 JSON 解码模块
+
+从响应流中增量解析列表元素，内存占用只与单个元素大小相关，与页大小无关：
+
+- JSON 数组：顶层 ``[...]``，或顶层对象中指定键的数组（如 ``{"messages": [...]}``）；
+- NDJSON：每行一个 JSON 值。
+
+数组之前的部分由一个只关心括号、字符串与分隔符的扫描器定位目标数组；数组内的
+元素用标准库 C 扫描器（``raw_decode``）逐个解码，不完整的元素等待更多数据。
+"""
+
+import codecs
+import json
+import re
+from typing import Any, List, Optional
+
+from .codec import DecodeError, JSONCodec, default_codec
+
+
+# 定位数组时字符串外 / 字符串内需要关注的字符
+_STRUCTURAL = re.compile(rb'["\\\[\]{},:]')
+_IN_STRING = re.compile(rb'["\\]')
+_NON_WHITESPACE = re.compile(r'[^ \t\r\n]')
+
+_raw_decode = json.JSONDecoder().raw_decode
+_RETRY_THRESHOLD = 64 * 1024
+
+
+class JSONStreamDecoder:
+    """增量 JSON 数组 / NDJSON 解码器"""
+
+    def __init__(
+        self,
+        key: Optional[str] = None,
+        ndjson: bool = False,
+        codec: Optional[JSONCodec] = None,
+        max_item_bytes: int = 16 * 1024 * 1024
+    ):
+        """
+        初始化解码器
+
+        Args:
+            key: 顶层对象中数组所在的键（None = 顶层数组；顶层为数组时忽略）
+            ndjson: 是否按 NDJSON 解码
+            codec: NDJSON 行使用的 JSON 编解码器
+            max_item_bytes: 单个元素的最大字节数（超出时抛出 DecodeError）
+        """
+        self.key = key.encode() if key is not None else None
+        self.ndjson = ndjson
+        self.codec = codec or default_codec
+        self.max_item_bytes = max_item_bytes
+
+        # 定位阶段（bytes）
+        self._buf = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._started = False
+        self._key_candidate: Optional[bytes] = None
+        self._after_colon = False
+
+        # 数组阶段（str）
+        self._in_array = False
+        self._pieces: List[str] = []
+        self._pending = 0         # 未解析部分的 UTF-8 字节数
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._retry_at = 0        # 缓冲区增长到该长度前不再尝试解码
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        """目标数组是否已结束"""
+        return self._done
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """
+        输入一段数据
+
+        Returns:
+            本段数据中解析完成的元素
+        """
+        if self._done or not chunk:
+            return []
+        if self.ndjson:
+            self._buf += chunk
+            items = self._scan_lines()
+            pending = len(self._buf)
+        elif self._in_array:
+            items = self._feed_array(chunk)
+            pending = self._pending
+        else:
+            self._buf += chunk
+            items = []
+            if self._locate():
+                rest = bytes(self._buf[self._pos:])
+                self._buf = bytearray()
+                items = self._feed_array(rest)
+                pending = self._pending
+            else:
+                pending = len(self._buf)
+        if pending > self.max_item_bytes:
+            raise DecodeError(f"stream item exceeds {self.max_item_bytes} bytes")
+        return items
+
+    def close(self) -> List[Any]:
+        """
+        输入结束
+
+        Returns:
+            NDJSON 最后一行（无换行结尾时）解析出的元素
+
+        Raises:
+            DecodeError: 数组未完整结束或包含无效 JSON
+        """
+        if self.ndjson:
+            line = bytes(self._buf).strip()
+            self._buf.clear()
+            return [self.codec.loads(line)] if line else []
+        items: List[Any] = []
+        if self._in_array and not self._done:
+            self._retry_at = 0
+            items = self._feed_array(b"")
+        if self._in_array and not self._done:
+            raise DecodeError("truncated or invalid JSON stream")
+        return items
+
+    def _scan_lines(self) -> List[Any]:
+        items = []
+        start = 0
+        while True:
+            end = self._buf.find(b"\n", start)
+            if end < 0:
+                break
+            line = bytes(self._buf[start:end]).strip()
+            start = end + 1
+            if line:
+                items.append(self.codec.loads(line))
+        del self._buf[:start]
+        return items
+
+    def _locate(self) -> bool:
+        """扫描到目标数组的 ``[`` 之后时返回 True（self._pos 指向数组内第一个字节）"""
+        buf = self._buf
+        size = len(buf)
+        pos = self._pos
+
+        if not self._started:
+            while pos < size and buf[pos] in b" \t\r\n":
+                pos += 1
+            if pos == size:
+                self._compact(pos)
+                return False
+            self._started = True
+            if buf[pos] == ord("["):
+                self._pos = pos + 1
+                self._in_array = True
+                return True
+            if buf[pos] != ord("{") or self.key is None:
+                # 既不是数组，也没有可查找的键：没有元素
+                self._done = True
+                return False
+
+        while pos < size:
+            if self._in_string:
+                match = _IN_STRING.search(buf, pos)
+                if match is None:
+                    pos = size
+                    break
+                pos = match.start()
+                if buf[pos] == ord("\\"):
+                    if pos + 1 >= size:
+                        break  # 转义符跨分段，等待更多数据
+                    pos += 2
+                    continue
+                self._in_string = False
+                if self._depth == 1:
+                    self._key_candidate = bytes(buf[self._string_start:pos])
+                    self._after_colon = False
+                pos += 1
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = size
+                break
+            pos = match.start()
+            char = buf[pos]
+
+            if char == ord('"'):
+                self._in_string = True
+                self._string_start = pos + 1
+            elif char == ord(":"):
+                self._after_colon = self._depth == 1 and self._key_candidate is not None
+            elif char in b"[{":
+                if (char == ord("[") and self._depth == 1
+                        and self._after_colon and self._key_candidate == self.key):
+                    self._pos = pos + 1
+                    self._in_array = True
+                    return True
+                self._depth += 1
+                self._key_candidate = None
+            elif char in b"]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    # 顶层对象结束，未找到目标键
+                    self._done = True
+                    return False
+            elif char == ord(",") and self._depth == 1:
+                self._key_candidate = None
+            pos += 1
+
+        self._compact(pos)
+        return False
+
+    def _compact(self, pos: int):
+        """丢弃定位阶段已扫描的数据（保留未结束的字符串）"""
+        keep = min(pos, self._string_start) if self._in_string else pos
+        del self._buf[:keep]
+        self._pos = pos - keep
+        if self._in_string:
+            self._string_start -= keep
+
+    def _feed_array(self, chunk: bytes) -> List[Any]:
+        self._pieces.append(self._utf8.decode(chunk))
+        self._pending += len(chunk)
+        if self._pending < self._retry_at:
+            return []
+        text = "".join(self._pieces)
+        size = len(text)
+
+        items = []
+        pos = 0
+        while True:
+            match = _NON_WHITESPACE.search(text, pos)
+            if match is None:
+                pos = size
+                break
+            pos = match.start()
+            char = text[pos]
+            if char == ",":
+                pos += 1
+                continue
+            if char == "]":
+                self._done = True
+                pos += 1
+                break
+            try:
+                item, end = _raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break
+            # 数字等标量可能被截断：之后必须已有分隔符才确认元素完整
+            after = _NON_WHITESPACE.search(text, end)
+            if after is None:
+                break
+            if text[after.start()] not in ",]":
+                raise DecodeError(f"unexpected {text[after.start()]!r} in JSON array")
+            items.append(item)
+            pos = end
+
+        rest = text[pos:]
+        self._pieces = [rest]
+        # 按字节计算，与 max_item_bytes 一致（纯 ASCII 时 isascii() 为 O(1)，无需编码）
+        self._pending = len(rest) if rest.isascii() else len(rest.encode("utf-8"))
+        # 不完整的大元素：缓冲区翻倍后再重试，避免被反复从头解析
+        self._retry_at = 2 * self._pending if self._pending > _RETRY_THRESHOLD and not self._done else 0
+        return items
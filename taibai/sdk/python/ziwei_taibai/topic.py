@@ -0,0 +1,147 @@
+"""主题路由模块
+
+按 ``.`` 分段的事件类型前缀树，用于订阅路由：
+
+- ``m.agent.action``：精确匹配；
+- ``*`` 匹配恰好一段，如 ``m.agent.*`` 匹配 ``m.agent.action``；
+- ``#`` 只能作为最后一段，匹配零段或多段，如 ``m.#`` 匹配所有 ``m.`` 开头的事件。
+
+匹配沿事件类型逐段下行，复杂度与段数（深度）成正比，与订阅数量无关。
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+WILDCARD_ONE = "*"
+WILDCARD_MANY = "#"
+
+Handler = Callable[[Any], Any]
+
+
+class _Node:
+    __slots__ = ("children", "handlers")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # 以 dict 保存处理器：保持注册顺序并去重
+        self.handlers: Dict[Handler, None] = {}
+
+
+def _split(pattern: str) -> List[str]:
+    segments = pattern.split(".")
+    if any(not segment for segment in segments):
+        raise ValueError(f"Invalid topic pattern: {pattern!r}")
+    if WILDCARD_MANY in segments[:-1]:
+        raise ValueError(f"'#' must be the last segment: {pattern!r}")
+    return segments
+
+
+def validate_pattern(pattern: str):
+    """检查模式是否合法（不合法时抛出 ValueError）"""
+    _split(pattern)
+
+
+class TopicTrie:
+    """事件类型前缀树：每个模式可挂多个处理器"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._patterns: Dict[str, int] = {}  # 模式 -> 处理器数量
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._patterns
+
+    def patterns(self) -> List[str]:
+        """已注册的模式（按首次注册顺序）"""
+        return list(self._patterns)
+
+    def add(self, pattern: str, handler: Handler) -> bool:
+        """
+        注册处理器
+
+        Args:
+            pattern: 事件类型或通配模式
+            handler: 处理器
+
+        Returns:
+            是否为新模式（此前没有任何处理器）
+        """
+        node = self._root
+        for segment in _split(pattern):
+            node = node.children.setdefault(segment, _Node())
+        if handler in node.handlers:
+            return False
+        node.handlers[handler] = None
+        is_new = pattern not in self._patterns
+        self._patterns[pattern] = self._patterns.get(pattern, 0) + 1
+        return is_new
+
+    def remove(self, pattern: str, handler: Optional[Handler] = None) -> bool:
+        """
+        移除处理器
+
+        Args:
+            pattern: 事件类型或通配模式
+            handler: 要移除的处理器（None = 移除该模式下全部处理器）
+
+        Returns:
+            该模式是否已不再有任何处理器（且此前存在）
+        """
+        if pattern not in self._patterns:
+            return False
+        path = [self._root]
+        segments = _split(pattern)
+        for segment in segments:
+            path.append(path[-1].children[segment])
+        node = path[-1]
+
+        if handler is None:
+            node.handlers.clear()
+        else:
+            node.handlers.pop(handler, None)
+        if node.handlers:
+            self._patterns[pattern] = len(node.handlers)
+            return False
+        del self._patterns[pattern]
+
+        # 回收空节点
+        for depth in range(len(segments), 0, -1):
+            child = path[depth]
+            if child.children or child.handlers:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+        return True
+
+    def match(self, topic: str) -> List[Handler]:
+        """
+        获取匹配事件类型的全部处理器（同一处理器只出现一次）
+
+        Args:
+            topic: 事件类型（不含通配符）
+        """
+        matched: Dict[Handler, None] = {}
+        nodes = [self._root]
+        for segment in topic.split("."):
+            next_nodes = []
+            for node in nodes:
+                many = node.children.get(WILDCARD_MANY)
+                if many is not None:
+                    matched.update(many.handlers)
+                child = node.children.get(segment)
+                if child is not None:
+                    next_nodes.append(child)
+                one = node.children.get(WILDCARD_ONE)
+                if one is not None:
+                    next_nodes.append(one)
+            if not next_nodes:
+                return list(matched)
+            nodes = next_nodes
+        for node in nodes:
+            matched.update(node.handlers)
+            many = node.children.get(WILDCARD_MANY)
+            if many is not None:
+                matched.update(many.handlers)
+        return list(matched)
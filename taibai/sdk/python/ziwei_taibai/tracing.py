@@ -0,0 +1,274 @@
+"""请求计时模块
+
+基于 aiohttp TraceConfig 记录每个请求各阶段的耗时，按路由模板写入直方图，
+并保留超过阈值的慢请求日志：
+
+- ``queued``：等待连接池空闲连接；
+- ``dns``：DNS 解析（共享 DNS 缓存命中时接近 0）；
+- ``connect``：建立新连接（TCP 连接与 TLS 握手，aiohttp 不单独区分；复用连接时为 0）；
+- ``ttfb``：请求头发出到收到响应头；
+- ``body``：读取响应体（仅 HTTPClient 发出的请求，由其在读取完成后结束计时）；
+- ``total``：请求开始到结束。
+
+HTTPClient 通过 ``tracer=`` 启用；其他 aiohttp 会话可直接使用
+``RequestTracer.trace_config()``（此时在收到响应头时结束计时，不含 body 阶段）。
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import aiohttp
+
+from .metrics import Histogram
+from .resilience import route_template
+
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("queued", "dns", "connect", "ttfb", "body", "total")
+
+
+@dataclass
+class RequestTiming:
+    """单个请求的计时"""
+    method: str
+    route: str
+    url: str
+    tracer: "RequestTracer"
+    started: float = field(default_factory=time.monotonic)
+    wall_time: float = field(default_factory=time.time)
+    phases: Dict[str, float] = field(default_factory=dict)
+    status: Optional[int] = None
+    error: Optional[str] = None
+    reused: bool = False
+    _marks: Dict[str, float] = field(default_factory=dict, repr=False)
+    _finished: bool = field(default=False, repr=False)
+
+    def mark(self, name: str):
+        self._marks[name] = time.monotonic()
+
+    def span(self, phase: str, start: str, end: str):
+        """由两个时间点计算阶段耗时（累加，重定向时多次建连）"""
+        if start in self._marks and end in self._marks:
+            self.phases[phase] = self.phases.get(phase, 0.0) + self._marks[end] - self._marks[start]
+
+
+@dataclass
+class SlowRequest:
+    """慢请求日志条目"""
+    method: str
+    route: str
+    url: str
+    status: Optional[int]
+    total: float
+    phases: Dict[str, float]
+    wall_time: float
+    error: Optional[str] = None
+
+
+class RequestTracer:
+    """请求阶段计时器（按路由模板统计，可在多个客户端间共享）"""
+
+    def __init__(
+        self,
+        slow_threshold: float = 1.0,
+        slow_log_size: int = 100,
+        on_slow: Optional[Callable[[SlowRequest], Any]] = None
+    ):
+        """
+        初始化计时器
+
+        Args:
+            slow_threshold: 慢请求阈值（秒，总耗时超过即记录）
+            slow_log_size: 慢请求日志保留条数
+            on_slow: 记录慢请求时的回调
+        """
+        self.slow_threshold = slow_threshold
+        self.on_slow = on_slow
+        self._slow: Deque[SlowRequest] = deque(maxlen=slow_log_size)
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self.requests = 0
+        self.errors = 0
+
+    def start(self, method: str, route: str, url: str) -> RequestTiming:
+        """开始计时（作为 trace_request_ctx 传给 aiohttp）"""
+        return RequestTiming(method=method, route=route, url=url, tracer=self)
+
+    def finish(
+        self,
+        timing: RequestTiming,
+        status: Optional[int] = None,
+        error: Optional[BaseException] = None,
+        read_body: bool = True
+    ):
+        """
+        结束计时，写入直方图并检查慢请求
+
+        Args:
+            timing: start() 返回的计时
+            status: 响应状态码
+            error: 请求异常
+            read_body: 是否已读取响应体（记录 body 阶段）
+        """
+        if timing._finished:
+            return
+        timing._finished = True
+        now = time.monotonic()
+        if status is not None:
+            timing.status = status
+        if error is not None:
+            timing.error = f"{type(error).__name__}: {error}"
+        if read_body and "headers_received" in timing._marks:
+            timing.phases["body"] = now - timing._marks["headers_received"]
+        total = timing.phases["total"] = now - timing.started
+
+        self.requests += 1
+        if timing.error is not None:
+            self.errors += 1
+        histograms = self._histograms.get(timing.route)
+        if histograms is None:
+            histograms = self._histograms[timing.route] = {phase: Histogram() for phase in PHASES}
+        for phase, value in timing.phases.items():
+            histograms[phase].record(value)
+
+        if total >= self.slow_threshold:
+            entry = SlowRequest(
+                method=timing.method,
+                route=timing.route,
+                url=timing.url,
+                status=timing.status,
+                total=total,
+                phases=dict(timing.phases),
+                wall_time=timing.wall_time,
+                error=timing.error
+            )
+            self._slow.append(entry)
+            phases = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in timing.phases.items() if k != "total")
+            logger.warning(
+                f"Slow request {timing.method} {timing.route} {timing.status or timing.error}: "
+                f"{total * 1000:.1f}ms ({phases})"
+            )
+            if self.on_slow is not None:
+                try:
+                    self.on_slow(entry)
+                except Exception as e:
+                    logger.error(f"Slow request callback error: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """各路由各阶段的耗时分布快照（秒），只含出现过的阶段"""
+        return {
+            route: {phase: h.snapshot() for phase, h in histograms.items() if h.count}
+            for route, histograms in self._histograms.items()
+        }
+
+    def slow_requests(self) -> List[SlowRequest]:
+        """最近的慢请求（从旧到新）"""
+        return list(self._slow)
+
+    def reset(self):
+        """清空统计与慢请求日志"""
+        self._histograms.clear()
+        self._slow.clear()
+        self.requests = 0
+        self.errors = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        用于任意 aiohttp 会话的 TraceConfig（如 ``ClientSession(trace_configs=[...])``）
+
+        所有请求都会计时，路由模板由 URL 路径推断，收到响应头时结束计时。
+        """
+        return timing_trace_config(self)
+
+
+def timing_trace_config(default_tracer: Optional[RequestTracer] = None) -> aiohttp.TraceConfig:
+    """
+    创建填充 RequestTiming 的 TraceConfig
+
+    Args:
+        default_tracer: 请求未携带 RequestTiming 时使用的计时器（None = 只记录携带的请求）
+
+    Returns:
+        aiohttp.TraceConfig
+    """
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx: SimpleNamespace, params):
+        timing = ctx.trace_request_ctx
+        ctx.auto_finish = False
+        if not isinstance(timing, RequestTiming):
+            timing = None
+            if default_tracer is not None:
+                timing = default_tracer.start(params.method, route_template(params.url.path), str(params.url))
+                ctx.auto_finish = True
+        ctx.timing = timing
+
+    def marker(name: str):
+        async def hook(session, ctx: SimpleNamespace, params):
+            timing = getattr(ctx, "timing", None)
+            if timing is not None:
+                timing.mark(name)
+        return hook
+
+    async def on_queued_end(session, ctx, params):
+        timing = getattr(ctx, "timing", None)
+        if timing is not None:
+            timing.mark("queued_end")
+            timing.span("queued", "queued_start", "queued_end")
+
+    async def on_dns_end(session, ctx, params):
+        timing = getattr(ctx, "timing", None)
+        if timing is not None:
+            timing.mark("dns_end")
+            timing.span("dns", "dns_start", "dns_end")
+
+    async def on_connection_create_end(session, ctx, params):
+        timing = getattr(ctx, "timing", None)
+        if timing is None or "connect_start" not in timing._marks:
+            return
+        timing.mark("connect_end")
+        marks = timing._marks
+        elapsed = marks["connect_end"] - marks["connect_start"]
+        # 建连阶段包含 DNS 解析，扣除后为 TCP + TLS
+        if "dns_end" in marks and marks["dns_start"] >= marks["connect_start"]:
+            elapsed -= marks["dns_end"] - marks["dns_start"]
+        timing.phases["connect"] = timing.phases.get("connect", 0.0) + max(0.0, elapsed)
+
+    async def on_reuseconn(session, ctx, params):
+        timing = getattr(ctx, "timing", None)
+        if timing is not None:
+            timing.reused = True
+            timing.phases.setdefault("connect", 0.0)
+
+    async def on_request_end(session, ctx, params):
+        timing = getattr(ctx, "timing", None)
+        if timing is None:
+            return
+        timing.mark("headers_received")
+        timing.status = params.response.status
+        if "headers_sent" in timing._marks:
+            timing.span("ttfb", "headers_sent", "headers_received")
+        if ctx.auto_finish:
+            timing.tracer.finish(timing, read_body=False)
+
+    async def on_request_exception(session, ctx, params):
+        timing = getattr(ctx, "timing", None)
+        if timing is not None and ctx.auto_finish:
+            timing.tracer.finish(timing, error=params.exception)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_connection_queued_start.append(marker("queued_start"))
+    trace.on_connection_queued_end.append(on_queued_end)
+    trace.on_connection_create_start.append(marker("connect_start"))
+    trace.on_dns_resolvehost_start.append(marker("dns_start"))
+    trace.on_dns_resolvehost_end.append(on_dns_end)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    trace.on_connection_reuseconn.append(on_reuseconn)
+    trace.on_request_headers_sent.append(marker("headers_sent"))
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
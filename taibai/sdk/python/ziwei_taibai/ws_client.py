@@ -4,17 +4,38 @@
 """
 
 import asyncio
-import json
 import logging
-from typing import Any, Callable, Dict, Optional
+import random
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 
 import aiohttp
 
+from .codec import DecodeError, JSONCodec, default_codec, get_codec
+from .dispatch import Dispatcher, OverflowPolicy, SubscriberStats
+from .metrics import Histogram
+from .outbound import OutboundQueue, SendStats
+from .pool import ConnectionPool, get_pool
+from .session import (
+    FRAME_ACK,
+    FRAME_RESUME_FAILED,
+    FRAME_SESSION,
+    ResumeState,
+    SessionStats,
+)
 
 logger = logging.getLogger(__name__)
 
+# 编码协商使用的 WebSocket 子协议
+SUBPROTOCOL_JSON = "ziwei.json"
+SUBPROTOCOL_MSGPACK = "ziwei.msgpack"
+
+# 服务端对 JSON 心跳的响应帧类型（带回心跳的 id）
+_HEARTBEAT_REPLY_TYPES = ("heartbeat_ack", "pong")
+
 
 class ConnectionState(Enum):
     """连接状态"""
@@ -24,12 +45,92 @@ class ConnectionState(Enum):
     RECONNECTING = "reconnecting"
 
 
+@dataclass
+class ReconnectStats:
+    """重连统计"""
+    attempts: int = 0                  # 建连尝试次数（含首次）
+    successes: int = 0                 # 建连成功次数
+    failures: int = 0                  # 建连失败次数
+    last_delay: float = 0.0            # 最近一次退避时长（秒）
+    rate_limited_seconds: float = 0.0  # 因进程级限速累计等待（秒）
+    total_downtime: float = 0.0        # 累计断线时长（秒）
+    last_connected_at: Optional[float] = None
+    last_disconnected_at: Optional[float] = None
+
+
+@dataclass
+class HeartbeatStats:
+    """心跳与存活检测统计"""
+    pings_sent: int = 0          # 发出的协议层 PING 数
+    pongs_received: int = 0      # 匹配到的 PONG 数
+    heartbeats_sent: int = 0     # 发出的 JSON 心跳数
+    heartbeat_acks: int = 0      # 匹配到的心跳响应数
+    pending: int = 0             # 当前未响应的 PING 数
+    last_rtt: float = 0.0        # 最近一次往返时延（秒）
+    dead_timeout: float = 0.0    # 当前判定连接失活的超时（秒）
+    dead_connections: int = 0    # 因超时判定失活而主动断开的次数
+
+
+class ReconnectRateLimiter:
+    """
+    进程级重连限速（令牌桶）
+    
+    同一进程内的所有 WSClient 默认共享一个实例，避免天枢节点重启后
+    整个进程的连接在同一时刻集中重连。
+    """
+    
+    def __init__(self, rate: float = 5.0, burst: int = 10):
+        """
+        初始化限速器
+        
+        Args:
+            rate: 每秒允许的重连次数
+            burst: 突发容量
+        """
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+    
+    async def acquire(self) -> float:
+        """
+        获取一个重连令牌（预约式，无需加锁）
+        
+        Returns:
+            实际等待时长（秒）
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        wait = -self._tokens / self.rate
+        await asyncio.sleep(wait)
+        return wait
+
+
+_reconnect_limiter = ReconnectRateLimiter()
+
+
+def set_reconnect_rate_limit(rate: float, burst: int):
+    """调整进程级重连限速"""
+    if rate <= 0 or burst <= 0:
+        raise ValueError("rate and burst must be positive")
+    _reconnect_limiter.rate = rate
+    _reconnect_limiter.burst = burst
+
+
 @dataclass
 class WSMessage:
     """WebSocket 消息"""
     type: str
     data: Any
-    raw: str
+    raw: Union[str, bytes]
+    encoding: str = "json"       # json / msgpack（由连接协商决定）
+    compressed: bool = False     # 连接是否启用 permessage-deflate
 
 
 class WSClient:
@@ -42,7 +143,24 @@ class WSClient:
         reconnect_delay: float = 1.0,
         max_reconnect_delay: float = 60.0,
         reconnect_attempts: int = 0,  # 0 = 无限重连
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        dispatch_queue_size: int = 1000,
+        dispatch_overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        codec: Optional[JSONCodec] = None,
+        send_queue_size: int = 1000,
+        send_high_water: Optional[int] = None,
+        send_low_water: Optional[int] = None,
+        coalesce_frames: bool = False,
+        encoding: str = "json",
+        compress: bool = False,
+        resumable: bool = False,
+        replay_buffer_size: int = 1000,
+        ack_every: int = 100,
+        reconnect_limiter: Optional[ReconnectRateLimiter] = None,
+        ping_interval: Optional[float] = None,
+        ping_timeout: Optional[float] = None,
+        min_ping_timeout: float = 2.0,
+        pool: Optional[ConnectionPool] = None
     ):
         """
         初始化 WebSocket 客户端
@@ -54,24 +172,93 @@ class WSClient:
             max_reconnect_delay: 最大重连延迟（秒）
             reconnect_attempts: 最大重连次数（0 = 无限）
             headers: 连接 headers
+            dispatch_queue_size: 每个消息回调的默认队列容量
+            dispatch_overflow: 回调队列满时的默认策略
+            codec: JSON 编解码器（默认自动选择 orjson/msgspec/json）
+            send_queue_size: 出站队列容量
+            send_high_water: 出站队列高水位（达到后 drain() 阻塞）
+            send_low_water: 出站队列低水位（回落后 drain() 放行）
+            coalesce_frames: 是否将小消息合并为 batch 帧（需服务端支持）
+            encoding: 期望的帧编码（json / msgpack）；msgpack 通过子协议协商，
+                服务端不支持时回退为 json
+            compress: 是否请求 permessage-deflate 压缩
+            resumable: 是否启用可恢复会话（seq 去重、断线重放、重连续传）
+            replay_buffer_size: 未确认出站消息的最大保留条数
+            ack_every: 每收到多少条事件主动发送一次 ack（心跳也会携带 ack）
+            reconnect_limiter: 重连限速器（默认使用进程级共享实例）
+            ping_interval: 协议层 PING 间隔（秒，默认 min(heartbeat_interval, 5)；0 = 不发送）
+            ping_timeout: PING 无响应判定连接失活的超时（默认按 RTT 自适应：
+                max(min_ping_timeout, 4 * p99)，且不超过 heartbeat_interval）
+            min_ping_timeout: 自适应超时的下限（秒）
+            pool: 连接池（默认使用当前事件循环的进程级共享连接池）
         """
+        if encoding not in ("json", "msgpack"):
+            raise ValueError(f"Unsupported encoding: {encoding}")
         self.url = url
         self.heartbeat_interval = heartbeat_interval
         self.reconnect_delay = reconnect_delay
         self.max_reconnect_delay = max_reconnect_delay
         self.reconnect_attempts = reconnect_attempts
         self.headers = headers or {}
+        self.codec = codec or default_codec
+        self.encoding = encoding
+        self.compress = compress
+        self._binary_codec = get_codec("msgpack") if encoding == "msgpack" else None
+        self._negotiated_encoding = "json"
+        self._compressed = False
+        
+        # 可恢复会话
+        self._resume: Optional[ResumeState] = (
+            ResumeState(replay_buffer_size) if resumable else None
+        )
+        self.ack_every = ack_every
+        self._unacked_received = 0
+        self._resync_callbacks: List[Callable[[], Any]] = []
         
         self._state = ConnectionState.DISCONNECTED
         self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._pool = pool
+        self._acquired: Optional[ConnectionPool] = None
         self._session: Optional[aiohttp.ClientSession] = None
         self._heartbeat_task: Optional[asyncio.Task] = None
-        self._receive_task: Optional[asyncio.Task] = None
+        self._supervisor_task: Optional[asyncio.Task] = None
         self._reconnect_count = 0
         self._running = False
+        self._reconnect_limiter = reconnect_limiter or _reconnect_limiter
+        self._reconnect_stats = ReconnectStats()
         
-        # 消息回调
-        self._message_callbacks: list[Callable[[WSMessage], Any]] = []
+        # 往返时延测量与失活检测
+        self.ping_interval = (
+            ping_interval if ping_interval is not None else min(heartbeat_interval, 5.0)
+        )
+        self.ping_timeout = ping_timeout
+        self.min_ping_timeout = min_ping_timeout
+        self._ping_task: Optional[asyncio.Task] = None
+        self._ping_seq = 0
+        self._pending_pings: Dict[int, float] = {}
+        self._heartbeat_id = 0
+        self._pending_heartbeats: Dict[int, float] = {}
+        self._last_received = 0.0
+        self._rtt = Histogram()
+        self._heartbeat_stats = HeartbeatStats()
+        
+        # 出站队列：所有发送经单个 writer 任务写出
+        self._write_lock = asyncio.Lock()
+        self._writable = asyncio.Event()
+        self._outbound = OutboundQueue(
+            self._write_frame,
+            maxsize=send_queue_size,
+            high_water=send_high_water,
+            low_water=send_low_water,
+            coalesce=coalesce_frames,
+            ready=self._writable
+        )
+        
+        # 消息回调（每个回调独立队列 + worker）
+        self._dispatcher = Dispatcher(
+            maxsize=dispatch_queue_size,
+            overflow=dispatch_overflow
+        )
         self._connect_callbacks: list[Callable[[], Any]] = []
         self._disconnect_callbacks: list[Callable[[], Any]] = []
         self._error_callbacks: list[Callable[[Exception], Any]] = []
@@ -86,9 +273,72 @@ class WSClient:
         """是否已连接"""
         return self._state == ConnectionState.CONNECTED
     
-    def on_message(self, callback: Callable[[WSMessage], Any]):
-        """注册消息回调"""
-        self._message_callbacks.append(callback)
+    def on_message(
+        self,
+        callback: Callable[[WSMessage], Any],
+        queue_size: Optional[int] = None,
+        overflow: Optional[OverflowPolicy] = None
+    ):
+        """
+        注册消息回调
+
+        回调在独立的 worker 中执行，可为同步函数或 async 函数。
+
+        Args:
+            callback: 消息回调
+            queue_size: 该回调的队列容量（默认使用 dispatch_queue_size）
+            overflow: 该回调的溢出策略（默认使用 dispatch_overflow）
+        """
+        self._dispatcher.add(callback, maxsize=queue_size, overflow=overflow)
+    
+    async def remove_message_callback(self, callback: Callable[[WSMessage], Any]):
+        """移除消息回调"""
+        await self._dispatcher.remove(callback)
+    
+    def subscriber_stats(self) -> List[SubscriberStats]:
+        """获取各消息回调的积压与丢弃统计"""
+        return self._dispatcher.stats()
+    
+    @property
+    def negotiated_encoding(self) -> str:
+        """当前连接协商得到的帧编码（json / msgpack）"""
+        return self._negotiated_encoding
+    
+    @property
+    def compressed(self) -> bool:
+        """当前连接是否启用 permessage-deflate"""
+        return self._compressed
+    
+    def send_stats(self) -> SendStats:
+        """获取出站队列深度、发送帧数与发送延迟统计"""
+        return self._outbound.stats
+    
+    def session_stats(self) -> Optional[SessionStats]:
+        """获取会话恢复统计（未启用 resumable 时为 None）"""
+        return self._resume.stats if self._resume else None
+    
+    def heartbeat_stats(self) -> HeartbeatStats:
+        """获取心跳与存活检测统计"""
+        self._heartbeat_stats.pending = len(self._pending_pings)
+        self._heartbeat_stats.dead_timeout = self._dead_timeout()
+        return self._heartbeat_stats
+    
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取延迟分布快照（秒）
+        
+        Returns:
+            {"rtt": 往返时延, "dispatch": 回调分发延迟（入队到回调完成）}，
+            各项包含 count/min/mean/p50/p90/p99/p999/max
+        """
+        return {
+            "rtt": self._rtt.snapshot(),
+            "dispatch": self._dispatcher.latency.snapshot(),
+        }
+    
+    def on_resync(self, callback: Callable[[], Any]):
+        """注册会话无法恢复时的回调（订阅者应通过 REST 全量同步）"""
+        self._resync_callbacks.append(callback)
     
     def on_connect(self, callback: Callable[[], Any]):
         """注册连接回调"""
@@ -103,66 +353,175 @@ class WSClient:
         self._error_callbacks.append(callback)
     
     async def connect(self):
-        """建立 WebSocket 连接"""
+        """
+        建立 WebSocket 连接
+        
+        启动重连 supervisor 并等待首次连接成功（或达到最大重连次数后放弃）。
+        """
         if self._state == ConnectionState.CONNECTED:
             return
         
         self._running = True
-        self._state = ConnectionState.CONNECTING
+        if self._supervisor_task is None or self._supervisor_task.done():
+            self._supervisor_task = asyncio.create_task(self._supervise())
         
-        try:
-            self._session = aiohttp.ClientSession()
-            self._ws = await self._session.ws_connect(
-                self.url,
-                headers=self.headers,
-                autoclose=False
-            )
-            self._state = ConnectionState.CONNECTED
-            self._reconnect_count = 0
-            
-            logger.info(f"WebSocket connected to {self.url}")
+        connected = asyncio.create_task(self._writable.wait())
+        await asyncio.wait(
+            {connected, self._supervisor_task},
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if not connected.done():
+            connected.cancel()
+    
+    async def _supervise(self):
+        """重连 supervisor：单个循环负责建连、等待断开和带抖动的退避重连"""
+        delay: Optional[float] = None
+        first_attempt = True
+        
+        while self._running:
+            if not first_attempt:
+                # 检查重连次数
+                if self.reconnect_attempts > 0 and self._reconnect_count >= self.reconnect_attempts:
+                    logger.error("Max reconnect attempts reached")
+                    break
+                
+                self._state = ConnectionState.RECONNECTING
+                self._reconnect_count += 1
+                delay = self._next_delay(delay)
+                self._reconnect_stats.last_delay = delay
+                
+                logger.info(f"Reconnecting in {delay:.2f}s (attempt {self._reconnect_count})")
+                await asyncio.sleep(delay)
+                self._reconnect_stats.rate_limited_seconds += await self._reconnect_limiter.acquire()
+                if not self._running:
+                    break
+            first_attempt = False
             
-            # 启动心跳和接收任务
-            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
-            self._receive_task = asyncio.create_task(self._receive_loop())
+            self._reconnect_stats.attempts += 1
+            try:
+                await self._open()
+            except Exception as e:
+                if self._ws and not self._ws.closed:
+                    await self._ws.close()
+                self._state = ConnectionState.DISCONNECTED
+                self._reconnect_stats.failures += 1
+                logger.error(f"WebSocket connection failed: {e}")
+                await self._handle_error(e)
+                continue
             
-            # 触发连接回调
-            for callback in self._connect_callbacks:
-                try:
-                    callback()
-                except Exception as e:
-                    logger.error(f"Connect callback error: {e}")
+            # 连接成功后重置退避
+            delay = None
+            self._reconnect_count = 0
             
-        except Exception as e:
+            await self._receive_loop()
+            await self._handle_disconnect()
+        
+        if self._state != ConnectionState.CONNECTED:
             self._state = ConnectionState.DISCONNECTED
-            logger.error(f"WebSocket connection failed: {e}")
-            await self._handle_error(e)
-            await self._maybe_reconnect()
+    
+    def _next_delay(self, previous: Optional[float]) -> float:
+        """decorrelated jitter 退避：sleep = min(cap, uniform(base, prev * 3))"""
+        base = self.reconnect_delay
+        upper = max(base, (previous or base) * 3)
+        return min(self.max_reconnect_delay, random.uniform(base, upper))
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享连接池中的 WebSocket 会话（跨重连复用，close() 时归还）"""
+        if self._session is None or self._session.closed:
+            # 连接池已关闭时重新获取（旧池无需归还）
+            self._acquired = self._pool or get_pool()
+            self._session = self._acquired.acquire(websocket=True)
+        return self._session
+    
+    async def _open(self):
+        """建立一次连接并启动分发、发送和心跳任务"""
+        self._state = ConnectionState.CONNECTING
+        
+        session = self._get_session()
+        protocols: Tuple[str, ...] = ()
+        if self._binary_codec is not None:
+            protocols = (SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON)
+        self._ws = await session.ws_connect(
+            self.url,
+            headers=self.headers,
+            autoclose=False,
+            autoping=False,
+            protocols=protocols,
+            compress=15 if self.compress else 0
+        )
+        self._negotiated_encoding = (
+            "msgpack" if self._ws.protocol == SUBPROTOCOL_MSGPACK else "json"
+        )
+        self._compressed = bool(self._ws.compress)
+        self._state = ConnectionState.CONNECTED
+        
+        stats = self._reconnect_stats
+        stats.successes += 1
+        stats.last_connected_at = time.time()
+        if stats.last_disconnected_at:
+            stats.total_downtime += stats.last_connected_at - stats.last_disconnected_at
+        
+        logger.info(
+            f"WebSocket connected to {self.url} "
+            f"(encoding={self._negotiated_encoding}, compressed={self._compressed})"
+        )
+        
+        # 恢复会话：先于排队消息写出 resume 帧并重放未确认消息
+        if self._resume and self._resume.session_id:
+            await self._resume_session()
+        
+        # 启动分发、发送和心跳任务（接收循环由 supervisor 直接运行）
+        self._dispatcher.start()
+        self._writable.set()
+        self._outbound.start()
+        self._pending_pings.clear()
+        self._pending_heartbeats.clear()
+        self._last_received = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        if self.ping_interval > 0:
+            self._ping_task = asyncio.create_task(self._ping_loop())
+        
+        # 触发连接回调
+        for callback in self._connect_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Connect callback error: {e}")
     
     async def _receive_loop(self):
         """接收消息循环"""
         while self._running and self._ws:
             try:
                 msg = await self._ws.receive()
+                self._last_received = time.monotonic()
                 
                 if msg.type == aiohttp.WSMsgType.TEXT:
                     try:
-                        data = json.loads(msg.data)
-                    except json.JSONDecodeError:
+                        data = self.codec.loads(msg.data)
+                    except DecodeError:
                         data = msg.data
                     
                     ws_msg = WSMessage(
                         type='text',
                         data=data,
-                        raw=msg.data
+                        raw=msg.data,
+                        encoding='json',
+                        compressed=self._compressed
                     )
                     
-                    # 触发消息回调
-                    for callback in self._message_callbacks:
-                        try:
-                            callback(ws_msg)
-                        except Exception as e:
-                            logger.error(f"Message callback error: {e}")
+                    # 投递到各回调队列（不在接收循环内执行回调）
+                    await self._handle_frame(ws_msg)
+                
+                elif msg.type == aiohttp.WSMsgType.BINARY:
+                    encoding, data = self._decode_binary(msg.data)
+                    ws_msg = WSMessage(
+                        type='binary',
+                        data=data,
+                        raw=msg.data,
+                        encoding=encoding,
+                        compressed=self._compressed
+                    )
+                    await self._handle_frame(ws_msg)
                             
                 elif msg.type == aiohttp.WSMsgType.ERROR:
                     logger.error(f"WebSocket error: {msg.data}")
@@ -170,19 +529,126 @@ class WSClient:
                 elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED):
                     logger.info("WebSocket closed by server")
                     break
+                elif msg.type == aiohttp.WSMsgType.CLOSING:
+                    break
                 elif msg.type == aiohttp.WSMsgType.PING:
-                    await self._ws.pong()
+                    async with self._write_lock:
+                        await self._ws.pong(msg.data)
                 elif msg.type == aiohttp.WSMsgType.PONG:
-                    pass  # 心跳响应
+                    self._on_pong(msg.data)
                     
             except asyncio.CancelledError:
-                break
+                raise
             except Exception as e:
                 logger.error(f"Receive error: {e}")
                 await self._handle_error(e)
                 break
+    
+    async def _handle_frame(self, ws_msg: WSMessage):
+        """匹配心跳响应、处理会话控制帧后投递给消息回调"""
+        if isinstance(ws_msg.data, dict) and ws_msg.data.get("type") in _HEARTBEAT_REPLY_TYPES:
+            self._on_heartbeat_reply(ws_msg.data.get("id"))
+        if await self._accept(ws_msg):
+            await self._dispatcher.dispatch(ws_msg)
+    
+    def _on_pong(self, payload: bytes):
+        """匹配 PONG 与 PING，记录往返时延；更早未响应的 PING 视为丢失"""
+        if len(payload) != 8:
+            return
+        seq = struct.unpack("!Q", payload)[0]
+        sent_at = self._pending_pings.get(seq)
+        if sent_at is None:
+            return
+        for pending in [s for s in self._pending_pings if s <= seq]:
+            del self._pending_pings[pending]
+        self._record_rtt(time.monotonic() - sent_at)
+        self._heartbeat_stats.pongs_received += 1
+    
+    def _on_heartbeat_reply(self, heartbeat_id: Any):
+        """匹配 JSON 心跳响应，记录往返时延"""
+        sent_at = self._pending_heartbeats.pop(heartbeat_id, None)
+        if sent_at is None:
+            return
+        self._record_rtt(time.monotonic() - sent_at)
+        self._heartbeat_stats.heartbeat_acks += 1
+    
+    def _record_rtt(self, rtt: float):
+        self._rtt.record(rtt)
+        self._heartbeat_stats.last_rtt = rtt
+    
+    def _dead_timeout(self) -> float:
+        """PING 无响应多久判定连接失活"""
+        if self.ping_timeout is not None:
+            return self.ping_timeout
+        timeout = max(self.min_ping_timeout, 4 * self._rtt.percentile(99))
+        return min(timeout, max(self.heartbeat_interval, self.min_ping_timeout))
+    
+    async def _accept(self, ws_msg: WSMessage) -> bool:
+        """
+        处理会话控制帧与 seq 去重
         
-        await self._handle_disconnect()
+        Returns:
+            是否投递给消息回调
+        """
+        if self._resume is None or not isinstance(ws_msg.data, dict):
+            return True
+        
+        data = ws_msg.data
+        frame_type = data.get("type")
+        if frame_type == FRAME_SESSION:
+            self._resume.session_id = data.get("session_id")
+            return False
+        if frame_type == FRAME_ACK:
+            self._resume.ack(int(data.get("ack", 0)))
+            return False
+        if frame_type == FRAME_RESUME_FAILED:
+            logger.warning("Session resume rejected, full resync required")
+            self._resume.stats.resume_failures += 1
+            self._resume.reset(data.get("session_id"))
+            for callback in self._resync_callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Resync callback error: {e}")
+            return False
+        
+        seq = data.get("seq")
+        if isinstance(seq, int):
+            if not self._resume.observe(seq):
+                return False
+            self._unacked_received += 1
+            if self._unacked_received >= self.ack_every:
+                self._unacked_received = 0
+                await self._outbound.put(self._encode(self._resume.ack_frame()))
+        return True
+    
+    async def _resume_session(self):
+        """发送 resume 帧并重放已离开出站队列但未被确认的消息"""
+        frames = [self._resume.resume_frame()] + self._resume.replay()
+        logger.info(
+            f"Resuming session {self._resume.session_id} from seq "
+            f"{self._resume.last_received_seq}, replaying {len(frames) - 1} messages"
+        )
+        for frame in frames:
+            await self._write_frame(self._encode(frame))
+    
+    def _decode_binary(self, raw: bytes) -> Tuple[str, Any]:
+        """解码二进制帧：优先 msgpack，其次按 JSON 字节解码，均失败时返回原始 bytes"""
+        if self._negotiated_encoding == "msgpack":
+            try:
+                return "msgpack", self._binary_codec.loads(raw)
+            except DecodeError:
+                pass
+        try:
+            return "json", self.codec.loads(raw)
+        except DecodeError:
+            return "binary", raw
+    
+    def _encode(self, data: Dict[str, Any]) -> Union[str, bytes]:
+        """按协商编码序列化：msgpack 为二进制帧，否则为 JSON 文本帧"""
+        if self._negotiated_encoding == "msgpack":
+            return self._binary_codec.dumps(data)
+        return self.codec.dumps_str(data)
     
     async def _heartbeat_loop(self):
         """心跳循环"""
@@ -191,10 +657,20 @@ class WSClient:
                 await asyncio.sleep(self.heartbeat_interval)
                 
                 if self._ws and not self._ws.closed:
-                    await self._ws.send_str(json.dumps({
+                    self._heartbeat_id += 1
+                    heartbeat = {
                         'type': 'heartbeat',
+                        'id': self._heartbeat_id,
                         'timestamp': asyncio.get_event_loop().time()
-                    }))
+                    }
+                    if self._resume:
+                        heartbeat['ack'] = self._resume.last_received_seq
+                        self._unacked_received = 0
+                    # 未响应的旧心跳不再等待，只保留本次
+                    self._pending_heartbeats.clear()
+                    self._pending_heartbeats[self._heartbeat_id] = time.monotonic()
+                    await self._write_frame(self._encode(heartbeat))
+                    self._heartbeat_stats.heartbeats_sent += 1
                     logger.debug("Heartbeat sent")
                     
             except asyncio.CancelledError:
@@ -203,25 +679,97 @@ class WSClient:
                 logger.error(f"Heartbeat error: {e}")
                 break
     
-    async def send(self, data: Dict[str, Any]):
+    async def _ping_loop(self):
+        """
+        PING 循环：测量往返时延并检测失活连接
+        
+        最早未响应的 PING 超过自适应超时、且期间未收到任何帧时，判定连接失活并
+        主动关闭，由 supervisor 重连（无需等待完整的心跳间隔）。
+        """
+        while self._running and self._ws and not self._ws.closed:
+            try:
+                await asyncio.sleep(self.ping_interval)
+                if not self._ws or self._ws.closed:
+                    break
+                
+                now = time.monotonic()
+                if self._pending_pings:
+                    oldest = min(self._pending_pings.values())
+                    if now - oldest > self._dead_timeout() and self._last_received < oldest:
+                        self._heartbeat_stats.dead_connections += 1
+                        logger.warning(
+                            f"No pong for {now - oldest:.1f}s, closing dead connection"
+                        )
+                        await self._ws.close(code=aiohttp.WSCloseCode.GOING_AWAY)
+                        break
+                
+                self._ping_seq += 1
+                self._pending_pings[self._ping_seq] = now
+                async with self._write_lock:
+                    await self._ws.ping(struct.pack("!Q", self._ping_seq))
+                self._heartbeat_stats.pings_sent += 1
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ping error: {e}")
+                break
+    
+    async def send(self, data: Dict[str, Any], wait: bool = False):
         """
         发送消息
         
+        消息进入出站队列后由 writer 任务写出；队列满时阻塞。
+        
         Args:
             data: 要发送的数据（会自动序列化为 JSON）
+            wait: 是否等待消息实际写出
         """
+        if self._resume and self._running:
+            # 可恢复会话：断线期间消息留在队列，重连后写出
+            data = self._resume.stamp(data)
+            seq = data["seq"]
+            frame = self._encode(data)
+            await self._outbound.put(
+                frame,
+                wait=wait,
+                coalesce=isinstance(frame, str),
+                on_dequeued=lambda: self._resume.mark_dequeued(seq)
+            )
+            logger.debug(f"Queued: {data}")
+            return
+        
         if not self._ws or self._ws.closed:
             raise ConnectionError("WebSocket is not connected")
         
-        await self._ws.send_str(json.dumps(data))
-        logger.debug(f"Sent: {data}")
+        frame = self._encode(data)
+        await self._outbound.put(frame, wait=wait, coalesce=isinstance(frame, str))
+        logger.debug(f"Queued: {data}")
     
-    async def send_text(self, text: str):
-        """发送文本消息"""
+    async def send_text(self, text: str, wait: bool = False):
+        """发送文本消息（不参与 batch 合并）"""
         if not self._ws or self._ws.closed:
             raise ConnectionError("WebSocket is not connected")
         
-        await self._ws.send_str(text)
+        await self._outbound.put(text, wait=wait, coalesce=False)
+    
+    async def drain(self):
+        """等待出站队列回落到低水位（生产者背压）"""
+        await self._outbound.drain()
+    
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待出站队列全部写出，返回是否在超时前完成"""
+        return await self._outbound.flush(timeout)
+    
+    async def _write_frame(self, frame: Union[str, bytes]):
+        """写出单个帧（writer 与心跳共用，串行化 socket 写入）"""
+        async with self._write_lock:
+            if not self._ws or self._ws.closed:
+                raise ConnectionError("WebSocket is not connected")
+            if isinstance(frame, bytes):
+                await self._ws.send_bytes(frame)
+            else:
+                await self._ws.send_str(frame)
     
     async def close(self, code: int = 1000, reason: str = ""):
         """
@@ -231,39 +779,59 @@ class WSClient:
             code: 关闭代码
             reason: 关闭原因
         """
+        # 尽量写出已排队的消息
+        if self._ws and not self._ws.closed:
+            await self._outbound.flush(timeout=5.0)
+        
         self._running = False
         
         # 取消任务
-        if self._heartbeat_task:
-            self._heartbeat_task.cancel()
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
             try:
-                await self._heartbeat_task
+                await self._supervisor_task
             except asyncio.CancelledError:
                 pass
+            self._supervisor_task = None
         
-        if self._receive_task:
-            self._receive_task.cancel()
-            try:
-                await self._receive_task
-            except asyncio.CancelledError:
-                pass
+        await self._handle_disconnect(code=code, reason=reason)
+        await self._dispatcher.stop()
+        await self._outbound.stop()
         
-        # 关闭连接
-        if self._ws and not self._ws.closed:
-            await self._ws.close(code=code, message=reason.encode())
-        
-        if self._session:
-            await self._session.close()
+        if self._acquired is not None:
+            await self._acquired.release()
+            self._acquired = None
+        self._session = None
         
         self._state = ConnectionState.DISCONNECTED
         logger.info("WebSocket closed")
     
-    async def _handle_disconnect(self):
-        """处理断开连接"""
-        if self._state == ConnectionState.DISCONNECTED:
+    def reconnect_stats(self) -> ReconnectStats:
+        """获取重连统计"""
+        return self._reconnect_stats
+    
+    async def _handle_disconnect(self, code: int = 1000, reason: str = ""):
+        """处理断开连接：停止心跳、关闭 socket 并触发断开回调"""
+        self._writable.clear()
+        
+        for task in (self._heartbeat_task, self._ping_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._heartbeat_task = None
+        self._ping_task = None
+        
+        if self._ws and not self._ws.closed:
+            await self._ws.close(code=code, message=reason.encode())
+        
+        if self._state != ConnectionState.CONNECTED:
             return
         
         self._state = ConnectionState.DISCONNECTED
+        self._reconnect_stats.last_disconnected_at = time.time()
         
         # 触发断开回调
         for callback in self._disconnect_callbacks:
@@ -271,33 +839,6 @@ class WSClient:
                 callback()
             except Exception as e:
                 logger.error(f"Disconnect callback error: {e}")
-        
-        await self._maybe_reconnect()
-    
-    async def _maybe_reconnect(self):
-        """尝试重连"""
-        if not self._running:
-            return
-        
-        # 检查重连次数
-        if self.reconnect_attempts > 0 and self._reconnect_count >= self.reconnect_attempts:
-            logger.error("Max reconnect attempts reached")
-            return
-        
-        self._state = ConnectionState.RECONNECTING
-        self._reconnect_count += 1
-        
-        delay = min(
-            self.reconnect_delay * (2 ** (self._reconnect_count - 1)),
-            self.max_reconnect_delay
-        )
-        
-        logger.info(f"Reconnecting in {delay}s (attempt {self._reconnect_count})")
-        
-        await asyncio.sleep(delay)
-        
-        if self._running:
-            await self.connect()
     
     async def _handle_error(self, error: Exception):
         """处理错误"""